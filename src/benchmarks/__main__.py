@@ -0,0 +1,49 @@
+import argparse
+import logging
+import sys
+
+from benchmarks.suite import BenchmarkSuite
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark exql against a recording stand-in for MySQL")
+    parser.add_argument("--tables", type=int, default=4, help="Number of tables in the generated directory")
+    parser.add_argument("--rows", type=int, default=10000, help="Number of rows per table")
+    parser.add_argument("--columns", type=int, default=8, help="Number of columns per table")
+    parser.add_argument("--expression-share", type=float, default=0.0,
+                        help="Share of cells holding SQL expressions, between 0 and 1")
+    parser.add_argument("--format", choices=["csv", "xls"], default="csv", help="Format of the generated sheets")
+    parser.add_argument("--batch-rows", type=int, default=1000, help="Rows per INSERT statement and per fetch")
+    parser.add_argument("--bulk-load", action="store_true", help="Load literal rows with LOAD DATA LOCAL INFILE")
+    parser.add_argument("--prepared", action="store_true", help="Insert literal rows with prepared statements")
+    parser.add_argument("--workers", type=int, default=None, help="Workers used to load and export directories")
+    parser.add_argument("--work-dir", default=None, help="Directory for generated and exported files")
+    parser.add_argument("--save-baseline", default=None, help="Save the measures as a JSON baseline")
+    parser.add_argument("--baseline", default=None, help="Compare the measures with a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative drop of rows/sec")
+    args = parser.parse_args()
+
+    logging.getLogger("exql.logger").setLevel(logging.WARNING)
+
+    suite = BenchmarkSuite(args.tables, args.rows, args.columns, args.expression_share, args.format, args.batch_rows,
+                           args.bulk_load, args.workers, args.prepared)
+    suite.run(args.work_dir)
+    print(suite.format_report())
+
+    if args.save_baseline:
+        suite.save_baseline(args.save_baseline)
+
+    if args.baseline:
+        regressions = suite.compare_with_baseline(args.baseline, args.tolerance)
+        for name, baseline_rate, current_rate in regressions:
+            print("Regression in " + name + ": " + "{:.0f}".format(current_rate) + " rows/sec, baseline " +
+                  "{:.0f}".format(baseline_rate) + " rows/sec")
+
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import re
+import threading
+import time
+
+SELECT_TABLE_PATTERN = re.compile(r"^SELECT \* FROM (\w+)", re.IGNORECASE)
+LOAD_DATA_PATTERN = re.compile(r"^LOAD DATA LOCAL INFILE '((?:[^'\\]|\\.)*)'", re.IGNORECASE)
+
+
+class RecordingBackend:
+    """
+    Stand-in for a MySQL server used to benchmark exql without one. Statements are not parsed or executed, only
+    counted and timed, and SELECT * queries return synthetic rows so that exports have data to write
+    """
+
+    def __init__(self, tables=None):
+        """
+        :param tables: Map from table name to tuple (list of column names, number of rows) served by SELECT * queries
+        and information_schema queries
+        """
+        self.tables = dict(tables or {})
+        self.lock = threading.Lock()
+        self.statements = 0
+        self.statement_bytes = 0
+        self.commits = 0
+        self.connections = 0
+        self.execute_seconds = 0.0
+
+    def connect(self, host, username, password, port, **connect_args):
+        """
+        Connection factory with the signature expected by exql.pool.ConnectionPool
+        :return: RecordingConnection
+        """
+        with self.lock:
+            self.connections += 1
+
+        return RecordingConnection(self)
+
+    def record(self, query, seconds):
+        """
+        Count an executed statement
+        :param query: SQL query text
+        :param seconds: Time spent executing it
+        :return: None
+        """
+        with self.lock:
+            self.statements += 1
+            self.statement_bytes += len(query)
+            self.execute_seconds += seconds
+
+    def get_result(self, query, params):
+        """
+        Returns the column names and rows produced by a query
+        :param query: SQL query text
+        :param params: Bound parameters, if any
+        :return: Tuple (column names, iterator of rows, row count)
+        """
+        if "information_schema.tables" in query:
+            if "table_rows" in query:
+                return ("table_name", "table_rows"), iter([(name, rows) for name, (_, rows) in self.tables.items()]), \
+                    len(self.tables)
+            return ("table_name",), iter([(name,) for name in self.tables]), len(self.tables)
+
+        if "information_schema.columns" in query:
+            rows = [(name, column_name, "varchar") for name, (column_names, _) in self.tables.items()
+                    for column_name in column_names]
+            return ("table_name", "column_name", "data_type"), iter(rows), len(rows)
+
+        if "information_schema.statistics" in query:
+            rows = [(name, "PRIMARY", column_names[0]) for name, (column_names, _) in self.tables.items()]
+            return ("table_name", "index_name", "column_name"), iter(rows), len(rows)
+
+        select_match = SELECT_TABLE_PATTERN.match(query)
+        if select_match and select_match.group(1) in self.tables:
+            column_names, rows = self.tables[select_match.group(1)]
+            return tuple(column_names), get_synthetic_rows(len(column_names), rows), rows
+
+        if query.startswith("INSERT"):
+            return (), iter(()), query.count("), (") + 1
+
+        load_match = LOAD_DATA_PATTERN.match(query)
+        if load_match:
+            with open(load_match.group(1).replace("\\\\", "\\").replace("\\'", "'"), "rb") as load_file:
+                return (), iter(()), sum(1 for _ in load_file)
+
+        return (), iter(()), 0
+
+    def get_summary(self):
+        """
+        :return: Map of the counters recorded so far
+        """
+        return {"statements": self.statements, "statement_bytes": self.statement_bytes, "commits": self.commits,
+                "connections": self.connections, "execute_seconds": self.execute_seconds}
+
+
+def get_synthetic_rows(columns, rows):
+    """
+    Lazily generate rows returned for SELECT * queries
+    :param columns: Number of columns
+    :param rows: Number of rows
+    :return: Generator of tuples
+    """
+    filler = tuple("value_" + str(i) for i in range(1, columns))
+    for key in range(1, rows + 1):
+        yield (key,) + filler
+
+
+class RecordingCursor:
+    """
+    DB-API cursor of a RecordingConnection
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.column_names = ()
+        self.description = None
+        self.rowcount = -1
+        self.rows = iter(())
+
+    def execute(self, query, params=None):
+        start = time.perf_counter()
+        self.column_names, self.rows, self.rowcount = self.backend.get_result(query, params)
+        self.description = [(name,) for name in self.column_names] or None
+        self.backend.record(query, time.perf_counter() - start)
+
+    def executemany(self, query, seq_params):
+        start = time.perf_counter()
+        self.rowcount = sum(1 for _ in seq_params)
+        self.rows = iter(())
+        self.backend.record(query, time.perf_counter() - start)
+
+    def fetchone(self):
+        return next(self.rows, None)
+
+    def fetchmany(self, size=1):
+        return [row for _, row in zip(range(size), self.rows)]
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def close(self):
+        self.rows = iter(())
+
+
+class RecordingConnection:
+    """
+    DB-API connection to a RecordingBackend
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.open = True
+
+    def cursor(self, *args, **kwargs):
+        return RecordingCursor(self.backend)
+
+    def commit(self):
+        with self.backend.lock:
+            self.backend.commits += 1
+
+    def rollback(self):
+        pass
+
+    def is_connected(self):
+        return self.open
+
+    def close(self):
+        self.open = False
+
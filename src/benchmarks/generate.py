@@ -0,0 +1,149 @@
+import csv
+import random
+from itertools import chain
+from pathlib import Path
+
+COLUMN_KINDS = ["INT", "VARCHAR(100)", "DOUBLE", "DATETIME"]
+
+
+def get_column_definitions(columns):
+    """
+    Returns the name, type and modifiers of the columns of a synthetic table. The first column is an INT primary key,
+    the others cycle through COLUMN_KINDS
+    :param columns: Number of columns, at least 1
+    :return: List of dicts with keys "name", "type" and "modifiers"
+    """
+    definitions = [{"name": "id", "type": "INT", "modifiers": "PRIMARY KEY"}]
+    for i in range(1, columns):
+        column_type = COLUMN_KINDS[i % len(COLUMN_KINDS)]
+        definitions.append({"name": "col_" + str(i), "type": column_type, "modifiers": "NOT NULL"})
+
+    return definitions
+
+
+def get_cell(column_type, row_number, is_expression, rng):
+    """
+    Returns a synthetic cell for a column, either a literal or a SQL expression evaluated by the server
+    :param column_type: MySQL type of the column
+    :param row_number: Number of the row, used to derive values
+    :param is_expression: If True, a SQL expression is returned instead of a literal
+    :param rng: random.Random instance
+    :return: Cell text
+    """
+    if column_type == "INT":
+        value = rng.randint(0, 1000000)
+        return str(value) + " + 1" if is_expression else str(value)
+
+    if column_type == "DOUBLE":
+        value = round(rng.uniform(0, 10000), 3)
+        return "ROUND(" + str(value) + ", 1)" if is_expression else str(value)
+
+    if column_type == "DATETIME":
+        return "now()" if is_expression else "'2021-01-01 " + str(row_number % 24).zfill(2) + ":00:00'"
+
+    text = "name_" + str(row_number) + "_" + str(rng.randint(0, 99999))
+    return "(SELECT UPPER('" + text + "'))" if is_expression else "'" + text + "'"
+
+
+def iter_table_rows(definitions, rows, expression_share, rng, first_id=1):
+    """
+    Lazily generate the body rows of a synthetic table
+    :param definitions: Column definitions as returned by get_column_definitions
+    :param rows: Number of rows to generate
+    :param expression_share: Share, between 0 and 1, of non-key cells holding a SQL expression
+    :param rng: random.Random instance
+    :param first_id: Primary key of the first row
+    :return: Generator of rows
+    """
+    for row_number in range(first_id, first_id + rows):
+        yield [str(row_number)] + [get_cell(definition["type"], row_number, rng.random() < expression_share, rng)
+                                   for definition in definitions[1:]]
+
+
+def write_rows(file_path, rows):
+    """
+    Write rows to a .csv or, if xlwt is installed, a .xls file
+    :param file_path: Path object of the file to write. Its suffix determines the format
+    :param rows: Iterable of rows
+    :return: None
+    """
+    if file_path.suffix == ".csv":
+        with open(file_path, "w", newline="") as csv_file:
+            csv.writer(csv_file).writerows(rows)
+        return
+
+    try:
+        import xlwt
+    except ImportError:
+        raise Exception("Generating .xls files requires the xlwt package")
+
+    workbook = xlwt.Workbook()
+    sheet = workbook.add_sheet("Sheet1")
+    for row_index, row in enumerate(rows):
+        if row_index >= 65536:
+            raise Exception(".xls sheets are limited to 65536 rows")
+
+        for column_index, cell in enumerate(row):
+            sheet.write(row_index, column_index, cell)
+
+    workbook.save(str(file_path))
+
+
+def generate_directory(directory_path, tables=4, rows=10000, columns=8, expression_share=0.0, file_format="csv",
+                       seed=0):
+    """
+    Generate a directory of synthetic sheets in the table creation format i.e. a row of column names, a row of types, a
+    row of modifiers and an empty row followed by the body rows
+    :param directory_path: Path of the directory to create. Its name is the name of the database
+    :param tables: Number of files to generate
+    :param rows: Number of body rows per file
+    :param columns: Number of columns per file
+    :param expression_share: Share, between 0 and 1, of non-key cells holding a SQL expression such as now()
+    :param file_format: "csv" or "xls"
+    :param seed: Seed of the random generator, so that runs are reproducible
+    :return: Map from table name to list of column names
+    """
+    directory_path = Path(directory_path)
+    directory_path.mkdir(parents=True, exist_ok=False)
+
+    rng = random.Random(seed)
+    definitions = get_column_definitions(columns)
+    header_rows = [[definition[key] for definition in definitions] for key in ("name", "type", "modifiers")]
+    header_rows.append([""] * columns)
+
+    table_columns = dict()
+    for table_number in range(1, tables + 1):
+        table_name = "table_" + str(table_number)
+        file_rows = chain(header_rows, iter_table_rows(definitions, rows, expression_share, rng))
+        write_rows(directory_path / (table_name + "." + file_format), file_rows)
+        table_columns[table_name] = header_rows[0]
+
+    return table_columns
+
+
+def generate_insertion_file(file_path, rows=10000, columns=8, expression_share=0.0, first_id=1, seed=1):
+    """
+    Generate a .csv in the insertion format i.e. a row of column names followed by the rows to insert
+    :param file_path: Path of the file to create
+    :param rows: Number of rows
+    :param columns: Number of columns
+    :param expression_share: Share, between 0 and 1, of non-key cells holding a SQL expression
+    :param first_id: Primary key of the first row
+    :param seed: Seed of the random generator
+    :return: None
+    """
+    definitions = get_column_definitions(columns)
+    names = [definition["name"] for definition in definitions]
+    body_rows = iter_table_rows(definitions, rows, expression_share, random.Random(seed), first_id)
+    write_rows(Path(file_path), chain([names], body_rows))
+
+
+def generate_deletion_file(file_path, rows=10000, first_id=1):
+    """
+    Generate a .csv in the deletion format, matching rows on their primary key
+    :param file_path: Path of the file to create
+    :param rows: Number of keys
+    :param first_id: First key
+    :return: None
+    """
+    write_rows(Path(file_path), chain([["id"]], ([str(key)] for key in range(first_id, first_id + rows))))
@@ -0,0 +1,178 @@
+import json
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.backend import RecordingBackend
+from benchmarks.generate import generate_deletion_file, generate_directory, generate_insertion_file
+from exql.exql import Exql
+from exql.metrics import Metrics
+
+DB_NAME = "exql_benchmark"
+
+
+def get_peak_rss_bytes():
+    """
+    Returns the peak resident set size of the current process since it started. It never decreases, so after a phase
+    it is the peak of that phase or of any earlier one
+    :return: Peak RSS in bytes
+    """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+class BenchmarkSuite:
+    """
+    Runs the main Exql operations on synthetic data against a RecordingBackend and records the time spent, the
+    throughput and the memory of each phase, along with the parse, build, execute and commit time measured by
+    exql.metrics.Metrics
+    """
+
+    def __init__(self, tables=4, rows=10000, columns=8, expression_share=0.0, file_format="csv", batch_rows=1000,
+                 bulk_load=False, workers=None, prepared=False):
+        """
+        :param tables: Number of tables in the generated directory
+        :param rows: Number of rows per table
+        :param columns: Number of columns per table
+        :param expression_share: Share, between 0 and 1, of non-key cells holding a SQL expression
+        :param file_format: "csv" or "xls" (requires xlwt)
+        :param batch_rows: Rows per INSERT statement and per fetch when exporting
+        :param bulk_load: If True, Exql loads literal rows with LOAD DATA LOCAL INFILE
+        :param workers: If provided, directories are loaded and exported with this many workers
+        :param prepared: If True, Exql inserts literal rows with prepared statements
+        """
+        self.config = {"tables": tables, "rows": rows, "columns": columns, "expression_share": expression_share,
+                       "file_format": file_format, "batch_rows": batch_rows, "bulk_load": bulk_load,
+                       "workers": workers, "prepared": prepared}
+        self.phases = dict()
+        self.backend = None
+        self.metrics = Metrics()
+
+    def run_phase(self, name, rows, function):
+        """
+        Run and measure a phase
+        :param name: Name of the phase
+        :param rows: Number of rows processed by the phase, used to compute the throughput
+        :param function: Function running the phase
+        :return: None
+        """
+        backend_before = self.backend.get_summary() if self.backend else {}
+        peak_rss_before = get_peak_rss_bytes()
+        self.metrics.reset()
+
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+
+        process_peak_rss = get_peak_rss_bytes()
+        phase = {"seconds": seconds, "rows": rows, "rows_per_second": rows / seconds if seconds else 0.0,
+                 "process_peak_rss_bytes": process_peak_rss,
+                 "peak_rss_increase_bytes": process_peak_rss - peak_rss_before}
+        if self.backend:
+            backend_after = self.backend.get_summary()
+            phase.update({key: backend_after[key] - backend_before[key] for key in backend_after})
+
+        phase["phase_seconds"] = self.metrics.get_summary()["phase_seconds"]
+        self.phases[name] = phase
+
+    def run(self, work_dir=None):
+        """
+        Generate the data and run every phase
+        :param work_dir: Directory in which files are generated and exported. A temporary directory if not provided
+        :return: Map from phase name to its measures
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            work_dir = Path(work_dir or temp_dir)
+            return self.run_in_directory(work_dir)
+
+    def run_in_directory(self, work_dir):
+        config = self.config
+        source_dir = work_dir / DB_NAME
+        insertion_file = work_dir / "insertion.csv"
+        deletion_file = work_dir / "deletion.csv"
+        output_dir = work_dir / "output"
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        table_columns = dict()
+        total_rows = config["tables"] * config["rows"]
+
+        def generate():
+            table_columns.update(generate_directory(source_dir, config["tables"], config["rows"], config["columns"],
+                                                    config["expression_share"], config["file_format"]))
+            generate_insertion_file(insertion_file, config["rows"], config["columns"], config["expression_share"],
+                                    config["rows"] + 1)
+            generate_deletion_file(deletion_file, config["rows"])
+
+        self.run_phase("generate", total_rows + 2 * config["rows"], generate)
+
+        self.backend = RecordingBackend({name: (columns, config["rows"]) for name, columns in table_columns.items()})
+        exql_obj = Exql("benchmark", "benchmark", "recording-backend", batch_rows=config["batch_rows"],
+                        pool_size=max(config["workers"] or 1, 1), bulk_load=config["bulk_load"], metrics=self.metrics,
+                        prepared=config["prepared"], connect=self.backend.connect)
+
+        with exql_obj:
+            self.run_phase("create_db_from_directory", total_rows,
+                           lambda: exql_obj.create_db_from_directory(source_dir, config["workers"]))
+            self.run_phase("insert_in_table", config["rows"],
+                           lambda: exql_obj.insert_in_table(DB_NAME, insertion_file, "table_1"))
+            self.run_phase("delete_from_db", config["rows"],
+                           lambda: exql_obj.delete_from_db(DB_NAME, deletion_file, "table_1", config["batch_rows"]))
+            self.run_phase("select_into_csv", config["rows"],
+                           lambda: exql_obj.select_into_csv(DB_NAME, "SELECT * FROM table_1", output_dir,
+                                                            "select.csv", config["batch_rows"]))
+            self.run_phase("write_db_to_dir", total_rows,
+                           lambda: exql_obj.write_db_to_dir(output_dir, DB_NAME, batch_size=config["batch_rows"],
+                                                            workers=config["workers"]))
+
+        return self.phases
+
+    def save_baseline(self, baseline_path):
+        """
+        Save the configuration and measures of the last run as a JSON baseline
+        :param baseline_path: Path of the JSON file
+        :return: None
+        """
+        with open(baseline_path, "w") as baseline_file:
+            json.dump({"config": self.config, "phases": self.phases}, baseline_file, indent=2, sort_keys=True)
+
+    def compare_with_baseline(self, baseline_path, tolerance=0.2):
+        """
+        Compare the throughput of the last run with a saved baseline
+        :param baseline_path: Path of a JSON file written by save_baseline
+        :param tolerance: Allowed relative drop of rows/sec, e.g. 0.2 for 20%
+        :return: List of (phase name, baseline rows/sec, current rows/sec) tuples for every regressed phase
+        """
+        with open(baseline_path, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+
+        if baseline["config"] != self.config:
+            raise Exception("The baseline was recorded with a different configuration: " + str(baseline["config"]))
+
+        regressions = []
+        for name, phase in self.phases.items():
+            baseline_phase = baseline["phases"].get(name)
+            if baseline_phase and phase["rows_per_second"] < baseline_phase["rows_per_second"] * (1 - tolerance):
+                regressions.append((name, baseline_phase["rows_per_second"], phase["rows_per_second"]))
+
+        return regressions
+
+    def format_report(self):
+        """
+        :return: Table of the measures of the last run, one line per phase. "process peak MB" is the peak RSS of the
+        process up to the end of the phase, "peak +MB" how much the phase raised it
+        """
+        sub_phases = (Metrics.PARSE, Metrics.BUILD, Metrics.EXECUTE, Metrics.COMMIT)
+        line_format = "{:<26}{:>10}{:>12}{:>10}" + "{:>10}" * len(sub_phases) + "{:>12}{:>18}{:>10}"
+        lines = [line_format.format("phase", "rows", "rows/sec", "seconds", *sub_phases, "statements",
+                                    "process peak MB", "peak +MB")]
+
+        for name, phase in self.phases.items():
+            lines.append(line_format.format(
+                name, phase["rows"], "{:.0f}".format(phase["rows_per_second"]), "{:.3f}".format(phase["seconds"]),
+                *["{:.3f}".format(phase["phase_seconds"].get(sub_phase, 0.0)) for sub_phase in sub_phases],
+                phase.get("statements", 0), "{:.1f}".format(phase["process_peak_rss_bytes"] / (1024 * 1024)),
+                "{:.1f}".format(phase["peak_rss_increase_bytes"] / (1024 * 1024))))
+
+        return "\n".join(lines)
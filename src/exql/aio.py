@@ -0,0 +1,296 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from pathlib import Path
+
+from exql.dao import fetch_row_batches, select_rows
+from exql.exql import Exql, extract_column_names, write_batches_to_new_csv
+from exql.logger import logger
+
+QUEUE_BATCHES = 4
+EXPORT_BATCH_ROWS = 10000
+
+# Marks the end of the batches sent through a BatchChannel
+END_OF_BATCHES = object()
+
+
+class BatchChannel:
+    """
+    Bounded queue carrying batches of rows from a producer to a consumer, either of which may run in a worker thread
+    while the other runs on the event loop. A producer filling the queue waits until the consumer catches up, so at
+    most :param max_batches batches are held in memory. The producer ends the stream with END_OF_BATCHES, or with the
+    exception that stopped it, which is then raised on the consumer side
+    """
+
+    def __init__(self, loop, max_batches=QUEUE_BATCHES):
+        """
+        Must be called on the event loop
+        :param loop: Running event loop
+        :param max_batches: Maximum number of batches waiting in the queue
+        """
+        self.loop = loop
+        self.queue = asyncio.Queue(max_batches)
+        self.closed = threading.Event()
+
+    async def put(self, batch):
+        """
+        Send a batch, waiting for room in the queue. Batches sent once the consumer closed the channel are dropped
+        :param batch: Batch of rows, END_OF_BATCHES or an exception
+        :return: None
+        """
+        if not self.closed.is_set():
+            await self.queue.put(batch)
+
+    def put_threadsafe(self, batch):
+        """
+        Send a batch from a worker thread, blocking the thread until there is room in the queue
+        :param batch: Batch of rows, END_OF_BATCHES or an exception
+        :return: None
+        """
+        if self.closed.is_set():
+            raise Exception("The consumer of the batches stopped")
+
+        asyncio.run_coroutine_threadsafe(self.put(batch), self.loop).result()
+
+    def iter_threadsafe(self):
+        """
+        Receive the batches from a worker thread, blocking the thread while the queue is empty
+        :return: Generator of batches
+        """
+        while True:
+            batch = asyncio.run_coroutine_threadsafe(self.queue.get(), self.loop).result()
+            if batch is END_OF_BATCHES:
+                return
+
+            if isinstance(batch, BaseException):
+                raise batch
+
+            yield batch
+
+    def close(self):
+        """
+        Called by the consumer when it stops early. Drops the waiting batches, so a producer blocked on a full queue
+        resumes and stops at its next batch. Must be called on the event loop
+        :return: None
+        """
+        self.closed.set()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+class AsyncExql:
+    """
+    Asyncio facade of Exql, whose public methods it mirrors as coroutines. Database work runs on a thread per pooled
+    connection and at most pool_size jobs use the database at the same time, other jobs waiting on the event loop
+    rather than in a thread of their own. File parsing and csv writing run on a separate executor, and are connected
+    to the database work by a bounded queue of row batches, so a fast reader never gets far ahead of a slow writer
+    """
+
+    def __init__(self, username, password, host, port=3306, io_workers=None, queue_batches=QUEUE_BATCHES, **kwargs):
+        """
+        :param username: MySQL username
+        :param password: MySQL password
+        :param host: MySQL host
+        :param port: MySQL port number
+        :param io_workers: Number of threads parsing files and writing csv files. Defaults to twice the pool size
+        :param queue_batches: Maximum number of row batches waiting between the reader and the writer of a job
+        :param kwargs: Other arguments of Exql e.g. pool_size, batch_rows or bulk_load
+        """
+        self.exql = Exql(username, password, host, port, **kwargs)
+        self.queue_batches = queue_batches
+        self.db_executor = ThreadPoolExecutor(max_workers=self.exql.pool.size, thread_name_prefix="exql-db")
+        self.io_executor = ThreadPoolExecutor(max_workers=io_workers or 2 * self.exql.pool.size,
+                                              thread_name_prefix="exql-io")
+        self.db_slots = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """
+        Wait for the running work to finish, then close the executors and all pooled connections
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.db_executor.shutdown)
+        await loop.run_in_executor(None, self.io_executor.shutdown)
+        self.exql.close()
+
+    def get_db_slots(self):
+        """
+        Returns the semaphore bounding the number of jobs using the database, created on first use so that it belongs
+        to the running event loop
+        :return: asyncio.Semaphore
+        """
+        if self.db_slots is None:
+            self.db_slots = asyncio.Semaphore(self.exql.pool.size)
+
+        return self.db_slots
+
+    async def run_in_db(self, function, *args, **kwargs):
+        """
+        Run a blocking Exql method on the database executor once a database slot is free
+        :param function: Function to run
+        :param args: Positional arguments of :param function
+        :param kwargs: Keyword arguments of :param function
+        :return: Value returned by :param function
+        """
+        async with self.get_db_slots():
+            return await asyncio.get_running_loop().run_in_executor(self.db_executor,
+                                                                    partial(function, *args, **kwargs))
+
+    async def run_in_io(self, function, *args):
+        """
+        Run a blocking file operation on the io executor
+        :param function: Function to run
+        :param args: Positional arguments of :param function
+        :return: Value returned by :param function
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.io_executor, partial(function, *args))
+
+    async def create_db_from_directory(self, directory_path, **kwargs):
+        """
+        Coroutine running Exql.create_db_from_directory as a single database job. With workers, the extra pooled
+        connections it uses are taken from the same pool and waited for when all of them are busy
+        """
+        return await self.run_in_db(self.exql.create_db_from_directory, directory_path, **kwargs)
+
+    async def sync_directory(self, directory_path, **kwargs):
+        """
+        Coroutine running Exql.sync_directory as a single database job
+        """
+        return await self.run_in_db(self.exql.sync_directory, directory_path, **kwargs)
+
+    async def create_table_from_csv(self, db_name, source_file_path):
+        """
+        Coroutine running Exql.create_table_from_csv as a single database job
+        """
+        return await self.run_in_db(self.exql.create_table_from_csv, db_name, source_file_path)
+
+    async def delete_from_db(self, db_name, deletion_csv, **kwargs):
+        """
+        Coroutine running Exql.delete_from_db as a single database job
+        """
+        return await self.run_in_db(self.exql.delete_from_db, db_name, deletion_csv, **kwargs)
+
+    async def write_db_to_dir(self, destination_path, db_name, **kwargs):
+        """
+        Coroutine running Exql.write_db_to_dir as a single database job
+        """
+        return await self.run_in_db(self.exql.write_db_to_dir, destination_path, db_name, **kwargs)
+
+    async def insert_in_table(self, db_name, csv_file_path, table_name=None, **kwargs):
+        """
+        Coroutine inserting the rows of a file into an existing table, see Exql.insert_in_table. The file is parsed on
+        the io executor, :param batch_rows rows at a time, while the previous batches are inserted on a pooled
+        connection. Merges, checkpointed inserts and files parsed by several processes (see Exql.parse_workers) run as a
+        single database job. The header is checked against the cached schema of the table, as by Exql.insert_in_table
+        :param db_name: Name of database
+        :param csv_file_path: Path of the file containing the rows to insert. First row must have column names
+        :param table_name: Name of table in which to insert. If not provided, uses the name of the file
+        :param kwargs: Other arguments of Exql.insert_in_table
+        :return: Number of rows inserted or, for merges, map with the number of "changed", "unchanged" and "deleted"
+        rows
+        """
+        file_path = Path(csv_file_path)
+        if any(kwargs.values()) or self.exql.should_parse_in_parallel(file_path):
+            return await self.run_in_db(self.exql.insert_in_table, db_name, csv_file_path, table_name, **kwargs)
+
+        table_name, header_rows, data_rows, _ = await self.run_in_db(self.exql.prepare_insert, db_name, file_path,
+                                                                     table_name)
+
+        channel = BatchChannel(asyncio.get_running_loop(), self.queue_batches)
+
+        async def read():
+            try:
+                while not channel.closed.is_set():
+                    batch = await self.run_in_io(lambda: list(islice(data_rows, self.exql.batch_rows)))
+                    if not batch:
+                        break
+
+                    await channel.put(batch)
+
+                await channel.put(END_OF_BATCHES)
+            except BaseException as e:
+                await channel.put(e)
+                raise
+            finally:
+                await self.run_in_io(data_rows.close)
+
+        def insert():
+            rows = (row for batch in channel.iter_threadsafe() for row in batch)
+            with self.exql.connection() as (connection, cursor):
+                return self.exql.insert_data_rows(cursor, connection, db_name, table_name,
+                                                  extract_column_names(header_rows), rows)
+
+        async with self.get_db_slots():
+            reader = asyncio.ensure_future(read())
+            try:
+                row_count = await asyncio.get_running_loop().run_in_executor(self.db_executor, insert)
+            except BaseException:
+                channel.close()
+                await asyncio.gather(reader, return_exceptions=True)
+                raise
+
+            await reader
+
+        logger.info("Inserted " + str(row_count) + " rows in " + str(table_name))
+        return row_count
+
+    async def select_into_csv(self, db_name, full_select_query, destination_dir_path, destination_file_name,
+                              batch_size=None, compress=False, params=None):
+        """
+        Coroutine selecting rows into a new csv, see Exql.select_into_csv. Rows are always streamed from the server,
+        :param batch_size rows at a time, and written on the io executor while the next batches are fetched. The suffix
+        of :param destination_file_name selects the format e.g. ".csv.zst" or ".parquet"
+        :param db_name: Name of database
+        :param full_select_query: Syntactically correct SQL query to run
+        :param destination_dir_path: Path of valid, existing directory where csv is to be stored
+        :param destination_file_name: Name with which the csv is to be saved (including extension) e.g. "results.csv"
+        :param batch_size: Number of rows fetched and written at a time. Defaults to EXPORT_BATCH_ROWS
+        :param compress: If True, the csv is gzip compressed and ".gz" is appended to :param destination_file_name
+        :param params: Optional values bound to the %s placeholders of :param full_select_query
+        :return: Number of rows written
+        """
+        if compress and not destination_file_name.endswith(".gz"):
+            destination_file_name += ".gz"
+
+        channel = BatchChannel(asyncio.get_running_loop(), self.queue_batches)
+
+        def fetch():
+            try:
+                with self.exql.connection() as (connection, cursor):
+                    select_rows(cursor, db_name, full_select_query, params)
+                    channel.put_threadsafe((cursor.column_names, cursor.description))
+                    for row_batch in fetch_row_batches(cursor, batch_size or EXPORT_BATCH_ROWS):
+                        channel.put_threadsafe(row_batch)
+
+                channel.put_threadsafe(END_OF_BATCHES)
+            except BaseException as e:
+                if not channel.closed.is_set():
+                    channel.put_threadsafe(e)
+                raise
+
+        def write():
+            batches = channel.iter_threadsafe()
+            column_names, description = next(batches)
+            return write_batches_to_new_csv(column_names, destination_dir_path, destination_file_name, batches,
+                                            description)
+
+        async with self.get_db_slots():
+            fetcher = asyncio.get_running_loop().run_in_executor(self.db_executor, fetch)
+            try:
+                row_count = await self.run_in_io(write)
+            except BaseException:
+                channel.close()
+                await asyncio.gather(fetcher, return_exceptions=True)
+                raise
+
+            await fetcher
+
+        return row_count
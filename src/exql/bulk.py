@@ -0,0 +1,107 @@
+import os
+import tempfile
+from itertools import chain
+
+from exql.cells import CellCompiler
+from exql.dao import commit_with_checkpoint, get_warnings, load_data_local_infile
+from exql.logger import logger
+from exql.metrics import Metrics, measure
+
+TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"})
+
+
+def get_tsv_field(value):
+    """
+    Encode a literal value as a field of a file read by LOAD DATA with its default escaping
+    :param value: Literal value as returned by cells.get_literal
+    :return: Escaped field, \\N for NULL
+    """
+    if value is None:
+        return "\\N"
+
+    if not isinstance(value, str):
+        return str(value)
+
+    return value.translate(TSV_ESCAPES)
+
+
+def write_literal_rows(tsv_file, row_iterator):
+    """
+    Write rows to :param tsv_file as long as all their cells are literals. Stops at the first row containing a SQL
+    expression
+    :param tsv_file: Open text file to write tab separated rows to
+    :param row_iterator: Iterator of rows
+    :return: Tuple (number of rows written, first row containing an expression or None if all rows were written)
+    """
+    compiler = CellCompiler()
+    row_count = 0
+    for row in row_iterator:
+        values = compiler.compile_row(row)
+        if values is None:
+            return row_count, row
+
+        tsv_file.write("\t".join(map(get_tsv_field, values)) + "\n")
+        row_count += 1
+
+    return row_count, None
+
+
+def bulk_insert_rows(cursor, connection, db_name, table_name, column_names, row_data, insert_fallback, commit=True,
+                     metrics=None, checkpoint=None):
+    """
+    Insert rows using LOAD DATA LOCAL INFILE as long as they only contain literal values. Rows are streamed to a
+    temporary file, so the sheet is read only once. If a row containing a SQL expression (e.g. now()) is found, the
+    literal rows read so far are loaded and the remaining rows, starting at that row, are handed to
+    :param insert_fallback which evaluates them through INSERT statements. LOAD DATA LOCAL INFILE skips rows with
+    duplicate keys and truncates invalid values with only a warning, where INSERT statements fail. A load which does
+    not load every row of the file, or raises warnings, is thus raised as an error before anything is committed
+    :param cursor: SQL connection cursor. Its connection must allow local infile
+    :param connection: SQL connection object
+    :param db_name: Name of database
+    :param table_name: Name of table in which to insert rows
+    :param column_names: Ordered collection of columns in which to perform insertion
+    :param row_data: Iterable (e.g. generator) of rows matching the order of :param column_names
+    :param insert_fallback: Function called with an iterator of the remaining rows. Must return the number of rows it
+    inserted
+    :param commit: If True, commit once the literal rows are loaded
+    :param metrics: Optional Metrics instance recording the time spent writing the file (build) and loading it
+    (execute) and the rows and bytes loaded
+    :param checkpoint: Optional exql.checkpoint.Checkpoint recording the rows committed once the literal rows are
+    loaded. Only used with :param commit
+    :return: Number of rows inserted
+    """
+    row_iterator = iter(row_data)
+
+    tsv_file = tempfile.NamedTemporaryFile(mode="w", suffix=".tsv", encoding="utf-8", newline="\n", delete=False)
+    try:
+        with measure(metrics, Metrics.BUILD, table_name), tsv_file:
+            row_count, expression_row = write_literal_rows(tsv_file, row_iterator)
+
+        if row_count:
+            with measure(metrics, Metrics.EXECUTE, table_name):
+                loaded_rows = load_data_local_infile(cursor, connection, db_name, table_name, column_names,
+                                                     tsv_file.name, False)
+
+            if loaded_rows != row_count or getattr(cursor, "warning_count", 0):
+                warnings = get_warnings(cursor)
+                raise Exception("LOAD DATA LOCAL INFILE loaded " + str(loaded_rows) + " of " + str(row_count) +
+                                " rows into " + str(table_name) + " with warnings: " +
+                                ("; ".join(str(message) for _, _, message in warnings) or "none"))
+
+            if commit:
+                if checkpoint:
+                    checkpoint.add(row_count)
+                commit_with_checkpoint(connection, cursor, checkpoint, metrics, table_name)
+
+            if metrics:
+                metrics.record("rows", table_name, row_count)
+                metrics.record("bytes", table_name, os.path.getsize(tsv_file.name))
+    finally:
+        os.remove(tsv_file.name)
+
+    if expression_row is not None:
+        logger.info("Found SQL expressions in " + str(table_name) + " after " + str(row_count) +
+                    " rows, inserting the remaining rows with INSERT statements")
+        row_count += insert_fallback(chain([expression_row], row_iterator))
+
+    return row_count
@@ -0,0 +1,199 @@
+import re
+from decimal import Decimal
+
+NUMBER_PATTERN = re.compile(r"^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)$")
+QUOTED_STRING_PATTERN = re.compile(r"^'((?:[^'\\]|''|\\.)*)'$", re.DOTALL)
+ESCAPE_PATTERN = re.compile(r"''|\\(.)", re.DOTALL)
+ESCAPE_SEQUENCES = {"0": "\0", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a", "%": "\\%", "_": "\\_"}
+NUMBER_START_CHARACTERS = frozenset("+-.0123456789")
+
+# Returned instead of a value for cells holding a SQL expression, since None is the value of NULL
+NOT_LITERAL = object()
+
+
+def unescape_string(value):
+    """
+    Resolve the escape sequences of the body of a single quoted MySQL string e.g. It''s\\n -> It's<newline>
+    :param value: Body of the string, without the enclosing quotes
+    :return: Unescaped string
+    """
+    if "'" not in value and "\\" not in value:
+        return value
+
+    def replace(match):
+        if match.group(0) == "''":
+            return "'"
+
+        return ESCAPE_SEQUENCES.get(match.group(1), match.group(1))
+
+    return ESCAPE_PATTERN.sub(replace, value)
+
+
+def match_number(cell):
+    """
+    Match decimal numbers, returned as the text MySQL stores for the literal in a string column, so that binding the
+    value gives the same result as sending the cell as SQL text e.g. 007 -> 7, +1.50 -> 1.50 or -.5 -> -0.5. Numbers
+    with an exponent e.g. 2e3 are sent as SQL text, as the server formats them as doubles
+    :param cell: Stripped cell text
+    :return: Canonical text of the number, or NOT_LITERAL if the cell is not a decimal number
+    """
+    if cell.isdecimal() and cell.isascii() and (cell[0] != "0" or len(cell) == 1):
+        return cell
+
+    if cell[0] in NUMBER_START_CHARACTERS and NUMBER_PATTERN.match(cell):
+        if "." not in cell:
+            return str(int(cell))
+
+        value = Decimal(cell)
+        return format(value.copy_abs() if value.is_zero() else value, "f")
+
+    return NOT_LITERAL
+
+
+def match_string(cell):
+    """
+    :param cell: Stripped cell text
+    :return: The unescaped body if the cell is a single quoted string e.g. 'John Keats', otherwise NOT_LITERAL
+    """
+    if cell[0] == "'" and cell[-1] == "'" and len(cell) > 1:
+        body = cell[1:-1]
+        if "'" not in body and "\\" not in body:
+            return body
+
+        quoted_match = QUOTED_STRING_PATTERN.match(cell)
+        if quoted_match:
+            return unescape_string(quoted_match.group(1))
+
+    return NOT_LITERAL
+
+
+def match_null(cell):
+    """
+    :param cell: Stripped cell text
+    :return: None if the cell is NULL, otherwise NOT_LITERAL
+    """
+    return None if len(cell) == 4 and cell.upper() == "NULL" else NOT_LITERAL
+
+
+LITERAL_MATCHERS = (match_number, match_string, match_null)
+
+
+def get_number(cell):
+    """
+    :param cell: Number read from a .xls/.xlsx cell
+    :return: The number, with floats holding a whole number e.g. 3.0 converted to int
+    """
+    if isinstance(cell, float) and cell.is_integer():
+        return int(cell)
+
+    return cell
+
+
+def get_literal(cell, matchers=LITERAL_MATCHERS):
+    """
+    Returns the value of a cell holding a plain literal. Numbers, single quoted strings and NULL are literals,
+    anything else e.g. now() or (SELECT UPPER('a')) is treated as a SQL expression
+    :param cell: Cell value as read from a .csv/.xls
+    :param matchers: Literal matchers to try, in order
+    :return: None for NULL, the number for numeric cells of a spreadsheet, the canonical text of the number (see
+    match_number) or the unescaped body of the string for text cells, or NOT_LITERAL for SQL expressions
+    """
+    if isinstance(cell, (int, float)):
+        return get_number(cell)
+
+    if not isinstance(cell, str):
+        return NOT_LITERAL
+
+    cell = cell.strip()
+    if not cell:
+        return NOT_LITERAL
+
+    for matcher in matchers:
+        value = matcher(cell)
+        if value is not NOT_LITERAL:
+            return value
+
+    return NOT_LITERAL
+
+
+def is_literal(cell):
+    """
+    Check if a cell holds a plain literal value rather than a SQL expression. Numbers, single quoted strings and NULL
+    are literals, anything else e.g. now() or (SELECT UPPER('a')) is treated as an expression
+    :param cell: Cell value as read from a .csv/.xls
+    :return: True if the cell is a literal
+    """
+    return get_literal(cell) is not NOT_LITERAL
+
+
+def literal_value(cell):
+    """
+    Returns the value represented by a literal cell, without the quoting needed by SQL. Must only be called on cells
+    for which is_literal returns True
+    :param cell: Literal cell value e.g. 123, '123', 'John Keats' or NULL
+    :return: None for NULL, otherwise the value as a string e.g. "123" or "John Keats"
+    """
+    value = get_literal(cell)
+    if value is NOT_LITERAL:
+        return str(cell).strip()
+
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+class CellCompiler:
+    """
+    Sorts the cells of rows into literal values, which can be bound as statement parameters, and SQL expressions,
+    which must be sent as SQL text. The kind of literal (number, string or NULL) last found in each column is cached
+    and tried first, so a column holding the same kind of values costs a single check per cell
+    """
+
+    def __init__(self):
+        self.column_matchers = []
+
+    def compile_row(self, row):
+        """
+        Get the values of a row whose cells are all literals
+        :param row: Row of cells as read from a .csv/.xls
+        :return: List of values as returned by get_literal, or None if the row contains a SQL expression
+        """
+        column_matchers = self.column_matchers
+        if len(column_matchers) < len(row):
+            column_matchers.extend([LITERAL_MATCHERS] * (len(row) - len(column_matchers)))
+
+        values = []
+        for column_index, cell in enumerate(row):
+            if not isinstance(cell, str):
+                value = get_literal(cell)
+            else:
+                cell = cell.strip()
+                if not cell:
+                    return None
+
+                matchers = column_matchers[column_index]
+                value = matchers[0](cell)
+                if value is NOT_LITERAL:
+                    value = self.match_other(column_index, cell)
+
+            if value is NOT_LITERAL:
+                return None
+
+            values.append(value)
+
+        return values
+
+    def match_other(self, column_index, cell):
+        """
+        Try the matchers other than the one cached for the column and cache the first one matching the cell
+        :param column_index: Index of the column
+        :param cell: Stripped, non empty cell text
+        :return: Value of the cell as returned by get_literal
+        """
+        matchers = self.column_matchers[column_index]
+        for matcher in matchers[1:]:
+            value = matcher(cell)
+            if value is not NOT_LITERAL:
+                self.column_matchers[column_index] = (matcher,) + tuple(other for other in matchers
+                                                                        if other is not matcher)
+                return value
+
+        return NOT_LITERAL
@@ -0,0 +1,254 @@
+import json
+import threading
+from pathlib import Path
+
+from exql.dao import create_database
+from exql.logger import logger
+from exql.manifest import get_file_fingerprint
+from exql.sql import MySql
+
+CHECKPOINT_TABLE = "exql_checkpoint"
+
+
+class Checkpoint:
+    """
+    Progress of loading a source file into a table. Rows are counted as they are written and recorded in the store
+    whenever they are committed, so that an interrupted load can be resumed after its last commit
+    """
+
+    def __init__(self, store, key, rows=0, complete=False, resumed=False, replaced=False):
+        """
+        :param store: JsonCheckpointStore or TableCheckpointStore keeping the checkpoint
+        :param key: Key of the checkpoint in the store i.e. "<db name>.<table name>"
+        :param rows: Number of body rows of the source committed by previous runs
+        :param complete: True if a previous run loaded the whole source
+        :param resumed: True if the checkpoint was recorded by a previous run for the same file content
+        :param replaced: True if the checkpoint replaces one of a complete load of a different file content
+        """
+        self.store = store
+        self.key = key
+        self.rows = rows
+        self.pending_rows = 0
+        self.complete = complete
+        self.resumed = resumed
+        self.replaced = replaced
+
+    def add(self, rows):
+        """
+        Count rows written but not committed yet
+        :param rows: Number of rows
+        :return: None
+        """
+        self.pending_rows += rows
+
+    def before_commit(self, cursor):
+        """
+        Called right before the rows counted so far are committed, in the transaction writing them
+        :param cursor: SQL connection cursor of the transaction
+        :return: None
+        """
+        self.store.write_in_transaction(cursor, self.key, self.rows + self.pending_rows)
+
+    def after_commit(self):
+        """
+        Called once the rows counted so far are committed
+        :return: None
+        """
+        self.rows += self.pending_rows
+        self.pending_rows = 0
+        self.store.write_committed(self.key, self.rows)
+
+    def finish(self):
+        """
+        Mark the whole source as loaded, so that later runs skip it
+        :return: None
+        """
+        self.complete = True
+        self.store.save_entry(self.key, rows=self.rows, complete=True)
+
+
+class JsonCheckpointStore:
+    """
+    Checkpoints kept in a JSON sidecar file, which is rewritten after every commit. A failure between a commit and the
+    following write makes a resumed load repeat the last committed batch. Thread safe
+    """
+
+    def __init__(self, checkpoint_path):
+        """
+        :param checkpoint_path: Path of the JSON file. Created on first save
+        """
+        self.checkpoint_path = Path(checkpoint_path)
+        self.lock = threading.RLock()
+        self.entries = None
+
+    def load(self):
+        """
+        :return: Map from checkpoint key to entry, a dict with keys "size", "mtime", "content_hash", "rows" and
+        "complete". Empty if the file does not exist yet
+        """
+        with self.lock:
+            if self.entries is None:
+                self.entries = dict()
+                if self.checkpoint_path.exists():
+                    with open(self.checkpoint_path, "r") as checkpoint_file:
+                        self.entries = json.load(checkpoint_file)
+
+            return self.entries
+
+    def save_entry(self, key, **values):
+        """
+        Update an entry and rewrite the file. The file is written next to the checkpoint file and then renamed, so an
+        interrupted save leaves the previous checkpoints intact
+        :param key: Checkpoint key
+        :param values: Values of the entry to set
+        :return: None
+        """
+        with self.lock:
+            self.load().setdefault(key, dict()).update(values)
+
+            temp_path = self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")
+            with open(temp_path, "w") as checkpoint_file:
+                json.dump(self.entries, checkpoint_file, indent=2, sort_keys=True)
+
+            temp_path.replace(self.checkpoint_path)
+
+    def write_in_transaction(self, cursor, key, rows):
+        """
+        Nothing is written before the commit, since the file cannot take part in the transaction
+        """
+        pass
+
+    def write_committed(self, key, rows):
+        """
+        Record the number of committed rows of a checkpoint
+        :param key: Checkpoint key
+        :param rows: Number of body rows committed
+        :return: None
+        """
+        self.save_entry(key, rows=rows)
+
+    def begin(self, key, file_path):
+        """
+        :return: Checkpoint from which to load :param file_path, see begin_checkpoint
+        """
+        return begin_checkpoint(self, key, file_path)
+
+
+class TableCheckpointStore:
+    """
+    Checkpoints kept in a metadata table of the target schema. A checkpoint is written in the transaction committing
+    its rows, so a resumed load never repeats or skips committed rows. Thread safe
+    """
+
+    def __init__(self, exql, db_name, table_name=CHECKPOINT_TABLE):
+        """
+        :param exql: Exql instance whose connection pool is used
+        :param db_name: Name of the target schema
+        :param table_name: Name of the metadata table. Created if it does not exist
+        """
+        self.exql = exql
+        self.db_name = db_name
+        self.table_name = table_name
+        self.lock = threading.RLock()
+        self.entries = None
+
+    def load(self):
+        """
+        Create the metadata table if needed and read the checkpoints. The table is created here since CREATE TABLE
+        would commit the transaction of a running load
+        :return: Map from checkpoint key to entry, a dict with keys "size", "mtime", "content_hash", "rows" and
+        "complete"
+        """
+        with self.lock:
+            if self.entries is None:
+                with self.exql.connection() as (connection, cursor):
+                    create_database(cursor, self.db_name)
+                    cursor.execute(MySql.USE_DB.format(db_name=self.db_name))
+                    cursor.execute(MySql.CREATE_CHECKPOINT_TABLE.format(table_name=self.table_name))
+                    cursor.execute(MySql.SELECT_CHECKPOINTS.format(table_name=self.table_name))
+
+                    self.entries = {key: {"size": size, "mtime": mtime, "content_hash": content_hash,
+                                          "rows": row_count, "complete": bool(complete)}
+                                    for key, size, mtime, content_hash, row_count, complete in cursor.fetchall()}
+
+            return self.entries
+
+    def upsert_entry(self, cursor, key, entry):
+        """
+        Write an entry with the provided cursor, without committing
+        :param cursor: SQL connection cursor
+        :param key: Checkpoint key
+        :param entry: Checkpoint entry
+        :return: None
+        """
+        cursor.execute(MySql.UPSERT_CHECKPOINT.format(table_name=self.db_name + "." + self.table_name),
+                       (key, entry["size"], entry["mtime"], entry["content_hash"], entry["rows"], entry["complete"]))
+
+    def save_entry(self, key, **values):
+        """
+        Update an entry and write it in a transaction of its own
+        :param key: Checkpoint key
+        :param values: Values of the entry to set
+        :return: None
+        """
+        with self.lock:
+            entry = self.load().setdefault(key, dict())
+            entry.update(values)
+
+            with self.exql.connection() as (connection, cursor):
+                self.upsert_entry(cursor, key, entry)
+                connection.commit()
+
+    def write_in_transaction(self, cursor, key, rows):
+        """
+        Record the number of rows of a checkpoint in the transaction about to commit them
+        :param cursor: SQL connection cursor of the transaction
+        :param key: Checkpoint key
+        :param rows: Number of body rows committed by the transaction
+        :return: None
+        """
+        with self.lock:
+            self.upsert_entry(cursor, key, dict(self.load()[key], rows=rows))
+
+    def write_committed(self, key, rows):
+        """
+        Keep the loaded entry in line with the committed checkpoint
+        """
+        with self.lock:
+            self.load()[key]["rows"] = rows
+
+    def begin(self, key, file_path):
+        """
+        :return: Checkpoint from which to load :param file_path, see begin_checkpoint
+        """
+        return begin_checkpoint(self, key, file_path)
+
+
+def begin_checkpoint(store, key, file_path):
+    """
+    Get the checkpoint from which to load a source file. If the store holds a checkpoint recorded for the same file
+    content, loading resumes from it. Otherwise a new checkpoint is recorded, unless a load of a different content was
+    interrupted, as its rows would be mixed with the new ones
+    :param store: JsonCheckpointStore or TableCheckpointStore
+    :param key: Checkpoint key i.e. "<db name>.<table name>"
+    :param file_path: Path of the source file
+    :return: Checkpoint
+    """
+    previous_entry = store.load().get(key)
+    fingerprint = get_file_fingerprint(Path(file_path), previous_entry)
+
+    if previous_entry and previous_entry["content_hash"] == fingerprint["content_hash"]:
+        if previous_entry["complete"]:
+            logger.info("Skipping " + str(key) + ", " + str(file_path) + " was already loaded")
+        elif previous_entry["rows"]:
+            logger.info("Resuming " + str(key) + " after " + str(previous_entry["rows"]) + " committed rows")
+
+        return Checkpoint(store, key, previous_entry["rows"], previous_entry["complete"], resumed=True)
+
+    if previous_entry and not previous_entry["complete"]:
+        raise Exception("The content of " + str(file_path) + " changed since loading it into " + str(key) +
+                        " was interrupted. Remove the loaded rows and the checkpoint before loading it again")
+
+    store.save_entry(key, size=fingerprint["size"], mtime=fingerprint["mtime"],
+                     content_hash=fingerprint["content_hash"], rows=0, complete=False)
+    return Checkpoint(store, key, replaced=bool(previous_entry))
@@ -1,22 +1,48 @@
-from exql.logger import logger
+import re
+
+from exql.cells import CellCompiler
+from exql.logger import log_query
+from exql.metrics import Metrics, measure
 import mysql.connector
 from exql.sql import MySql
 
+BATCH_ROWS = 1000
+BATCH_BYTES = 1024 * 1024
+STAGING_ROW_ID_COLUMN = "exql_row_id"
+MAX_PREPARED_PARAMS = 65535
+PREPARED_STATEMENT_CACHE_SIZE = 4
+ISOLATION_SAVEPOINT = "exql_batch"
+UNIQUE_MODIFIER_PATTERN = re.compile(r"\bUNIQUE(\s+KEY)?\b", re.IGNORECASE)
 
-def open_cursor_connection(host, username, password, port):
+
+def open_connection(host, username, password, port, **connect_args):
     """
-    Connect to the MySQL DB at the specified host
+    Open a new connection to the MySQL DB at the specified host
     :param host: Host address for MySQL database
     :param username: MySQL Database user's username
     :param password: MySQL Database user's password
     :param port: Port for MySQL Database
-    :return: Returns the tuple (connection object, cursor object)
+    :param connect_args: Additional keyword arguments passed on to mysql.connector.connect
+    :return: Connection object
     """
-    connection = mysql.connector.connect(
+    return mysql.connector.connect(
         host=host,
         user=username,
         password=password,
-        port=port)
+        port=port,
+        **connect_args)
+
+
+def open_cursor_connection(host, username, password, port):
+    """
+    Connect to the MySQL DB at the specified host
+    :param host: Host address for MySQL database
+    :param username: MySQL Database user's username
+    :param password: MySQL Database user's password
+    :param port: Port for MySQL Database
+    :return: Returns the tuple (connection object, cursor object)
+    """
+    connection = open_connection(host, username, password, port)
 
     cursor = connection.cursor()
     return connection, cursor
@@ -44,7 +70,7 @@ def create_database(cursor, db_name):
     query = MySql.CREATE_DATABASE
     query = query.format(db_name=db_name)
 
-    logger.info(query)
+    log_query(query)
     cursor.execute(query)
 
 
@@ -80,7 +106,128 @@ def create_table(cursor, db_name, table_name, field_data):
     query = MySql.CREATE_TABLE
     query = query.format(table_name=table_name, row_data_list=get_create_table_field_data(field_data))
 
-    logger.info(query)
+    log_query(query)
+    cursor.execute(MySql.USE_DB.format(db_name=db_name))
+    cursor.execute(query)
+
+
+def split_unique_modifiers(field_data):
+    """
+    Remove the UNIQUE modifiers from column definitions, so that the unique indexes can be built once the table is
+    populated instead of being maintained row by row. AUTO_INCREMENT columns keep their modifier, since MySQL requires
+    them to be indexed when the table is created
+    :param field_data: List of dicts with each dict having keys 'name', 'type' and, optionally, 'modifiers'
+    :return: Tuple (column definitions without UNIQUE modifiers, list of names of the columns to index)
+    """
+    deferred_data = []
+    unique_columns = []
+
+    for field in field_data:
+        modifiers = field.get("modifiers") or ""
+        if UNIQUE_MODIFIER_PATTERN.search(modifiers) and "AUTO_INCREMENT" not in modifiers.upper():
+            field = dict(field, modifiers=" ".join(UNIQUE_MODIFIER_PATTERN.sub("", modifiers).split()))
+            unique_columns.append(field["name"])
+
+        deferred_data.append(field)
+
+    return deferred_data, unique_columns
+
+
+def add_unique_indexes(cursor, db_name, table_name, column_names):
+    """
+    Add a unique index on each of the specified columns using a single ALTER TABLE statement. Indexes are named after
+    their column, as with UNIQUE column modifiers
+    :param cursor: SQL connector cursor
+    :param db_name: Name of database containing the table
+    :param table_name: Name of the table
+    :param column_names: Names of the columns to index
+    :return: none
+    """
+    query = MySql.ADD_UNIQUE_INDEXES
+    query = query.format(table_name=table_name,
+                         index_list=", ".join("ADD UNIQUE (" + column_name + ")" for column_name in column_names))
+
+    log_query(query)
+    cursor.execute(MySql.USE_DB.format(db_name=db_name))
+    cursor.execute(query)
+
+
+def set_session_checks(cursor, enabled):
+    """
+    Enable or disable the unique and foreign key checks of the current session. Disabling them speeds up loading
+    data that is known to be consistent
+    :param cursor: SQL connector cursor
+    :param enabled: If False, unique_checks and foreign_key_checks are turned off, otherwise they are turned back on
+    :return: none
+    """
+    query = MySql.SET_SESSION_CHECKS.format(value=int(bool(enabled)))
+
+    log_query(query)
+    cursor.execute(query)
+
+
+def start_transaction(cursor):
+    """
+    Start a transaction on the cursor's connection. Note that DDL statements, such as CREATE TABLE, implicitly
+    commit it
+    :param cursor: SQL connector cursor
+    :return: none
+    """
+    log_query(MySql.START_TRANSACTION)
+    cursor.execute(MySql.START_TRANSACTION)
+
+
+def create_savepoint(cursor, name):
+    """
+    Mark a savepoint in the current transaction
+    :param cursor: SQL connector cursor
+    :param name: Name of the savepoint
+    :return: none
+    """
+    query = MySql.SAVEPOINT.format(name=name)
+
+    log_query(query)
+    cursor.execute(query)
+
+
+def rollback_to_savepoint(cursor, name):
+    """
+    Undo the work done in the current transaction since a savepoint, keeping the work done before it
+    :param cursor: SQL connector cursor
+    :param name: Name of the savepoint
+    :return: none
+    """
+    query = MySql.ROLLBACK_TO_SAVEPOINT.format(name=name)
+
+    log_query(query)
+    cursor.execute(query)
+
+
+def release_savepoint(cursor, name):
+    """
+    Remove a savepoint from the current transaction, keeping the work done since it
+    :param cursor: SQL connector cursor
+    :param name: Name of the savepoint
+    :return: none
+    """
+    query = MySql.RELEASE_SAVEPOINT.format(name=name)
+
+    log_query(query)
+    cursor.execute(query)
+
+
+def drop_table(cursor, db_name, table_name):
+    """
+    Drop the specified table if it exists
+    :param cursor: SQL connector cursor
+    :param db_name: Name of database containing the table
+    :param table_name: Name of table to drop
+    :return: none
+    """
+    query = MySql.DROP_TABLE
+    query = query.format(table_name=table_name)
+
+    log_query(query)
     cursor.execute(MySql.USE_DB.format(db_name=db_name))
     cursor.execute(query)
 
@@ -96,42 +243,386 @@ def get_insert_rows_field_data(row_data):
     )
 
 
-def insert_rows(cursor, connection, db_name, table_name, column_names, row_data):
+def get_row_batches(row_data, batch_rows=BATCH_ROWS, batch_bytes=BATCH_BYTES):
+    """
+    Lazily group rows into batches whose query segments stay within :param batch_rows rows and :param batch_bytes
+    bytes. A single row larger than :param batch_bytes is yielded in a batch of its own
+    :param row_data: Iterable of rows. Can be a generator, only one batch is held in memory at a time
+    :param batch_rows: Maximum number of rows in a batch. None or 0 means no limit
+    :param batch_bytes: Maximum size, in bytes, of the row segments of a batch. None or 0 means no limit
+    :return: Generator of (list of row query segments, list of rows) tuples e.g. (["(1, 'a')", "(2, 'b')"],
+    [[1, "'a'"], [2, "'b'"]])
+    """
+    segments = []
+    rows = []
+    segment_bytes = 0
+
+    for row in row_data:
+        segment = "(" + ", ".join(map(str, row)) + ")"
+        size = len(segment.encode("utf-8")) + 2
+
+        if segments and ((batch_rows and len(segments) >= batch_rows) or
+                         (batch_bytes and segment_bytes + size > batch_bytes)):
+            yield segments, rows
+            segments = []
+            rows = []
+            segment_bytes = 0
+
+        segments.append(segment)
+        rows.append(row)
+        segment_bytes += size
+
+    if segments:
+        yield segments, rows
+
+
+def get_insert_batches(row_data, batch_rows=BATCH_ROWS, batch_bytes=BATCH_BYTES):
+    """
+    Lazily group rows into batches whose query segments stay within :param batch_rows rows and :param batch_bytes
+    bytes. A single row larger than :param batch_bytes is yielded in a batch of its own
+    :param row_data: Iterable of rows. Can be a generator, only one batch is held in memory at a time
+    :param batch_rows: Maximum number of rows in a batch. None or 0 means no limit
+    :param batch_bytes: Maximum size, in bytes, of the row segments of a batch. None or 0 means no limit
+    :return: Generator of (row query segments, number of rows) tuples e.g. ("(1, 'a'), (2, 'b')", 2)
+    """
+    for segments, _ in get_row_batches(row_data, batch_rows, batch_bytes):
+        yield ", ".join(segments), len(segments)
+
+
+def get_placeholder_rows(row_count, column_count):
+    """
+    Generates the parameter placeholders of the rows of an INSERT statement
+    :param row_count: Number of rows
+    :param column_count: Number of columns
+    :return: Row placeholders like '(%s, %s), (%s, %s)'
+    """
+    return ", ".join(["(" + ", ".join(["%s"] * column_count) + ")"] * row_count)
+
+
+def get_compiled_insert_batches(row_data, batch_rows=BATCH_ROWS, batch_bytes=BATCH_BYTES):
+    """
+    Alternative to get_insert_batches sorting rows by their cells. Batches whose rows all hold literal values only are
+    returned as statement parameters, batches with at least one row containing a SQL expression (e.g. now()) as SQL
+    text. Besides :param batch_rows and :param batch_bytes, a batch is limited to the 65535 parameters a prepared
+    statement can bind
+    :param row_data: Iterable of rows. Can be a generator, only one batch is held in memory at a time
+    :param batch_rows: Maximum number of rows in a batch. None or 0 means no limit
+    :param batch_bytes: Approximate maximum size, in bytes, of the values of a batch. None or 0 means no limit
+    :return: Generator of (row query segments, number of rows, parameters) tuples. Batches of literal rows have None
+    as segments and the flattened values of their rows as parameters e.g. (None, 2, ["1", "a", "2", "b"]), the others
+    have None as parameters e.g. ("(1, now()), (2, 'b')", 2, None)
+    """
+    compiler = CellCompiler()
+    rows = []
+    params = []
+    literal_rows = True
+    batch_size = 0
+    max_rows = None
+
+    def get_batches():
+        if literal_rows:
+            return [(None, len(rows), params)]
+
+        return [(row_values, row_count, None) for row_values, row_count in get_insert_batches(rows, None, batch_bytes)]
+
+    for row in row_data:
+        if max_rows is None:
+            max_rows = max(1, MAX_PREPARED_PARAMS // max(1, len(row)))
+            if batch_rows:
+                max_rows = min(max_rows, batch_rows)
+
+        values = compiler.compile_row(row)
+        size = len(str(row))
+        if rows and (len(rows) >= max_rows or (batch_bytes and batch_size + size > batch_bytes)):
+            yield from get_batches()
+            rows = []
+            params = []
+            literal_rows = True
+            batch_size = 0
+
+        rows.append(row)
+        batch_size += size
+        if values is None:
+            literal_rows = False
+        elif literal_rows:
+            params.extend(values)
+
+    if rows:
+        yield from get_batches()
+
+
+def get_prepared_insert(statements, connection, table_name, column_names, row_count):
+    """
+    Returns the INSERT statement binding :param row_count rows and the cursor it is prepared on. mysql-connector keeps
+    one prepared statement per cursor and only reuses it when the same query object is executed again, so each cached
+    statement has its own cursor. The least recently added statement is closed once the cache is full
+    :param statements: Map from number of rows to tuple (query, prepared cursor), filled by this function
+    :param connection: SQL connection object
+    :param table_name: Name of table in which to insert rows
+    :param column_names: Ordered collection of columns in which to perform insertion
+    :param row_count: Number of rows bound by the statement
+    :return: Tuple (query, prepared cursor)
+    """
+    if row_count not in statements:
+        if len(statements) >= PREPARED_STATEMENT_CACHE_SIZE:
+            statements.pop(next(iter(statements)))[1].close()
+
+        query = MySql.INSERT_ROWS.format(table_name=table_name,
+                                         column_names=", ".join(column_names),
+                                         row_values=get_placeholder_rows(row_count, len(column_names)))
+        statements[row_count] = query, connection.cursor(prepared=True)
+
+    return statements[row_count]
+
+
+def insert_rows_isolating(cursor, table_name, column_names, row_data, rejects, query=None):
+    """
+    Insert rows with a single INSERT statement run after a savepoint. If the server rejects the statement, the work is
+    rolled back to the savepoint and both halves of the rows are retried the same way, until the rows causing errors
+    are isolated and handed to :param rejects. Errors caused by the connection rather than the rows are raised
+    :param cursor: SQL connection cursor. Its connection must be in a transaction i.e. without autocommit
+    :param table_name: Name of table in which to insert rows
+    :param column_names: Ordered collection of columns in which to perform insertion
+    :param row_data: List of rows. Must match order of :param column_names
+    :param rejects: exql.rejects.RejectWriter receiving each rejected row with its error
+    :param query: INSERT statement of :param row_data, if already built
+    :return: Number of rows inserted
+    """
+    if query is None:
+        query = MySql.INSERT_ROWS.format(table_name=table_name,
+                                         column_names=", ".join(column_names),
+                                         row_values=get_insert_rows_field_data(row_data))
+
+    create_savepoint(cursor, ISOLATION_SAVEPOINT)
+    try:
+        log_query(query)
+        cursor.execute(query)
+    except mysql.connector.DatabaseError as e:
+        if isinstance(e, mysql.connector.OperationalError):
+            raise
+
+        rollback_to_savepoint(cursor, ISOLATION_SAVEPOINT)
+        if len(row_data) == 1:
+            rejects.write(row_data[0], e)
+            return 0
+
+        middle = len(row_data) // 2
+        return insert_rows_isolating(cursor, table_name, column_names, row_data[:middle], rejects) + \
+            insert_rows_isolating(cursor, table_name, column_names, row_data[middle:], rejects)
+
+    release_savepoint(cursor, ISOLATION_SAVEPOINT)
+    return len(row_data)
+
+
+def insert_rows_batched(cursor, connection, db_name, table_name, column_names, row_data, batch_rows=BATCH_ROWS,
+                        batch_bytes=BATCH_BYTES, commit_interval=1, metrics=None, prepared=False, checkpoint=None,
+                        rejects=None):
     """
-    Insert one or more rows in the specified table
+    Insert rows in the specified table using multiple bounded INSERT statements instead of a single one. Rows are
+    consumed lazily so memory use depends on the batch size and not on the number of rows
     :param cursor: SQL connection cursor
     :param connection: SQL connection object
     :param db_name: Name of database
     :param table_name: Name of table in which to insert rows
     :param column_names: Tuple of columns in which to perform insertion
-    :param row_data: List of tuples representing rows. Must match order of :param column_names
-    :return: none
+    :param row_data: Iterable (e.g. generator) of rows. Must match order of :param column_names
+    :param batch_rows: Maximum number of rows per INSERT statement
+    :param batch_bytes: Maximum size, in bytes, of the values of an INSERT statement. Should be kept below the server's
+    max_allowed_packet
+    :param commit_interval: Commit after every :param commit_interval statements. None or 0 leaves committing to the
+    caller
+    :param metrics: Optional Metrics instance recording the time spent building, executing and committing statements
+    and the rows and bytes sent
+    :param prepared: If True, rows holding only literal values are inserted with server-side prepared statements
+    binding the values as parameters, which the server does not have to parse. Rows containing SQL expressions are
+    still sent as SQL text
+    :param checkpoint: Optional exql.checkpoint.Checkpoint recording the rows committed by each commit
+    :param rejects: Optional exql.rejects.RejectWriter. If provided, the rows of a batch rejected by the server are
+    isolated with insert_rows_isolating and written to it, while the other rows are still inserted. Statements are
+    then always sent as SQL text, :param prepared is not used
+    :return: Number of rows inserted
     """
-    query = MySql.INSERT_ROWS
-    query = query.format(table_name=table_name,
-                         column_names=", ".join(column_names),
-                         row_values=get_insert_rows_field_data(row_data))
+    if rejects:
+        batches = ((", ".join(segments), len(rows), None, rows)
+                   for segments, rows in get_row_batches(row_data, batch_rows, batch_bytes))
+    elif prepared:
+        batches = ((row_values, row_count, params, None)
+                   for row_values, row_count, params in get_compiled_insert_batches(row_data, batch_rows, batch_bytes))
+    else:
+        batches = ((row_values, row_count, None, None)
+                   for row_values, row_count in get_insert_batches(row_data, batch_rows, batch_bytes))
+
+    return insert_batches(cursor, connection, db_name, table_name, column_names, batches, commit_interval, metrics,
+                          checkpoint, rejects)
+
+
+def insert_batches(cursor, connection, db_name, table_name, column_names, batches, commit_interval=1, metrics=None,
+                   checkpoint=None, rejects=None):
+    """
+    Execute an INSERT statement per batch of rows, in order
+    :param cursor: SQL connection cursor
+    :param connection: SQL connection object
+    :param db_name: Name of database
+    :param table_name: Name of table in which to insert rows
+    :param column_names: Tuple of columns in which to perform insertion
+    :param batches: Iterable (e.g. generator) of (row query segments, number of rows, parameters, rows) tuples. Batches
+    with parameters are bound to a prepared statement, batches with rows are inserted with insert_rows_isolating and
+    the others are sent as SQL text, see insert_rows_batched
+    :param commit_interval: Commit after every :param commit_interval statements. None or 0 leaves committing to the
+    caller
+    :param metrics: Optional Metrics instance recording the time spent building, executing and committing statements
+    and the rows and bytes sent
+    :param checkpoint: Optional exql.checkpoint.Checkpoint recording the rows committed by each commit
+    :param rejects: Optional exql.rejects.RejectWriter receiving the rows rejected by insert_rows_isolating
+    :return: Number of rows inserted
+    """
+    cursor.execute(MySql.USE_DB.format(db_name=db_name))
+
+    batches = iter(batches)
+    total_rows = 0
+    uncommitted = 0
+    statements = dict()
+    try:
+        while True:
+            with measure(metrics, Metrics.BUILD, table_name):
+                batch = next(batches, None)
+                if batch is None:
+                    break
+
+                row_values, row_count, params, rows = batch
+                if params is None:
+                    query = MySql.INSERT_ROWS.format(table_name=table_name,
+                                                     column_names=", ".join(column_names),
+                                                     row_values=row_values)
+                    statement_cursor = cursor
+                else:
+                    query, statement_cursor = get_prepared_insert(statements, connection, table_name, column_names,
+                                                                  row_count)
+
+            inserted_rows = row_count
+            with measure(metrics, Metrics.EXECUTE, table_name):
+                if rows is not None:
+                    inserted_rows = insert_rows_isolating(cursor, table_name, column_names, rows, rejects, query)
+                elif params is None:
+                    log_query(query)
+                    statement_cursor.execute(query)
+                else:
+                    log_query(query)
+                    statement_cursor.execute(query, params)
+
+            if metrics:
+                metrics.record("rows", table_name, inserted_rows)
+                metrics.record("bytes", table_name, len(query) if params is None else
+                               sum(len(value) if isinstance(value, str) else 8 for value in params))
+
+            total_rows += inserted_rows
+            uncommitted += 1
+            if checkpoint:
+                checkpoint.add(row_count)
+
+            if commit_interval and uncommitted >= commit_interval:
+                commit_with_checkpoint(connection, cursor, checkpoint, metrics, table_name)
+                uncommitted = 0
+    finally:
+        for _, statement_cursor in statements.values():
+            statement_cursor.close()
+
+    if commit_interval and uncommitted:
+        commit_with_checkpoint(connection, cursor, checkpoint, metrics, table_name)
+
+    return total_rows
+
+
+def commit_with_checkpoint(connection, cursor, checkpoint=None, metrics=None, table_name=None):
+    """
+    Commit the current transaction, recording the rows it commits in :param checkpoint if provided
+    :param connection: SQL connection object
+    :param cursor: SQL connection cursor of the transaction
+    :param checkpoint: Optional exql.checkpoint.Checkpoint counting the rows written in the transaction
+    :param metrics: Optional Metrics instance recording the time spent committing
+    :param table_name: Name of table the metrics are recorded for
+    :return: None
+    """
+    with measure(metrics, Metrics.COMMIT, table_name):
+        if checkpoint:
+            checkpoint.before_commit(cursor)
+
+        connection.commit()
+
+    if checkpoint:
+        checkpoint.after_commit()
+
+
+def load_data_local_infile(cursor, connection, db_name, table_name, column_names, file_path, commit=True):
+    """
+    Bulk load a tab separated file from the client machine into the specified table using LOAD DATA LOCAL INFILE. The
+    connection must have been opened with allow_local_infile=True
+    :param cursor: SQL connection cursor
+    :param connection: SQL connection object
+    :param db_name: Name of database
+    :param table_name: Name of table in which to load rows
+    :param column_names: Ordered collection of columns matching the fields of the file
+    :param file_path: Path of the file. Fields are tab separated, escaped with backslashes and NULL is written as \\N
+    :param commit: If True, commit once the file is loaded
+    :return: Number of rows loaded
+    """
+    query = MySql.LOAD_DATA_LOCAL_INFILE
+    query = query.format(file_path=str(file_path).replace("\\", "\\\\").replace("'", "\\'"),
+                         table_name=table_name,
+                         column_names=", ".join(column_names))
 
-    logger.info(query)
+    log_query(query)
     cursor.execute(MySql.USE_DB.format(db_name=db_name))
     cursor.execute(query)
-    connection.commit()
+    if commit:
+        connection.commit()
+
+    return cursor.rowcount
+
+
+def get_warnings(cursor, limit=5):
+    """
+    Returns the warnings raised by the last statement run on :param cursor e.g. rows skipped or values truncated by
+    LOAD DATA LOCAL INFILE, which does not fail on such rows
+    :param cursor: SQL connection cursor
+    :param limit: Maximum number of warnings to return
+    :return: List of (level, code, message) tuples
+    """
+    cursor.execute(MySql.SHOW_WARNINGS.format(limit=limit))
+    return [tuple(row) for row in cursor.fetchall()]
 
 
-def select_rows(cursor, db_name, select_query):
+def select_rows(cursor, db_name, select_query, params=None):
     """
     Select rows using provided :param select_query
     :param cursor: SQL connection cursor
     :param db_name: Name of database
     :param select_query: Full select query to be used for selection e.g "SELECT * FROM myTable LIMIT 100;"
+    :param params: Optional values bound to the %s placeholders of :param select_query
     :return:
     """
     query = MySql.SELECT_ROWS
     query = query.format(select_query=select_query)
 
-    logger.info(query)
+    log_query(query)
     cursor.execute(MySql.USE_DB.format(db_name=db_name))
-    cursor.execute(query)
+    cursor.execute(query, params)
+
+
+def fetch_row_batches(cursor, batch_size):
+    """
+    Lazily fetch the result of the last executed query in batches of :param batch_size rows. Used with an unbuffered
+    cursor, rows are streamed from the server as they are consumed instead of being read into memory all at once
+    :param cursor: SQL connection cursor on which a SELECT query has been executed
+    :param batch_size: Number of rows to fetch at a time
+    :return: Generator of lists of rows
+    """
+    while True:
+        row_batch = cursor.fetchmany(batch_size)
+        if not row_batch:
+            break
+
+        yield row_batch
 
 
 def get_delete_rows_data(column_names, row_deletion_data):
@@ -170,12 +661,120 @@ def delete_rows(cursor, connection, db_name, table_name, column_names, row_delet
     query = query.format(table_name=table_name,
                          row_values=get_delete_rows_data(column_names, row_deletion_data))
 
-    logger.info(query)
+    log_query(query)
     cursor.execute(MySql.USE_DB.format(db_name=db_name))
     cursor.execute(query)
     connection.commit()
 
 
+def delete_rows_batched(cursor, connection, db_name, table_name, column_names, row_deletion_data, batch_rows=BATCH_ROWS,
+                        batch_bytes=BATCH_BYTES):
+    """
+    Delete rows which match values provided in :param row_deletion_data using bounded statements of the form
+    "DELETE FROM table WHERE (col1, col2) IN ((valA, valB), (valX, valY))", committing after each statement
+    :param cursor: SQL connection cursor
+    :param connection: SQL connection object
+    :param db_name: Name of database
+    :param table_name: Name of table from which to delete
+    :param column_names: Ordered collection of column_names to use for matching
+    :param row_deletion_data: Iterable (e.g. generator) of tuples matching the :param column_names ordering
+    :param batch_rows: Maximum number of keys per DELETE statement
+    :param batch_bytes: Maximum size, in bytes, of the keys of a DELETE statement
+    :return: Number of rows deleted
+    """
+    cursor.execute(MySql.USE_DB.format(db_name=db_name))
+
+    deleted_rows = 0
+    for row_values, _ in get_insert_batches(row_deletion_data, batch_rows, batch_bytes):
+        query = MySql.DELETE_ROWS_IN.format(table_name=table_name,
+                                            column_names=", ".join(column_names),
+                                            row_values=row_values)
+
+        log_query(query)
+        cursor.execute(query)
+        deleted_rows += cursor.rowcount
+        connection.commit()
+
+    return deleted_rows
+
+
+def create_staging_table(cursor, db_name, staging_table_name, table_name, column_names, index_columns=False):
+    """
+    Create (or recreate) an empty temporary table with the same definition as the :param column_names columns of
+    :param table_name, plus an auto-increment row id column named STAGING_ROW_ID_COLUMN. Temporary tables are only
+    visible to the connection that created them
+    :param cursor: SQL connection cursor
+    :param db_name: Name of database
+    :param staging_table_name: Name of temporary table to create
+    :param table_name: Name of table whose column definitions are copied
+    :param column_names: Ordered collection of columns to copy
+    :param index_columns: If True, the copied columns are also indexed, so that joins of :param table_name on them
+    (e.g. the anti-join of delete_unstaged_rows) look staged rows up by index. The columns must be indexable, as the
+    columns of a key of :param table_name are
+    :return: None
+    """
+    cursor.execute(MySql.USE_DB.format(db_name=db_name))
+    cursor.execute(MySql.DROP_TEMPORARY_TABLE.format(table_name=staging_table_name))
+
+    key_index = ", INDEX (" + ", ".join(column_names) + ")" if index_columns else ""
+    query = MySql.CREATE_STAGING_TABLE.format(staging_table_name=staging_table_name,
+                                              row_id_column=STAGING_ROW_ID_COLUMN,
+                                              key_index=key_index,
+                                              column_names=", ".join(column_names),
+                                              table_name=table_name)
+    log_query(query)
+    cursor.execute(query)
+
+
+def delete_rows_staged(cursor, connection, db_name, table_name, column_names, row_deletion_data, batch_rows=BATCH_ROWS,
+                       batch_bytes=BATCH_BYTES):
+    """
+    Delete rows which match values provided in :param row_deletion_data by loading the values into a temporary
+    staging table and deleting the matching rows with DELETE ... JOIN, :param batch_rows staged keys at a time, with a
+    commit after each chunk
+    :param cursor: SQL connection cursor
+    :param connection: SQL connection object
+    :param db_name: Name of database
+    :param table_name: Name of table from which to delete
+    :param column_names: Ordered collection of column_names to use for matching
+    :param row_deletion_data: Iterable (e.g. generator) of tuples matching the :param column_names ordering
+    :param batch_rows: Number of keys staged per INSERT statement and deleted per DELETE statement
+    :param batch_bytes: Maximum size, in bytes, of the keys of a staging INSERT statement
+    :return: Number of rows deleted
+    """
+    staging_table_name = "exql_delete_keys"
+    row_id_column = STAGING_ROW_ID_COLUMN
+
+    create_staging_table(cursor, db_name, staging_table_name, table_name, column_names)
+
+    try:
+        insert_rows_batched(cursor, connection, db_name, staging_table_name, column_names, row_deletion_data,
+                            batch_rows, batch_bytes, commit_interval=None)
+
+        cursor.execute(MySql.GET_MAX_VALUE.format(column_name=row_id_column, table_name=staging_table_name))
+        last_row_id = cursor.fetchone()[0] or 0
+
+        join_condition = " AND ".join(table_name + "." + column + " = " + staging_table_name + "." + column
+                                      for column in column_names)
+        deleted_rows = 0
+        for lower in range(0, last_row_id, batch_rows or last_row_id):
+            query = MySql.DELETE_STAGED_ROWS.format(table_name=table_name,
+                                                    staging_table_name=staging_table_name,
+                                                    join_condition=join_condition,
+                                                    row_id_column=row_id_column,
+                                                    lower=lower,
+                                                    upper=lower + (batch_rows or last_row_id))
+
+            log_query(query)
+            cursor.execute(query)
+            deleted_rows += cursor.rowcount
+            connection.commit()
+    finally:
+        cursor.execute(MySql.DROP_TEMPORARY_TABLE.format(table_name=staging_table_name))
+
+    return deleted_rows
+
+
 def get_all_table_names(cursor, db_name):
     """
     Returns names of all the tables present in the specified DB
@@ -186,8 +785,271 @@ def get_all_table_names(cursor, db_name):
     query = "SELECT table_name FROM information_schema.tables WHERE table_schema = '{db_name}';"
     query = query.format(db_name=db_name)
 
-    logger.info(query)
+    log_query(query)
+    cursor.execute(query)
+
+
+def get_table_row_estimates(cursor, db_name):
+    """
+    Returns the names of all the tables present in the specified DB along with the row count estimated by the server
+    :param cursor: DB connection cursor
+    :param db_name: Name of Database in which to check tables
+    :return: List of tuples (table name, estimated number of rows)
+    """
+    query = MySql.GET_TABLE_ROW_ESTIMATES
+    query = query.format(db_name=db_name)
+
+    log_query(query)
+    cursor.execute(query)
+    return [(table_name, table_rows or 0) for table_name, table_rows in cursor.fetchall()]
+
+
+def get_table_states(cursor, db_name):
+    """
+    Returns the last update time and estimated row count of all the tables of the specified DB, as reported by
+    information_schema. The update time is None when the server does not know it, e.g. for InnoDB tables not modified
+    since the server started. MySQL 8 caches these statistics for information_schema_stats_expiry seconds (a day by
+    default), so the cache is bypassed for this read by setting the variable to 0 for the session
+    :param cursor: DB connection cursor
+    :param db_name: Name of Database in which to check tables
+    :return: Map from table name to tuple (update time or None, estimated number of rows)
+    """
+    query = MySql.GET_TABLE_STATES
+    query = query.format(db_name=db_name)
+
+    try:
+        cursor.execute(MySql.SET_STATS_EXPIRY.format(value=0))
+        stats_expiry_set = True
+    except mysql.connector.Error:
+        # Servers older than MySQL 8 do not cache the statistics and have no such variable
+        stats_expiry_set = False
+
+    log_query(query)
+    cursor.execute(query)
+    table_states = {table_name: (update_time, table_rows or 0)
+                    for table_name, update_time, table_rows in cursor.fetchall()}
+
+    if stats_expiry_set:
+        cursor.execute(MySql.SET_STATS_EXPIRY.format(value="DEFAULT"))
+
+    return table_states
+
+
+def get_table_checksum(cursor, db_name, table_name):
+    """
+    Returns the live checksum of a table computed by CHECKSUM TABLE, which reads the whole table
+    :param cursor: DB connection cursor
+    :param db_name: Name of database containing the table
+    :param table_name: Name of the table
+    :return: Checksum, None if the table does not exist
+    """
+    query = MySql.CHECKSUM_TABLE
+    query = query.format(table_name=table_name)
+
+    log_query(query)
+    cursor.execute(MySql.USE_DB.format(db_name=db_name))
+    cursor.execute(query)
+    row = cursor.fetchone()
+    return row[1] if row else None
+
+
+def get_max_value(cursor, db_name, table_name, column_name):
+    """
+    Returns the largest value of a column
+    :param cursor: DB connection cursor
+    :param db_name: Name of database containing the table
+    :param table_name: Name of the table
+    :param column_name: Name of the column
+    :return: Largest value, None if the table is empty
+    """
+    query = MySql.GET_MAX_VALUE
+    query = query.format(column_name=column_name, table_name=table_name)
+
+    log_query(query)
+    cursor.execute(MySql.USE_DB.format(db_name=db_name))
+    cursor.execute(query)
+    return cursor.fetchone()[0]
+
+
+def get_range_checksum(cursor, db_name, table_name, column_names, key_column, upper):
+    """
+    Returns the number of rows of a table whose :param key_column is at most :param upper, along with the sum of the
+    CRC32 of their values. Unlike CHECKSUM TABLE, only the rows of the range are compared, so rows appended above it do
+    not change the result while rows updated or deleted within it do
+    :param cursor: DB connection cursor
+    :param db_name: Name of database containing the table
+    :param table_name: Name of the table
+    :param column_names: Columns of the table, whose values are summed
+    :param key_column: Column bounding the range e.g. a watermark column
+    :param upper: Inclusive upper bound of the range
+    :return: Checksum as a string e.g. "42:90210311563"
+    """
+    query = MySql.GET_RANGE_CHECKSUM
+    query = query.format(column_list=", ".join(column + ", ISNULL(" + column + ")" for column in column_names),
+                         table_name=table_name,
+                         key_column=key_column)
+
+    log_query(query)
+    cursor.execute(MySql.USE_DB.format(db_name=db_name))
+    cursor.execute(query, (upper,))
+    row_count, crc_sum = cursor.fetchone()
+    return str(row_count) + ":" + str(crc_sum or 0)
+
+
+def get_next_keyset_boundary(cursor, db_name, table_name, key_column, after_value, page_rows):
+    """
+    Returns the key value :param page_rows rows after :param after_value using keyset pagination on :param key_column,
+    i.e. the last key of the next page of rows
+    :param cursor: DB connection cursor
+    :param db_name: Name of database
+    :param table_name: Name of table
+    :param key_column: Indexed, unique column used for pagination e.g. the primary key
+    :param after_value: Last key of the previous page. None for the first page
+    :param page_rows: Number of rows in a page
+    :return: Last key of the page, or None if less than :param page_rows rows remain
+    """
+    if after_value is None:
+        query = MySql.GET_FIRST_KEYSET_BOUNDARY
+        params = None
+    else:
+        query = MySql.GET_NEXT_KEYSET_BOUNDARY
+        params = (after_value,)
+
+    query = query.format(table_name=table_name, key_column=key_column, offset=page_rows - 1)
+    select_rows(cursor, db_name, query, params)
+
+    row = cursor.fetchone()
+    cursor.fetchall()
+    return row[0] if row else None
+
+
+def get_schema_columns(cursor, db_name):
+    """
+    Returns the columns of all the tables of the specified DB, read with a single query
+    :param cursor: DB connection cursor
+    :param db_name: Name of Database
+    :return: Map from table name to list of (column name, data type) tuples in column order e.g.
+    {"student": [("id", "int"), ("name", "varchar")]}
+    """
+    query = MySql.GET_SCHEMA_COLUMNS
+    query = query.format(db_name=db_name)
+
+    log_query(query)
+    cursor.execute(query)
+
+    columns = dict()
+    for table_name, column_name, data_type in cursor.fetchall():
+        columns.setdefault(table_name, []).append((column_name, data_type.lower()))
+
+    return columns
+
+
+def get_schema_unique_indexes(cursor, db_name):
+    """
+    Returns the unique indexes of all the tables of the specified DB, read with a single query
+    :param cursor: DB connection cursor
+    :param db_name: Name of Database
+    :return: Map from table name to list of (index name, list of column names in index order) tuples, the primary key
+    coming first
+    """
+    query = MySql.GET_SCHEMA_UNIQUE_INDEX_COLUMNS
+    query = query.format(db_name=db_name)
+
+    log_query(query)
+    cursor.execute(query)
+
+    indexes = dict()
+    for table_name, index_name, column_name in cursor.fetchall():
+        table_indexes = indexes.setdefault(table_name, [])
+        if not table_indexes or table_indexes[-1][0] != index_name:
+            table_indexes.append((index_name, []))
+
+        table_indexes[-1][1].append(column_name)
+
+    return indexes
+
+
+def get_lower_case_table_names(cursor):
+    """
+    Returns the lower_case_table_names setting of the server
+    :param cursor: DB connection cursor
+    :return: 0 if table names are case sensitive. 1 or 2 if they are compared in lower case
+    """
+    query = MySql.GET_LOWER_CASE_TABLE_NAMES
+
+    log_query(query)
+    cursor.execute(query)
+    row = cursor.fetchone()
+    cursor.fetchall()
+    return int(row[0] or 0) if row else 0
+
+
+def upsert_rows(cursor, db_name, table_name, column_names, key_columns, row_values):
+    """
+    Insert rows, updating the non-key columns of rows whose primary or unique key already exists
+    :param cursor: SQL connection cursor
+    :param db_name: Name of database
+    :param table_name: Name of table in which to insert rows
+    :param column_names: Ordered collection of columns in which to perform insertion
+    :param key_columns: Columns of the key used to detect existing rows. They are not updated
+    :param row_values: Row query segments as generated by get_insert_batches e.g. "(1, 'a'), (2, 'b')"
+    :return: None
+    """
+    update_columns = [column for column in column_names if column not in key_columns] or list(key_columns[:1])
+
+    query = MySql.UPSERT_ROWS
+    query = query.format(table_name=table_name,
+                         column_names=", ".join(column_names),
+                         row_values=row_values,
+                         update_list=", ".join(column + " = VALUES(" + column + ")" for column in update_columns))
+
+    log_query(query)
+    cursor.execute(MySql.USE_DB.format(db_name=db_name))
+    cursor.execute(query)
+
+
+def select_rows_by_keys(cursor, db_name, table_name, column_names, key_columns, key_values):
+    """
+    Select the :param column_names columns of the rows whose key is one of :param key_values
+    :param cursor: SQL connection cursor
+    :param db_name: Name of database
+    :param table_name: Name of table
+    :param column_names: Ordered collection of columns to select
+    :param key_columns: Ordered collection of key columns
+    :param key_values: Key query segments as generated by get_insert_batches e.g. "(1, 'a'), (2, 'b')"
+    :return: List of rows
+    """
+    query = MySql.SELECT_ROWS_BY_KEYS
+    query = query.format(table_name=table_name,
+                         column_names=", ".join(column_names),
+                         key_columns=", ".join(key_columns),
+                         key_values=key_values)
+
+    select_rows(cursor, db_name, query)
+    return cursor.fetchall()
+
+
+def delete_unstaged_rows(cursor, db_name, table_name, staging_table_name, key_columns):
+    """
+    Delete the rows of a table whose key is not present in a staging table created with create_staging_table
+    :param cursor: SQL connection cursor
+    :param db_name: Name of database
+    :param table_name: Name of table from which to delete
+    :param staging_table_name: Name of temporary table holding the keys to keep
+    :param key_columns: Ordered collection of key columns
+    :return: Number of rows deleted
+    """
+    query = MySql.DELETE_UNSTAGED_ROWS
+    query = query.format(table_name=table_name,
+                         staging_table_name=staging_table_name,
+                         join_condition=" AND ".join(table_name + "." + column + " = " + staging_table_name + "." +
+                                                     column for column in key_columns),
+                         row_id_column=STAGING_ROW_ID_COLUMN)
+
+    log_query(query)
+    cursor.execute(MySql.USE_DB.format(db_name=db_name))
     cursor.execute(query)
+    return cursor.rowcount
 
 
 if __name__ == '__main__':
@@ -203,8 +1065,6 @@ if __name__ == '__main__':
     # column_name_list = ("student_name", "student_roll")
     # row_data_list = [("\"stua\"", 1253), ("\"stub\"", 5342), ("\"stuc\"", 3856)]
     # 
-    # # insert_rows(local_cursor, local_connection, "myTestDb", "myTestTable", column_name_list, row_data_list)
-    # 
     # # select_rows(local_cursor, "myTestDb", "select * from myTestTable;")
     # 
     # # print(get_delete_rows_data(["a", "b", "c"], [[1, 2, 3], ["\"x\"", "\"y\"", "\"z\""]]))
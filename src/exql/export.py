@@ -0,0 +1,134 @@
+import csv
+import os
+import shutil
+from pathlib import Path
+
+from exql.dao import get_next_keyset_boundary
+from exql.formats import open_text_file
+from exql.logger import logger
+from exql.sql import MySql
+
+
+def get_key_ranges(cursor, db_name, table_name, key_column, shard_rows):
+    """
+    Split a table into consecutive ranges of about :param shard_rows rows of :param key_column using keyset
+    pagination, so that every boundary is found through an index range scan
+    :param cursor: DB connection cursor
+    :param db_name: Name of database
+    :param table_name: Name of table to split
+    :param key_column: Indexed, unique column e.g. a single column primary key
+    :param shard_rows: Number of rows per range
+    :return: List of (lower bound, upper bound) tuples. Lower bounds are exclusive and upper bounds inclusive, None
+    meaning unbounded
+    """
+    boundaries = []
+    boundary = get_next_keyset_boundary(cursor, db_name, table_name, key_column, None, shard_rows)
+    while boundary is not None:
+        boundaries.append(boundary)
+        boundary = get_next_keyset_boundary(cursor, db_name, table_name, key_column, boundary, shard_rows)
+
+    return list(zip([None] + boundaries, boundaries + [None]))
+
+
+def get_key_range_query(table_name, key_column, key_range):
+    """
+    Returns a query selecting the rows of a table whose :param key_column lies in :param key_range
+    :param table_name: Name of table
+    :param key_column: Column on which the range applies
+    :param key_range: (lower bound, upper bound) tuple as returned by get_key_ranges
+    :return: Tuple (query with %s placeholders, parameters)
+    """
+    conditions = []
+    params = []
+    lower, upper = key_range
+
+    if lower is not None:
+        conditions.append(key_column + " > %s")
+        params.append(lower)
+
+    if upper is not None:
+        conditions.append(key_column + " <= %s")
+        params.append(upper)
+
+    where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
+    query = MySql.SELECT_KEY_RANGE.format(table_name=table_name, where_clause=where_clause, key_column=key_column)
+    return query, tuple(params)
+
+
+def get_shard_file_name(file_name, shard_number):
+    """
+    Returns the name of a numbered shard of a file e.g. orders.csv -> orders.part-0001.csv. formats.get_file_stem maps
+    shard names back to the name of the table
+    :param file_name: Name of the complete file e.g. "orders.csv" or "orders.csv.gz"
+    :param shard_number: Number of the shard, starting at 1
+    :return: Name of the shard file
+    """
+    stem, _, suffix = file_name.partition(".")
+    return stem + ".part-" + str(shard_number).zfill(4) + "." + suffix
+
+
+def merge_shard_files(shard_paths, destination_path):
+    """
+    Concatenate shard csv files, all starting with the same header row, into a single csv and remove the shards
+    :param shard_paths: Paths of the shards, in order
+    :param destination_path: Path of the merged file. Must not exist
+    :return: None
+    """
+    destination_path = Path(destination_path)
+    if destination_path.exists():
+        raise Exception(str(destination_path) + " must refer to a valid, non-existing CSV file")
+
+    with open_text_file(destination_path, "w") as destination_file:
+        for shard_number, shard_path in enumerate(shard_paths):
+            with open_text_file(Path(shard_path), "r") as shard_file:
+                header = shard_file.readline()
+                if shard_number == 0:
+                    destination_file.write(header)
+
+                shutil.copyfileobj(shard_file, destination_file)
+
+    for shard_path in shard_paths:
+        Path(shard_path).unlink()
+
+    logger.info("Merged " + str(len(shard_paths)) + " shards into " + str(destination_path))
+
+
+def append_rows_to_csv_file(file_path, row_batches):
+    """
+    Append rows fetched from the database to an existing csv file, without a header row. If writing fails, the file is
+    truncated back to its original size
+    :param file_path: Path object of an existing .csv, .csv.gz or .csv.zst file
+    :param row_batches: Iterable (e.g. generator) of lists of rows fetched from the database
+    :return: Number of rows written
+    """
+    original_size = file_path.stat().st_size
+
+    row_count = 0
+    try:
+        with open_text_file(file_path, "a") as csv_file:
+            csv_writer = csv.writer(csv_file)
+            for row_batch in row_batches:
+                csv_writer.writerows(row_batch)
+                row_count += len(row_batch)
+    except BaseException:
+        os.truncate(file_path, original_size)
+        raise
+
+    logger.info("Appended " + str(row_count) + " rows to " + str(file_path))
+    return row_count
+
+
+def is_table_unchanged(previous_entry, entry, checksum=False):
+    """
+    Compare the state of a table with the one recorded when it was last exported
+    :param previous_entry: Export manifest entry recorded by the previous run
+    :param entry: Export manifest entry of the table's current state
+    :param checksum: If True, tables are compared by CHECKSUM TABLE value. Otherwise the update time and row count
+    reported by information_schema are compared, and tables with an unknown update time are considered changed
+    :return: True if the table did not change since the previous export
+    """
+    if checksum:
+        return previous_entry.get("checksum") is not None and previous_entry.get("checksum") == entry["checksum"]
+
+    return entry["update_time"] is not None and previous_entry.get("update_time") == entry["update_time"] and \
+        previous_entry.get("table_rows") == entry["table_rows"]
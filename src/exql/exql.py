@@ -1,10 +1,31 @@
 from exql.dao import *
 import csv
+import threading
+import time
 import xlrd
+from exql.bulk import bulk_insert_rows
+from exql.checkpoint import JsonCheckpointStore, TableCheckpointStore
+from exql.export import append_rows_to_csv_file, get_key_range_query, get_key_ranges, get_shard_file_name, \
+    is_table_unchanged, merge_shard_files
+from exql.formats import CSV_SUFFIXES, ROW_READERS, get_file_stem, get_file_suffix, get_format_suffix, \
+    write_batches_to_file
 from exql.logger import logger
-
+from exql.merge import merge_rows
+from exql.manifest import JsonManifest, TableManifest, get_file_fingerprint, get_manifest_changes
+from exql.parallel import CHUNK_BYTES, get_header_end, get_record_ranges, iter_parsed_batches, \
+    load_batches_concurrently
+from exql.pool import ConnectionPool
+from exql.rejects import RejectWriter
+from exql.report import JobReport, TableResult
+from exql.schema import SCHEMA_TTL, SchemaCache, format_literal_batches
+from exql.spreadsheet import get_sheet_names, get_sheet_table_name, iter_xls_rows, iter_xlsx_rows
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
 from pathlib import Path
 
+SPREADSHEET_SUFFIXES = (".xls", ".xlsx")
+
 
 def validate_get_csv_fields_for_table_create(file, min_rows):
     """
@@ -14,10 +35,10 @@ def validate_get_csv_fields_for_table_create(file, min_rows):
     :return: True if validated, otherwise throw exception
     """
     if not file.is_file() or file.suffix != ".csv":
-        raise Exception("The provided path " + file + " does not point to a .csv file")
+        raise Exception("The provided path " + str(file) + " does not point to a .csv file")
 
-    csv_file = open(file, "r")
-    row_list = list(csv.reader(csv_file))
+    with open(file, "r") as csv_file:
+        row_list = list(csv.reader(csv_file))
 
     if len(row_list) < min_rows:
         raise Exception(str(file) + " does not possess the required csv structure. Refer to the sample files")
@@ -33,7 +54,7 @@ def validate_get_xls_fields_for_table_create(file, min_rows):
     :return: True if validated, otherwise throw exception
     """
     if not file.is_file() or file.suffix != ".xls":
-        raise Exception("The provided path " + file + " does not point to a .xls file")
+        raise Exception("The provided path " + str(file) + " does not point to a .xls file")
 
     workbook = xlrd.open_workbook(file)
     sheet = workbook.sheet_by_index(0)
@@ -85,11 +106,13 @@ def extract_column_names(row_list):
     return row_list[0]
 
 
-def validate_get_rows(file_path, min_rows):
+def validate_get_rows(file_path, min_rows, header_rows=1):
     """
-    Read .csv or .xls as list of rows
-    :param file_path: Path to .csv or .xls to be read
+    Read .csv, .xls or .xlsx, or a compressed csv, .parquet or .arrow file, as list of rows
+    :param file_path: Path to .csv, .xls or .xlsx to be read
     :param min_rows: Minimum rows needed in the filw
+    :param header_rows: Number of header rows expected at the start of the file. Only used for .parquet and .arrow
+    files, whose header rows are derived from their schema, see formats.iter_columnar_rows
     :return: List of rows
     """
     if file_path.suffix == ".csv":
@@ -98,32 +121,128 @@ def validate_get_rows(file_path, min_rows):
     if file_path.suffix == ".xls":
         return validate_get_xls_fields_for_table_create(file_path, min_rows)
 
+    header_rows, data_rows = validate_get_header_and_rows(file_path, min_rows, max(header_rows, min_rows))
+    return header_rows + list(data_rows)
+
 
-def write_to_new_csv(column_names, destination_dir_path, destination_file_name, row_list):
+def is_table_file(file_path):
     """
-    Write list of rows fetched from the database into a new csv file at the specified location
+    :param file_path: Path object of a file
+    :return: True if tables can be created from the file i.e. it is a .xls/.xlsx workbook or in a format read by one of
+    formats.ROW_READERS e.g. .csv, .csv.gz, .csv.zst, .parquet or .arrow
+    """
+    suffix = get_file_suffix(file_path)
+    return suffix in SPREADSHEET_SUFFIXES or suffix in ROW_READERS
+
+
+def iter_file_rows(file_path, sheet_name=None, header_rows=1):
+    """
+    Lazily read rows of a .csv, .xls or .xlsx file, or of any format of formats.ROW_READERS, one row at a time
+    :param file_path: Path to .csv, .xls or .xlsx to be read
+    :param sheet_name: Name of the sheet to read from a .xls/.xlsx workbook. If None, the first sheet is read
+    :param header_rows: Number of header rows expected at the start of the file. .parquet and .arrow files derive
+    them from their schema
+    :return: Generator of rows
+    """
+    if file_path.suffix == ".xls":
+        yield from iter_xls_rows(file_path, sheet_name)
+
+    elif file_path.suffix == ".xlsx":
+        yield from iter_xlsx_rows(file_path, sheet_name)
+
+    else:
+        yield from ROW_READERS[get_file_suffix(file_path)](file_path, header_rows)
+
+
+def validate_get_header_and_rows(file_path, min_rows, n, sheet_name=None):
+    """
+    Read the first :param n header rows of a .csv, .xls or .xlsx (or of a compressed csv, .parquet or .arrow file) and
+    return them along with a generator of the remaining rows. Unlike validate_get_rows, the body of the file is not
+    read into memory
+    :param file_path: Path to .csv, .xls or .xlsx to be read
+    :param min_rows: Minimum rows needed in the file
+    :param n: Number of header rows at the start of the file
+    :param sheet_name: Name of the sheet to read from a .xls/.xlsx workbook. If None, the first sheet is read
+    :return: Tuple (list of header rows, generator of non-empty body rows)
+    """
+    if not file_path.is_file() or not is_table_file(file_path):
+        raise Exception("The provided path " + str(file_path) + " does not point to a .csv/.xls/.xlsx file, or to a " +
+                        "/".join(ROW_READERS) + " file")
+
+    row_iterator = iter_file_rows(file_path, sheet_name, n)
+    header_rows = list(islice(row_iterator, max(n, min_rows)))
+
+    if len(header_rows) < min_rows:
+        row_iterator.close()
+        raise Exception(str(file_path) + " does not possess the required file structure. Refer to the sample files")
+
+    return header_rows[:n], iter_body_rows(header_rows[n:], row_iterator)
+
+
+def iter_body_rows(read_rows, row_iterator):
+    """
+    Yield the non-empty rows of :param read_rows followed by those of :param row_iterator. Rows whose cells are all
+    empty, such as blank .csv lines or unused spreadsheet rows, are skipped. Closing the returned generator closes
+    :param row_iterator, and with it the underlying file
+    :param read_rows: Body rows already read along with the header rows
+    :param row_iterator: Generator of the remaining rows of the file
+    :return: Generator of non-empty body rows
+    """
+    try:
+        for row in chain(read_rows, row_iterator):
+            if any(cell != "" for cell in row):
+                yield row
+    finally:
+        row_iterator.close()
+
+
+def validate_get_header_rows(file_path, min_rows, n, sheet_name=None):
+    """
+    Check and return only the first :param n header rows of a .csv, .xls or .xlsx. The rest of the file is not read
+    :param file_path: Path to .csv, .xls or .xlsx to be read
+    :param min_rows: Minimum rows needed in the file
+    :param n: Number of header rows at the start of the file
+    :param sheet_name: Name of the sheet to read from a .xls/.xlsx workbook. If None, the first sheet is read
+    :return: List of header rows
+    """
+    header_rows, row_iterator = validate_get_header_and_rows(file_path, min_rows, n, sheet_name)
+    row_iterator.close()
+    return header_rows
+
+
+def write_batches_to_new_csv(column_names, destination_dir_path, destination_file_name, row_batches,
+                             description=None):
+    """
+    Write rows fetched from the database into a new csv file at the specified location, one batch at a time. The
+    format is given by the file name: ".csv.gz" and ".csv.zst" files are gzip and zstd compressed, ".parquet" and
+    ".arrow" files are written one record batch per batch of rows. See formats.BATCH_WRITERS
     :param column_names: List of column names for the table
     :param destination_dir_path: Path of directory where csv should be saved
-    :param destination_file_name: Name to give the file when saving (including extension) e.g. "student_data.csv"
-    :param row_list: List of rows fetched from the database
-    :return: None
+    :param destination_file_name: Name to give the file when saving (including extension) e.g. "student_data.csv",
+    "student_data.csv.gz" or "student_data.parquet"
+    :param row_batches: Iterable (e.g. generator) of lists of rows fetched from the database
+    :param description: Optional cursor.description of the rows, used to type the columns of .parquet and .arrow files
+    :return: Number of rows written
     """
     write_dir_path = Path(destination_dir_path)
     if not write_dir_path.is_dir():
         raise Exception(str(destination_dir_path) + " is not a valid directory")
 
-    destination_dir_path = write_dir_path / destination_file_name
-    write_dir_path = Path(destination_dir_path)
-    if write_dir_path.exists() or write_dir_path.suffix != ".csv":
-        raise Exception(str(write_dir_path) + " must refer to a valid, non-existing CSV file")
+    return write_batches_to_file(write_dir_path / destination_file_name, column_names, row_batches, description)
 
-    write_file = open(write_dir_path, mode='w')
-    csv_writer = csv.writer(write_file)
-    csv_writer.writerow(column_names)
-    csv_writer.writerows(row_list)
-    write_file.close()
 
-    logger.info("Wrote table to " + str(destination_dir_path))
+def write_to_new_csv(column_names, destination_dir_path, destination_file_name, row_list, description=None):
+    """
+    Write list of rows fetched from the database into a new csv file at the specified location
+    :param column_names: List of column names for the table
+    :param destination_dir_path: Path of directory where csv should be saved
+    :param destination_file_name: Name to give the file when saving (including extension) e.g. "student_data.csv"
+    :param row_list: List of rows fetched from the database
+    :param description: Optional cursor.description of the rows, see write_batches_to_new_csv
+    :return: Number of rows written
+    """
+    return write_batches_to_new_csv(column_names, destination_dir_path, destination_file_name, [row_list],
+                                    description)
 
 
 def get_select_all_query(table_name):
@@ -138,8 +257,15 @@ def get_select_all_query(table_name):
 class Exql:
     username = password = host = port = None
     strict_structure = False
-
-    def __init__(self, username, password, host, port=3306, strict_stucture=False):
+    batch_rows = batch_bytes = commit_interval = None
+    bulk_load = all_sheets = prepared = False
+    pool = metrics = reject_dir = parse_workers = schema_cache = None
+    loader_connections = 1
+
+    def __init__(self, username, password, host, port=3306, strict_stucture=False, batch_rows=BATCH_ROWS,
+                 batch_bytes=BATCH_BYTES, commit_interval=1, pool_size=5, health_check_interval=30, bulk_load=False,
+                 metrics=None, all_sheets=False, prepared=False, reject_dir=None, parse_workers=None,
+                 loader_connections=1, schema_ttl=SCHEMA_TTL, connect=open_connection):
         """
         Initialize parameters to be used in connecting with MySQL DB
         :param username: MySQL username
@@ -149,18 +275,73 @@ class Exql:
         :param strict_stucture: This flag determines whether a strict checking is applied in different process. When
         turned on, directories to be converted to DBs must have only .csv/.xls file and no directories. If false, any
         children directories and/or non .csv or non .xls files are ignored
+        :param batch_rows: Maximum number of rows sent in a single INSERT statement
+        :param batch_bytes: Maximum size, in bytes, of the values sent in a single INSERT statement. Should be kept
+        below the server's max_allowed_packet
+        :param commit_interval: Number of INSERT statements after which a commit is issued
+        :param pool_size: Maximum number of pooled connections kept open by this instance
+        :param health_check_interval: Idle time, in seconds, after which a pooled connection is pinged before reuse
+        :param bulk_load: If True, rows containing only literal values are loaded with LOAD DATA LOCAL INFILE instead of
+        INSERT statements. Needs local_infile to be enabled on the server
+        :param metrics: Optional exql.metrics.Metrics instance recording the time spent parsing files, building SQL,
+        executing statements and committing, and the rows and bytes written to each table
+        :param all_sheets: If True, every sheet of a .xls/.xlsx workbook is loaded as its own table, named
+        <file name>_<sheet name> when the workbook has several sheets. Otherwise only the first sheet is loaded
+        :param prepared: If True, rows holding only literal values (numbers, quoted strings and NULL) are inserted with
+        server-side prepared statements, their values being bound as parameters. Rows containing SQL expressions are
+        still inserted as SQL text
+        :param reject_dir: If provided, a batch rejected by the server no longer fails the load. It is split in halves
+        until the failing rows are found, and these rows are written with their error to
+        <reject_dir>/<table name>.rejects.csv while all other rows are inserted. Rows are then always inserted with
+        INSERT statements, bulk_load and prepared are not used
+        :param parse_workers: If provided, .csv files larger than parallel.CHUNK_BYTES are split into ranges of records
+        parsed and turned into INSERT batches by :param parse_workers processes, see insert_csv_parallel. bulk_load and
+        reject_dir are not used for these files. Checkpointed loads being resumed are parsed in a single process
+        :param loader_connections: Only used with :param parse_workers. Number of pooled connections inserting the
+        batches of a file. With more than one connection, rows are no longer inserted in file order, so loads cannot be
+        checkpointed
+        :param schema_ttl: Time, in seconds, for which the tables, columns and keys of a database read from
+        information_schema are cached. None keeps them until invalidated, see exql.schema.SchemaCache
+        :param connect: Function opening the pooled connections, see exql.pool.ConnectionPool. Defaults to
+        dao.open_connection
         """
         self.username = username
         self.password = password
         self.host = host
         self.port = port
         self.strict_structure = strict_stucture
+        self.batch_rows = batch_rows
+        self.batch_bytes = batch_bytes
+        self.commit_interval = commit_interval
+        self.bulk_load = bulk_load
+        self.metrics = metrics
+        self.all_sheets = all_sheets
+        self.prepared = prepared
+        self.reject_dir = reject_dir
+        self.parse_workers = parse_workers
+        self.loader_connections = loader_connections
+        self.schema_cache = SchemaCache(self, schema_ttl)
+        self.pool = ConnectionPool(host, username, password, port, pool_size, health_check_interval, connect,
+                                   allow_local_infile=bulk_load)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Close all connections pooled by this instance
+        :return: None
+        """
+        self.pool.close()
 
-    def validate_and_get_data(self, base_dir):
+    def validate_directory(self, base_dir):
         """
-        Validate is the :param base_dir has the proper structure and returns the list of .csv/.xls files contained
+        Validate if the :param base_dir is an existing directory with the proper structure
         :param base_dir: Path object referencing the directory specified
-        :return: List of .csv/.xls files within the directory
+        :return: None
         """
         if not base_dir.exists() or not base_dir.is_dir():
             raise Exception("The path must point to a valid, existing directory")
@@ -170,172 +351,977 @@ class Exql:
         if self.strict_structure and child_dirs:
             raise Exception("No directories should be present inside the specified directory")
 
-        return self.get_file_map(base_dir)
-
-    def get_file_map(self, base_dir):
+    def get_table_files(self, base_dir):
         """
-        Validate and get map of .csv/.xls file name to list of rows within the csv
+        Validate and get the list of .csv/.xls/.xlsx files within the directory, without reading them
         :param base_dir: Base directory where csvs are stored
-        :return: Map from file name to list of rows in file
+        :return: List of Path objects of .csv/.xls/.xlsx files
         """
         files = [e for e in base_dir.iterdir() if e.is_file()]
-        file_map = dict()
 
+        if self.strict_structure:
+            for file in files:
+                if not is_table_file(file):
+                    raise Exception("Files other than .csv, .xls, .xlsx, .csv.gz, .csv.zst, .parquet or .arrow files "
+                                    "cannot be present in the directory")
+
+        files = [file for file in files if is_table_file(file)]
         if not files:
-            raise Exception("No .csv/.xls files are present in the specified directory")
+            raise Exception("No .csv/.xls/.xlsx files are present in the specified directory")
+
+        return files
 
-        for file in files:
-            if self.strict_structure and (file.suffix != ".csv" and file.suffix != ".xls"):
-                raise Exception("Files other than .csv or .xls files cannot be present in the directory")
+    def get_file_tables(self, file_path):
+        """
+        Returns the tables to create from a file. A .csv gives a single table, as does a workbook unless all_sheets is
+        set, in which case every sheet gives a table
+        :param file_path: Path object of a .csv/.xls/.xlsx file
+        :return: List of tuples (table name, sheet name or None for the first sheet)
+        """
+        if not self.all_sheets or file_path.suffix not in SPREADSHEET_SUFFIXES:
+            return [(get_file_stem(file_path), None)]
+
+        sheet_names = get_sheet_names(file_path)
+        if len(sheet_names) == 1:
+            return [(get_file_stem(file_path), sheet_names[0])]
+
+        return [(get_sheet_table_name(file_path, sheet_name), sheet_name) for sheet_name in sheet_names]
+
+    def get_table_sources(self, base_dir):
+        """
+        Returns the files, and sheets of workbooks, from which the tables of a directory are created
+        :param base_dir: Base directory where csvs are stored
+        :return: List of tuples (table name, Path object of the file, sheet name or None)
+        """
+        return [(table_name, file, sheet_name) for file in self.get_table_files(base_dir)
+                for table_name, sheet_name in self.get_file_tables(file)]
 
-            file_map[file.stem] = validate_get_rows(file, 3)
+    def iter_file_map(self, base_dir):
+        """
+        Lazily read the tables of a directory. The header rows of all .csv/.xls/.xlsx files (or sheets) are read and
+        validated up front, so structural errors are raised by this call rather than while iterating. The body rows of
+        each file are then read one file at a time, only while its generator is consumed
+        :param base_dir: Base directory where csvs are stored
+        :return: Generator of tuples (table name, list of header rows, generator of body rows)
+        """
+        table_headers = [(table_name, file, sheet_name, validate_get_header_rows(file, 3, 4, sheet_name))
+                         for table_name, file, sheet_name in self.get_table_sources(base_dir)]
 
-        return file_map
+        return ((table_name, header_rows, validate_get_header_and_rows(file, 3, 4, sheet_name)[1])
+                for table_name, file, sheet_name, header_rows in table_headers)
 
     def open_cursor_and_connection(self):
         return open_cursor_connection(self.host, self.username, self.password, self.port)
 
-    def create_db_from_directory(self, directory_path):
+    def connection(self):
+        """
+        Context manager yielding a (connection, cursor) tuple from this instance's connection pool. The connection is
+        handed back to the pool when the block exits
+        :return: Tuple (connection object, cursor object)
+        """
+        return self.pool.connection()
+
+    def insert_data_rows(self, cursor, connection, db_name, table_name, column_names, row_data, commit=True,
+                         checkpoint=None):
+        """
+        Insert rows in batches using the batch size and commit interval configured for this instance. With bulk_load,
+        rows are loaded with LOAD DATA LOCAL INFILE as long as they contain no SQL expressions. With prepared, literal
+        rows are bound to prepared statements. With reject_dir, rows rejected by the server are written to a reject csv
+        :param cursor: SQL connection cursor
+        :param connection: SQL connection object
+        :param db_name: Name of database
+        :param table_name: Name of table in which to insert rows
+        :param column_names: Ordered collection of columns in which to perform insertion
+        :param row_data: Iterable (e.g. generator) of rows matching the order of :param column_names
+        :param commit: If False, nothing is committed and committing is left to the caller
+        :param checkpoint: Optional exql.checkpoint.Checkpoint recording the rows committed by each commit
+        :return: Number of rows inserted
+        """
+        commit_interval = self.commit_interval if commit else None
+
+        def insert_batched(rows, rejects=None):
+            return insert_rows_batched(cursor, connection, db_name, table_name, column_names, rows,
+                                       self.batch_rows, self.batch_bytes, commit_interval, self.metrics,
+                                       self.prepared, checkpoint, rejects)
+
+        if self.metrics:
+            row_data = self.metrics.timed_rows(row_data, table_name)
+
+        if self.reject_dir:
+            with RejectWriter(Path(self.reject_dir) / (table_name + ".rejects.csv"), column_names) as rejects:
+                return insert_batched(row_data, rejects)
+
+        if self.bulk_load:
+            return bulk_insert_rows(cursor, connection, db_name, table_name, column_names, row_data, insert_batched,
+                                    bool(commit_interval), self.metrics, checkpoint)
+
+        return insert_batched(row_data)
+
+    def should_parse_in_parallel(self, file_path, checkpoint=None):
+        """
+        :param file_path: Path object of the file to load
+        :param checkpoint: Checkpoint of the load, if any
+        :return: True if the file should be loaded with insert_csv_parallel
+        """
+        return bool(self.parse_workers) and file_path.suffix == ".csv" and not (checkpoint and checkpoint.rows) and \
+            file_path.stat().st_size > CHUNK_BYTES
+
+    def insert_csv_parallel(self, db_name, table_name, file_path, header_rows, column_names, checkpoint=None):
+        """
+        Insert the body rows of a large .csv file using several processes. The file is split into ranges of records
+        aligned on record boundaries, taking quoted line breaks into account. Workers parse the ranges and build the
+        INSERT batches, which are executed in file order on :param loader_connections pooled connections
+        :param db_name: Name of database
+        :param table_name: Name of table in which to insert rows
+        :param file_path: Path object of the .csv file
+        :param header_rows: Number of header rows preceding the body rows
+        :param column_names: Ordered collection of columns in which to perform insertion
+        :param checkpoint: Optional exql.checkpoint.Checkpoint recording the rows committed by each commit. Requires a
+        single loader connection
+        :return: Number of rows inserted
+        """
+        if checkpoint and self.loader_connections > 1:
+            raise Exception("Loads split across several loader connections cannot be checkpointed")
+
+        record_ranges = get_record_ranges(file_path, get_header_end(file_path, header_rows))
+        logger.info("Parsing " + str(file_path) + " as " + str(len(record_ranges)) + " ranges with " +
+                    str(self.parse_workers) + " processes")
+
+        batches = iter_parsed_batches(file_path, record_ranges, self.parse_workers, self.batch_rows,
+                                      self.batch_bytes, self.prepared)
+
+        def load(loader_batches, loader_checkpoint=None):
+            with self.connection() as (connection, cursor):
+                return insert_batches(cursor, connection, db_name, table_name, column_names, loader_batches,
+                                      self.commit_interval, self.metrics, loader_checkpoint)
+
+        try:
+            if self.loader_connections > 1:
+                return load_batches_concurrently(batches, self.loader_connections, load)
+
+            return load(batches, checkpoint)
+        finally:
+            batches.close()
+
+    def get_checkpoint_store(self, db_name, checkpoint_path=None, checkpoint_in_db=False):
+        """
+        Returns the store keeping the checkpoints of resumable loads
+        :param db_name: Name of the target database
+        :param checkpoint_path: Path of a JSON sidecar file keeping the checkpoints
+        :param checkpoint_in_db: If True, the checkpoints are kept in an exql_checkpoint table of the target database
+        :return: JsonCheckpointStore, TableCheckpointStore or None if loads are not checkpointed
+        """
+        if (checkpoint_in_db or checkpoint_path) and self.parse_workers and self.loader_connections > 1:
+            raise Exception("Loads split across several loader connections commit rows out of file order and cannot "
+                            "be checkpointed. Use loader_connections=1 with checkpoints")
+
+        if checkpoint_in_db:
+            return TableCheckpointStore(self, db_name)
+
+        if checkpoint_path:
+            return JsonCheckpointStore(checkpoint_path)
+
+        return None
+
+    def create_db_from_directory(self, directory_path, workers=None, one_transaction=False, checkpoint_path=None,
+                                 checkpoint_in_db=False):
         """
         Create a Schema based on a directory specified. All valid .csv/.xsls within the directory are converted into tables.
         If any data is present in the .csv/.xls, the rows are also populated
-        :return: None
+        :param directory_path: Path of the directory to convert
+        :param workers: If provided, up to :param workers files are parsed and loaded at the same time, each on its own
+        pooled connection. A failing table does not stop the others. Should not exceed the pool size of this instance
+        :param one_transaction: If True, all tables are populated in a single transaction with unique and foreign key
+        checks turned off, and unique indexes are only built once the data is loaded. See
+        create_db_from_directory_in_transaction. Cannot be combined with :param workers
+        :param checkpoint_path: Path of a JSON file recording the rows committed to each table. If the load is
+        interrupted, running it again with the same files skips the tables already loaded and resumes the others after
+        their last commit
+        :param checkpoint_in_db: Same as :param checkpoint_path, with the checkpoints kept in an exql_checkpoint table
+        of the new database. Checkpoints are then committed along with the rows they count
+        :return: None, or a JobReport with a TableResult per table when :param workers, :param one_transaction or
+        checkpoints are used
+        """
+        base_dir = Path(directory_path)
+        checkpoints = self.get_checkpoint_store(base_dir.name, checkpoint_path, checkpoint_in_db)
+
+        if one_transaction:
+            if workers:
+                raise Exception("A single transaction cannot be shared by several workers")
+            if checkpoints:
+                raise Exception("Loads in a single transaction commit once and cannot be checkpointed")
+            return self.create_db_from_directory_in_transaction(base_dir)
+
+        if workers or checkpoints:
+            return self.create_db_from_directory_parallel(base_dir, workers or 1, checkpoints)
+
+        self.validate_directory(base_dir)
+        input_files = self.iter_file_map(base_dir)
+        table_count = 0
+
+        with self.connection() as (connection, cursor):
+            create_database(cursor, base_dir.name)
+            for file_name, header_rows, data_rows in input_files:
+                create_table(cursor, base_dir.name, file_name, extract_table_create_data(header_rows))
+                self.schema_cache.invalidate(base_dir.name)
+                self.insert_data_rows(cursor, connection, base_dir.name, file_name, extract_column_names(header_rows),
+                                      data_rows)
+                table_count += 1
+
+        logger.info("Created database " + str(base_dir.name) + " with " + str(table_count) + " tables")
+
+    def create_db_from_directory_in_transaction(self, base_dir):
+        """
+        Create a Schema from the directory in three steps, since DDL statements implicitly commit the current
+        transaction: all tables are created without their UNIQUE modifiers, they are then populated in a single
+        transaction with unique_checks and foreign_key_checks turned off, and the unique indexes are finally added with
+        ALTER TABLE. Each table is loaded after a savepoint, so a failing table is rolled back and left empty without
+        losing the others
+        :param base_dir: Path object of the directory to convert
+        :return: JobReport with a TableResult per table
+        """
+        self.validate_directory(base_dir)
+        table_headers = [(table_name, file, sheet_name, validate_get_header_rows(file, 3, 4, sheet_name))
+                         for table_name, file, sheet_name in self.get_table_sources(base_dir)]
+        results = [TableResult(table_name) for table_name, _, _, _ in table_headers]
+        unique_columns = []
+
+        start = time.perf_counter()
+        with self.connection() as (connection, cursor):
+            create_database(cursor, base_dir.name)
+            for table_name, _, _, header_rows in table_headers:
+                field_data, columns = split_unique_modifiers(extract_table_create_data(header_rows))
+                create_table(cursor, base_dir.name, table_name, field_data)
+                self.schema_cache.invalidate(base_dir.name)
+                unique_columns.append(columns)
+
+            set_session_checks(cursor, False)
+            try:
+                start_transaction(cursor)
+                for index, (table_name, file, sheet_name, header_rows) in enumerate(table_headers):
+                    result = results[index]
+                    table_start = time.perf_counter()
+                    savepoint = "exql_table_" + str(index)
+                    create_savepoint(cursor, savepoint)
+
+                    try:
+                        data_rows = validate_get_header_and_rows(file, 3, 4, sheet_name)[1]
+                        result.rows = self.insert_data_rows(cursor, connection, base_dir.name, table_name,
+                                                            extract_column_names(header_rows), data_rows, commit=False)
+                        release_savepoint(cursor, savepoint)
+                    except Exception as e:
+                        rollback_to_savepoint(cursor, savepoint)
+                        result.rows = 0
+                        result.error = e
+
+                    result.seconds = time.perf_counter() - table_start
+
+                connection.commit()
+            finally:
+                set_session_checks(cursor, True)
+
+            for result, columns in zip(results, unique_columns):
+                if not columns:
+                    continue
+
+                index_start = time.perf_counter()
+                try:
+                    add_unique_indexes(cursor, base_dir.name, result.table_name, columns)
+                except Exception as e:
+                    result.error = result.error or e
+
+                result.seconds += time.perf_counter() - index_start
+
+        self.schema_cache.invalidate(base_dir.name)
+        report = JobReport(results, time.perf_counter() - start)
+        report.log_summary("Created database " + str(base_dir.name) + " in a single transaction")
+        return report
+
+    def create_db_from_directory_parallel(self, base_dir, workers, checkpoints=None):
+        """
+        Create a Schema from the directory, loading up to :param workers tables concurrently
+        :param base_dir: Path object of the directory to convert
+        :param workers: Maximum number of tables loaded at the same time
+        :param checkpoints: Optional JsonCheckpointStore or TableCheckpointStore from which loads are resumed
+        :return: JobReport with a TableResult per table
+        """
+        self.validate_directory(base_dir)
+        sources = self.get_table_sources(base_dir)
+
+        for table_name, file, sheet_name in sources:
+            validate_get_header_rows(file, 3, 4, sheet_name)
+
+        with self.connection() as (connection, cursor):
+            create_database(cursor, base_dir.name)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda source: self.load_file_into_table(base_dir.name, source[1],
+                                                                                  table_name=source[0],
+                                                                                  sheet_name=source[2],
+                                                                                  checkpoints=checkpoints), sources))
+
+        report = JobReport(results, time.perf_counter() - start)
+        report.log_summary("Created database " + str(base_dir.name))
+        return report
+
+    def load_file_into_table(self, db_name, file_path, replace=False, table_name=None, sheet_name=None,
+                             checkpoints=None):
+        """
+        Parse a .csv/.xls/.xlsx file and create and populate the corresponding table on a pooled connection. Errors are
+        recorded in the returned result instead of being raised
+        :param db_name: Name of database
+        :param file_path: Path object of the .csv/.xls/.xlsx file
+        :param replace: If True, an existing table with the same name is dropped first
+        :param table_name: Name of the table. Defaults to the file name
+        :param sheet_name: Sheet of a workbook to read. Defaults to the first sheet
+        :param checkpoints: Optional JsonCheckpointStore or TableCheckpointStore. If it holds a checkpoint of an
+        interrupted load of the same file, the existing table is kept and the rows already committed are skipped. If
+        it holds a checkpoint of a complete load of a different content, the table is dropped and loaded again
+        :return: TableResult of the table, whose rows only count the rows inserted by this call
+        """
+        table_name = table_name or get_file_stem(file_path)
+        result = TableResult(table_name)
+        start = time.perf_counter()
+
+        try:
+            checkpoint = checkpoints.begin(db_name + "." + table_name, file_path) if checkpoints else None
+
+            if not (checkpoint and checkpoint.complete):
+                header_rows, data_rows = validate_get_header_and_rows(file_path, 3, 4, sheet_name)
+                parallel = self.should_parse_in_parallel(file_path, checkpoint)
+
+                with self.connection() as (connection, cursor):
+                    if checkpoint and checkpoint.rows:
+                        data_rows = islice(data_rows, checkpoint.rows, None)
+                    else:
+                        if replace or (checkpoint and (checkpoint.resumed or checkpoint.replaced)):
+                            drop_table(cursor, db_name, table_name)
+
+                        create_table(cursor, db_name, table_name, extract_table_create_data(header_rows))
+                        self.schema_cache.invalidate(db_name)
+
+                    if not parallel:
+                        result.rows = self.insert_data_rows(cursor, connection, db_name, table_name,
+                                                            extract_column_names(header_rows), data_rows,
+                                                            checkpoint=checkpoint)
+
+                if parallel:
+                    data_rows.close()
+                    result.rows = self.insert_csv_parallel(db_name, table_name, file_path, 4,
+                                                           extract_column_names(header_rows), checkpoint)
+
+                if checkpoint:
+                    checkpoint.finish()
+        except Exception as e:
+            result.error = e
+
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def sync_directory(self, directory_path, drop_removed=False, manifest_path=None, manifest_in_db=False):
+        """
+        Incremental alternative to create_db_from_directory. A manifest of the size, modification time and content hash
+        of every file is kept between runs, and only tables of new or changed files are (re)created and populated. A
+        table is kept per file, so only the first sheet of a workbook is synced
+        :param directory_path: Path of the directory to sync
+        :param drop_removed: If True, tables whose file was removed from the directory since the last run are dropped
+        :param manifest_path: Path of the JSON manifest. Defaults to "<directory name>.exql-manifest.json" next to the
+        directory
+        :param manifest_in_db: If True, the manifest is kept in an exql_manifest table of the target schema instead of
+        a local file
+        :return: JobReport with a TableResult per reloaded table
         """
         base_dir = Path(directory_path)
-        input_file_map = self.validate_and_get_data(base_dir)
+        self.validate_directory(base_dir)
+        files = {file.name: file for file in self.get_table_files(base_dir)}
+
+        if manifest_in_db:
+            manifest = TableManifest(self, base_dir.name)
+        else:
+            manifest = JsonManifest(manifest_path or base_dir.parent / (base_dir.name + ".exql-manifest.json"))
+
+        previous_entries = manifest.load()
+        current_entries = {file_name: get_file_fingerprint(file, previous_entries.get(file_name))
+                           for file_name, file in files.items()}
+        changed_files, removed_files = get_manifest_changes(previous_entries, current_entries)
 
-        connection, cursor = self.open_cursor_and_connection()
-        create_database(cursor, base_dir.name)
-        for file_name in input_file_map:
-            file_content = input_file_map[file_name]
-            create_table(cursor, base_dir.name, file_name, extract_table_create_data(file_content))
+        for file_name in changed_files:
+            validate_get_header_rows(files[file_name], 3, 4)
 
-            data_rows = extract_table_data(file_content, 4)
-            if data_rows:
-                insert_rows(cursor, connection, base_dir.name, file_name, extract_column_names(file_content),
-                            data_rows)
+        entries = {file_name: entry for file_name, entry in current_entries.items() if file_name not in changed_files}
 
-        close_cursor_connection(cursor, connection)
+        with self.connection() as (connection, cursor):
+            create_database(cursor, base_dir.name)
 
-        logger.info("Created database " + str(base_dir.name) + " with " + str(len(input_file_map)) + " tables")
+            for file_name in removed_files:
+                if drop_removed:
+                    drop_table(cursor, base_dir.name, previous_entries[file_name]["table_name"])
+                    self.schema_cache.invalidate(base_dir.name)
+                else:
+                    entries[file_name] = previous_entries[file_name]
+
+        start = time.perf_counter()
+        results = []
+        for file_name in changed_files:
+            result = self.load_file_into_table(base_dir.name, files[file_name], replace=True)
+            results.append(result)
+
+            if result.success:
+                entries[file_name] = current_entries[file_name]
+                manifest.save(entries)
+
+        manifest.save(entries)
+
+        report = JobReport(results, time.perf_counter() - start)
+        report.log_summary("Synced database " + str(base_dir.name) + " (" + str(len(files) - len(changed_files)) +
+                           " tables unchanged, " + str(len(removed_files)) + " files removed)")
+        return report
 
     def create_table_from_csv(self, db_name, source_file_path):
         """
-        Create a table from the specified .csv/.xls file with name same as .csv/.xls file name
+        Create a table from the specified .csv/.xls/.xlsx file with name same as the file name. With all_sheets, a table
+        is created for every sheet of a workbook
         :return: None
         """
         base_dir = Path(source_file_path)
-        source_file_data = validate_get_rows(base_dir, 3)
-
-        connection, cursor = self.open_cursor_and_connection()
-        create_table(cursor, db_name, base_dir.stem, extract_table_create_data(source_file_data))
 
-        data_rows = extract_table_data(source_file_data, 4)
-        if data_rows:
-            insert_rows(cursor, connection, db_name, base_dir.stem, extract_column_names(source_file_data),
-                        data_rows)
+        for table_name, sheet_name in self.get_file_tables(base_dir):
+            header_rows, data_rows = validate_get_header_and_rows(base_dir, 3, 4, sheet_name)
 
-        close_cursor_connection(cursor, connection)
+            with self.connection() as (connection, cursor):
+                create_table(cursor, db_name, table_name, extract_table_create_data(header_rows))
+                self.schema_cache.invalidate(db_name)
+                self.insert_data_rows(cursor, connection, db_name, table_name, extract_column_names(header_rows),
+                                      data_rows)
 
-        logger.info("Created table " + str(base_dir.stem) + "in DB " + db_name)
+            logger.info("Created table " + str(table_name) + " in DB " + db_name)
 
-    def insert_in_table(self, db_name, csv_file_path, table_name=None):
+    def insert_in_table(self, db_name, csv_file_path, table_name=None, merge=False, delete_missing=False,
+                        checkpoint_path=None, checkpoint_in_db=False):
         """
         Insert into existing table with name :param table_name. If table_name not passed, used csv file name as table name
+        The columns named by the header are checked against the cached schema of the table before any SQL is built
         :param db_name: Name of database
         :param csv_file_path: Path of csv file containing rows to persists. First row must have column names
         :param table_name: Name of table in which to persist. If not provided, use name of csv file
-        :return: None
+        :param merge: If True, rows are matched with the stored ones on the table's primary (or unique) key, which must
+        be present in the csv. Only new or changed rows are written, using INSERT ... ON DUPLICATE KEY UPDATE
+        :param delete_missing: Only used with :param merge. If True, stored rows whose key is absent from the csv are
+        deleted
+        :param checkpoint_path: Path of a JSON file recording the rows committed so far. If the insertion is
+        interrupted, running it again with the same csv resumes after the last commit. Not used with :param merge,
+        which can simply be run again
+        :param checkpoint_in_db: Same as :param checkpoint_path, with the checkpoint kept in an exql_checkpoint table of
+        the database and committed along with the rows it counts
+        :return: Number of rows inserted by this call or, with :param merge, map with the number of "changed",
+        "unchanged" and "deleted" rows
         """
         base_dir = Path(csv_file_path)
-        csv_file_data = validate_get_rows(base_dir, 2)
+        table_name, header_rows, data_rows, table = self.prepare_insert(db_name, base_dir, table_name)
 
-        if not table_name:
-            table_name = base_dir.stem
+        checkpoint = None
+        if not merge:
+            checkpoints = self.get_checkpoint_store(db_name, checkpoint_path, checkpoint_in_db)
+            checkpoint = checkpoints.begin(db_name + "." + table_name, base_dir) if checkpoints else None
 
-        data_rows = extract_table_data(csv_file_data, 1)
+        if checkpoint and checkpoint.complete:
+            data_rows.close()
+            return 0
+
+        if not merge and self.should_parse_in_parallel(base_dir, checkpoint):
+            data_rows.close()
+            row_count = self.insert_csv_parallel(db_name, table_name, base_dir, 1, extract_column_names(header_rows),
+                                                 checkpoint)
+            if checkpoint:
+                checkpoint.finish()
+
+            logger.info("Inserted " + str(row_count) + " rows in " + str(table_name))
+            return row_count
+
+        if checkpoint:
+            data_rows = islice(data_rows, checkpoint.rows, None)
+
+        with self.connection() as (connection, cursor):
+            if merge:
+                if table is None:
+                    raise Exception("Table " + str(db_name) + "." + str(table_name) + " does not exist")
+
+                return merge_rows(cursor, connection, db_name, table_name, extract_column_names(header_rows),
+                                  table.key_columns, data_rows, self.batch_rows, self.batch_bytes, delete_missing)
+
+            row_count = self.insert_data_rows(cursor, connection, db_name, table_name,
+                                              extract_column_names(header_rows), data_rows, checkpoint=checkpoint)
+
+        if checkpoint:
+            checkpoint.finish()
+
+        logger.info("Inserted " + str(row_count) + " rows in " + str(table_name))
+        return row_count
+
+    def prepare_insert(self, db_name, file_path, table_name=None):
+        """
+        Read the header of a file of rows to insert into an existing table and check the columns it names against the
+        cached schema of the table, before any SQL is built
+        :param db_name: Name of database
+        :param file_path: Path object of the file. First row must have column names
+        :param table_name: Name of table in which to insert. If not provided, uses the name of the file
+        :return: Tuple (table name, list of header rows, generator of body rows, TableSchema of the table or None if it
+        is not in information_schema)
+        """
+        header_rows, data_rows = validate_get_header_and_rows(file_path, 2, 1)
+        table_name = table_name or get_file_stem(file_path)
 
-        connection, cursor = self.open_cursor_and_connection()
-        insert_rows(cursor, connection, db_name, table_name, extract_column_names(csv_file_data), data_rows)
+        try:
+            table = self.schema_cache.validate_columns(db_name, table_name, extract_column_names(header_rows),
+                                                       file_path)
+        except Exception:
+            data_rows.close()
+            raise
 
-        logger.info("Inserted " + str(cursor.rowcount) + " rows in " + str(table_name))
+        return table_name, header_rows, data_rows, table
 
-        close_cursor_connection(cursor, connection)
+    def get_column_types(self, db_name, table_name):
+        """
+        :param db_name: Name of database
+        :param table_name: Name of table
+        :return: Data types of the columns of the table in column order, as cached by the schema cache, or None if the
+        table does not exist
+        """
+        table = self.schema_cache.get_table(db_name, table_name)
+        if table is None:
+            return None
 
-    def select_into_csv(self, db_name, full_select_query, destination_dir_path, destination_file_name):
+        return [table.column_types[column_name] for column_name in table.column_names]
+
+    def select_into_csv(self, db_name, full_select_query, destination_dir_path, destination_file_name,
+                        batch_size=None, compress=False, params=None, literal_types=None):
         """
-        Select rows read from a DB using the provided query into a csv
+        Select rows read from a DB using the provided query into a csv, or into a file of another format of
+        formats.BATCH_WRITERS
         :param db_name: Name of database
         :param full_select_query: Syntactically correct SQL query to run e.g. "SELECT * FROM myTable LIMIT 10;"
         :param destination_dir_path: Path of valid, existing directory where csv is to be stored
         :param destination_file_name: Name with with csv is to be saved (including extension) e.g. "results.csv".
-        No file with a similar should exist in the destination directory
-        :return:  None
+        No file with a similar should exist in the destination directory. Its suffix selects the format: ".csv.gz" and
+        ".csv.zst" files are compressed, ".parquet" and ".arrow" files are columnar and typed from the cursor
+        :param batch_size: If provided, rows are streamed from the server and written :param batch_size rows at a time,
+        so memory use does not depend on the size of the result. Otherwise, the whole result is fetched before writing
+        :param compress: If True, the csv is gzip compressed and ".gz" is appended to :param destination_file_name
+        :param params: Optional values bound to the %s placeholders of :param full_select_query
+        :param literal_types: Optional data types of the selected columns, in column order, as returned by
+        get_column_types. If provided, values are written as SQL literals e.g. 'John' or NULL, so that the csv can be
+        loaded back with insert_in_table. Not used for .parquet and .arrow files, whose values keep their types and are
+        turned into literals when read back
+        :return: Number of rows written
         """
-        connection, cursor = self.open_cursor_and_connection()
-        select_rows(cursor, db_name, full_select_query)
+        if compress and not destination_file_name.endswith(".gz"):
+            destination_file_name += ".gz"
+
+        if get_file_suffix(Path(destination_file_name)) not in CSV_SUFFIXES:
+            literal_types = None
+
+        with self.connection() as (connection, cursor):
+            select_rows(cursor, db_name, full_select_query, params)
+            column_names = cursor.column_names
+            description = cursor.description
+
+            if batch_size:
+                row_batches = fetch_row_batches(cursor, batch_size)
+                if literal_types:
+                    row_batches = format_literal_batches(row_batches, literal_types)
+
+                return write_batches_to_new_csv(column_names, destination_dir_path, destination_file_name,
+                                                row_batches, description)
+
+            row_list = cursor.fetchall()
+
+        if literal_types:
+            row_list = next(format_literal_batches([row_list], literal_types))
+
+        return write_to_new_csv(column_names, destination_dir_path, destination_file_name, row_list, description)
 
-        row_list = cursor.fetchall()
-        column_names = cursor.column_names
+    def export_into_csv(self, db_name, select_query, params, destination_dir_path, destination_file_name,
+                        batch_size=None, literal_types=None):
+        """
+        Run select_into_csv, recording its outcome instead of raising errors
+        :param db_name: Name of database
+        :param select_query: Query to export
+        :param params: Values bound to the %s placeholders of :param select_query, or None
+        :param destination_dir_path: Path of valid, existing directory where csv is to be stored
+        :param destination_file_name: Name of csv file, which is also used as name in the result
+        :param batch_size: If provided, rows are streamed :param batch_size rows at a time
+        :param literal_types: Optional data types of the selected columns. If provided, values are written as SQL
+        literals
+        :return: TableResult of the file
+        """
+        result = TableResult(destination_file_name)
+        start = time.perf_counter()
 
-        close_cursor_connection(cursor, connection)
+        try:
+            result.rows = self.select_into_csv(db_name, select_query, destination_dir_path, destination_file_name,
+                                               batch_size, params=params, literal_types=literal_types)
+        except Exception as e:
+            result.error = e
 
-        write_to_new_csv(column_names, destination_dir_path, destination_file_name, row_list)
+        result.seconds = time.perf_counter() - start
+        return result
 
-    def delete_from_db(self, db_name, deletion_csv, table_name=None):
+    def delete_from_db(self, db_name, deletion_csv, table_name=None, batch_rows=None, staging=False):
         """
         Delete all rows matching conditions determined by the specified :param deletion_csv. :param deletion_csv must
         contain column names in the first row and value in subsequent rows. Deletion query is created as follows:
         "DELETE FROM :param table_name WHERE (col1=valA AND col2=valB) OR (col1=valX AND col2=valY) where col1, col2 are
-        column names and (valA,valB) and (valX,valY) are two rows in the csv
+        column names and (valA,valB) and (valX,valY) are two rows in the csv. The columns named by the first row are
+        checked against the cached schema of the table before any SQL is built
         :param db_name: Name of database
         :param deletion_csv: CSV containing column names and values to be used for deletion
         :param table_name: Name of table from which to delete. If not provided, uses name of csv file
+        :param batch_rows: If provided, the csv is streamed and rows are deleted :param batch_rows keys at a time with
+        "DELETE ... WHERE (col1, col2) IN ((valA, valB), ...)" statements, committing after each statement
+        :param staging: Only used with :param batch_rows. If True, keys are first loaded into a temporary staging table
+        and rows are deleted by joining with it, :param batch_rows keys at a time
         :return: None
         """
         base_dir = Path(deletion_csv)
-        csv_file_data = validate_get_rows(base_dir, 2)
 
         if not table_name:
-            table_name = base_dir.stem
+            table_name = get_file_stem(base_dir)
 
-        data_rows = extract_table_data(csv_file_data, 1)
+        if batch_rows:
+            header_rows, data_rows = validate_get_header_and_rows(base_dir, 2, 1)
+            try:
+                self.schema_cache.validate_columns(db_name, table_name, extract_column_names(header_rows), base_dir)
+            except Exception:
+                data_rows.close()
+                raise
 
-        connection, cursor = self.open_cursor_and_connection()
-        delete_rows(cursor, connection, db_name, table_name, extract_column_names(csv_file_data), data_rows)
+            delete_function = delete_rows_staged if staging else delete_rows_batched
+
+            with self.connection() as (connection, cursor):
+                row_count = delete_function(cursor, connection, db_name, table_name, extract_column_names(header_rows),
+                                            data_rows, batch_rows, self.batch_bytes)
+
+            logger.info("Deleted " + str(row_count) + " rows from " + str(table_name))
+            return
+
+        csv_file_data = validate_get_rows(base_dir, 2)
+        data_rows = extract_table_data(csv_file_data, 1)
+        self.schema_cache.validate_columns(db_name, table_name, extract_column_names(csv_file_data), base_dir)
 
-        logger.info("Deleted " + str(cursor.rowcount) + " rows from " + str(table_name))
+        with self.connection() as (connection, cursor):
+            delete_rows(cursor, connection, db_name, table_name, extract_column_names(csv_file_data), data_rows)
 
-        close_cursor_connection(cursor, connection)
+            logger.info("Deleted " + str(cursor.rowcount) + " rows from " + str(table_name))
 
-    def write_db_to_dir(self, destination_path, db_name, table_list=None):
+    def write_db_to_dir(self, destination_path, db_name, table_list=None, batch_size=None, compress=False,
+                        workers=None, shard_rows=None, merge_shards=False, incremental=False, checksum=False,
+                        watermarks=None, manifest_path=None, literals=False, file_format="csv"):
         """
         Write a DB to a directory at the specified :param destination_path
         :param destination_path: Path where directory representing the DB must be stored
         :param db_name: Name of DB to be written
-        :param table_list: Optional list of tables to write as csv. If not provided, writes all tables present
-        :return: None
+        :param table_list: Optional list of tables to write as csv. If not provided, writes all tables present. Every
+        table is exported over a pooled connection, so a single warm connection is reused for the whole database
+        :param batch_size: If provided, tables are streamed to their csv files :param batch_size rows at a time
+        :param compress: If True, tables are written as gzip compressed .csv.gz files
+        :param workers: If provided, up to :param workers tables (or shards of tables) are exported at the same time,
+        each on its own pooled connection. Should not exceed the pool size of this instance
+        :param shard_rows: Only used with :param workers. Tables with more than about :param shard_rows rows and a
+        single column primary key are split into primary key ranges of :param shard_rows rows, exported to numbered
+        shard files e.g. orders.part-0001.csv, which insert_in_table loads into orders. Shards are read on separate
+        connections and thus not as one snapshot
+        :param merge_shards: If True, the shards of each table are concatenated into a single csv once exported. Only
+        possible with csv formats
+        :param incremental: If True, the directory may already hold a previous export, and only tables which changed
+        since then are exported again, see write_db_to_dir_incremental. Tables are not sharded in this mode
+        :param checksum: Only used with :param incremental. If True, tables are compared using CHECKSUM TABLE
+        :param watermarks: Only used with :param incremental. Map from table name to watermark column
+        :param manifest_path: Only used with :param incremental. Path of the JSON export manifest
+        :param literals: If True, values are written as SQL literals according to the column types of the cached
+        schema e.g. 'John', 12 or NULL, so that the files can be loaded back with insert_in_table. Only used with csv
+        formats
+        :param file_format: Format of the written files, one of formats.FILE_FORMATS: "csv", "csv.gz" or "csv.zst"
+        (zstd compressed, requires zstandard), "parquet" or "arrow" (Arrow IPC file, requires pyarrow). Files of every
+        format can be loaded back with create_db_from_directory. With :param compress, "csv" becomes "csv.gz"
+        :return: None, or a JobReport with a TableResult per written file when :param workers or :param incremental is
+        provided
         """
         base_dir = Path(destination_path)
+        suffix = get_format_suffix(file_format, compress)
+        if merge_shards and suffix not in CSV_SUFFIXES:
+            raise Exception("Only csv shards can be merged, not ." + str(file_format) + " shards")
 
         destination_dir_path = base_dir / db_name
+        if incremental:
+            destination_dir_path.mkdir(parents=True, exist_ok=True)
+            return self.write_db_to_dir_incremental(destination_dir_path, db_name, table_list, batch_size, suffix,
+                                                    workers, checksum, watermarks, manifest_path, literals)
+
         destination_dir_path.mkdir(parents=True, exist_ok=False)
 
-        if table_list:
-            for table_name in table_list:
-                self.select_into_csv(db_name, get_select_all_query(table_name),
-                                     destination_dir_path.absolute(), table_name)
-        else:
-            connection, cursor = self.open_cursor_and_connection()
-            get_all_table_names(cursor, db_name)
-            table_name_list = cursor.fetchall()
+        if workers:
+            return self.write_db_to_dir_parallel(destination_dir_path, db_name, table_list, batch_size, suffix,
+                                                 workers, shard_rows, merge_shards, literals)
 
-            for table_name in table_name_list:
-                self.select_into_csv(db_name, get_select_all_query(table_name[0]), destination_dir_path.absolute(),
-                                     table_name[0] + ".csv")
+        for table_name in table_list or self.schema_cache.get_tables(db_name):
+            self.select_into_csv(db_name, get_select_all_query(table_name), destination_dir_path.absolute(),
+                                 table_name + suffix, batch_size,
+                                 literal_types=self.get_column_types(db_name, table_name) if literals else None)
 
         logger.info("Wrote DB to directory " + str(destination_dir_path))
 
+    def get_export_tasks(self, db_name, table_list, suffix, shard_rows):
+        """
+        Plan the files to write when exporting a DB, splitting large tables into primary key ranges. Table names and
+        primary keys are taken from the schema cache, row estimates are only read when tables may be split
+        :param db_name: Name of DB to be written
+        :param table_list: Optional list of tables to write. If not provided, all tables present are written
+        :param suffix: Suffix of the files e.g. ".csv.gz", as returned by formats.get_format_suffix
+        :param shard_rows: Approximate number of rows per shard. If None, tables are not split
+        :return: Tuple (list of (file name, query, params, table name) tuples, map from merged file name to list of
+        shard names)
+        """
+        export_tasks = []
+        table_shards = dict()
+        tables = self.schema_cache.get_tables(db_name)
+
+        with self.connection() as (connection, cursor):
+            row_estimates = dict(get_table_row_estimates(cursor, db_name)) if shard_rows else dict()
+
+            for table_name in table_list or tables:
+                file_name = table_name + suffix
+
+                key_columns = []
+                if shard_rows and row_estimates.get(table_name, 0) > shard_rows:
+                    key_columns = tables[table_name].primary_key if table_name in tables else []
+                    if len(key_columns) != 1:
+                        logger.info("Cannot shard " + str(table_name) + " as it has no single column primary key")
+
+                if len(key_columns) != 1:
+                    export_tasks.append((file_name, get_select_all_query(table_name), None, table_name))
+                    continue
+
+                key_ranges = get_key_ranges(cursor, db_name, table_name, key_columns[0], shard_rows)
+                table_shards[file_name] = []
+                for shard_number, key_range in enumerate(key_ranges, 1):
+                    shard_file_name = get_shard_file_name(file_name, shard_number)
+                    table_shards[file_name].append(shard_file_name)
+                    export_tasks.append((shard_file_name,) + get_key_range_query(table_name, key_columns[0],
+                                                                                 key_range) + (table_name,))
+
+        return export_tasks, table_shards
+
+    def write_db_to_dir_parallel(self, destination_dir_path, db_name, table_list, batch_size, suffix, workers,
+                                 shard_rows, merge_shards, literals=False):
+        """
+        Write a DB to an existing directory, exporting up to :param workers tables or table shards concurrently
+        :param destination_dir_path: Path object of the directory representing the DB
+        :param db_name: Name of DB to be written
+        :param table_list: Optional list of tables to write. If not provided, all tables present are written
+        :param batch_size: If provided, rows are streamed :param batch_size rows at a time
+        :param suffix: Suffix of the files e.g. ".csv.gz", as returned by formats.get_format_suffix
+        :param workers: Maximum number of files written at the same time
+        :param shard_rows: Approximate number of rows per shard. If None, tables are not split
+        :param merge_shards: If True, shards of each table are concatenated once all of them are written
+        :param literals: If True, values are written as SQL literals
+        :return: JobReport with a TableResult per written file
+        """
+        export_tasks, table_shards = self.get_export_tasks(db_name, table_list, suffix, shard_rows)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                lambda task: self.export_into_csv(db_name, task[1], task[2], destination_dir_path.absolute(), task[0],
+                                                  batch_size,
+                                                  self.get_column_types(db_name, task[3]) if literals else None),
+                export_tasks))
+
+        if merge_shards:
+            failed_files = set(result.table_name for result in results if not result.success)
+            for file_name, shard_file_names in table_shards.items():
+                if failed_files.isdisjoint(shard_file_names):
+                    merge_shard_files([destination_dir_path / shard for shard in shard_file_names],
+                                      destination_dir_path / file_name)
+
+        report = JobReport(results, time.perf_counter() - start)
+        report.log_summary("Wrote DB to directory " + str(destination_dir_path))
+        return report
+
+    def write_db_to_dir_incremental(self, destination_dir_path, db_name, table_list=None, batch_size=None,
+                                    suffix=".csv", workers=None, checksum=False, watermarks=None, manifest_path=None,
+                                    literals=False):
+        """
+        Write a DB to a directory holding a previous export, rewriting only the tables which changed since. A manifest
+        records the update time and row count reported by information_schema for every exported table, and optionally
+        its CHECKSUM TABLE value. Tables matching their manifest entry are skipped and their files left as they are.
+        Tables with a watermark column (e.g. an auto-increment id or an updated_at column) only have the rows whose
+        watermark is above the one recorded by the previous run appended to their file, as long as the rows at or below
+        that watermark are the same as when it was recorded, which is checked with get_range_checksum. Other changed
+        tables are exported to a temporary file which then replaces the previous one, as are tables whose rows below
+        the watermark were updated or deleted and tables written to .parquet or .arrow files, which cannot be appended
+        to
+        :param destination_dir_path: Path object of the directory representing the DB. Created if it does not exist
+        :param db_name: Name of DB to be written
+        :param table_list: Optional list of tables to write. If not provided, all tables present are written
+        :param batch_size: If provided, rows are streamed :param batch_size rows at a time
+        :param suffix: Suffix of the files e.g. ".csv.gz", as returned by formats.get_format_suffix
+        :param workers: If provided, up to :param workers tables are exported at the same time
+        :param checksum: If True, tables are compared using CHECKSUM TABLE, which reads every table but also detects
+        changes the update time misses, e.g. the update time of InnoDB tables is unknown after a server restart
+        :param watermarks: Optional map from table name to watermark column. Checking the rows below the watermark
+        reads them all, but it is the only way to tell appended rows from rows updated or deleted in place
+        :param manifest_path: Path of the JSON manifest. Defaults to "<db name>.exql-export.json" next to the directory
+        :param literals: If True, values are written as SQL literals. Should not change between runs appending to the
+        same files
+        :return: JobReport with a TableResult per table, holding 0 rows for skipped tables
+        """
+        destination_dir_path = Path(destination_dir_path)
+        destination_dir_path.mkdir(parents=True, exist_ok=True)
+        manifest = JsonManifest(manifest_path or destination_dir_path.parent / (db_name + ".exql-export.json"))
+        watermarks = watermarks or dict()
+
+        with self.connection() as (connection, cursor):
+            table_states = get_table_states(cursor, db_name)
+
+        entries = manifest.load()
+        manifest_lock = threading.Lock()
+
+        def export_table(table_name):
+            literal_types = self.get_column_types(db_name, table_name) if literals else None
+            result, entry = self.export_table_incremental(db_name, table_name, table_states.get(table_name, (None, 0)),
+                                                          entries.get(table_name), destination_dir_path, batch_size,
+                                                          suffix, checksum, watermarks.get(table_name),
+                                                          literal_types)
+            if entry is not None:
+                with manifest_lock:
+                    entries[table_name] = entry
+                    manifest.save(entries)
+
+            return result
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers or 1) as executor:
+            results = list(executor.map(export_table, table_list or table_states))
+
+        report = JobReport(results, time.perf_counter() - start)
+        report.log_summary("Wrote DB incrementally to directory " + str(destination_dir_path))
+        return report
+
+    def export_table_incremental(self, db_name, table_name, table_state, previous_entry, destination_dir_path,
+                                 batch_size, suffix, checksum, watermark_column, literal_types=None):
+        """
+        Bring the file of a single table up to date, see write_db_to_dir_incremental
+        :param db_name: Name of DB
+        :param table_name: Name of the table
+        :param table_state: Tuple (update time, row count) reported by information_schema for the table
+        :param previous_entry: Export manifest entry recorded for the table by the previous run, if any
+        :param destination_dir_path: Path object of the directory representing the DB
+        :param batch_size: If provided, rows are streamed :param batch_size rows at a time
+        :param suffix: Suffix of the file e.g. ".csv.gz", as returned by formats.get_format_suffix
+        :param checksum: If True, the table is compared using CHECKSUM TABLE
+        :param watermark_column: Optional watermark column of the table
+        :param literal_types: Optional data types of the columns. If provided, values are written as SQL literals
+        :return: Tuple (TableResult, new manifest entry or None if the file was left as it is)
+        """
+        file_name = table_name + suffix
+        file_path = destination_dir_path / file_name
+        update_time, table_rows = table_state
+
+        result = TableResult(table_name)
+        start = time.perf_counter()
+        entry = {"file_name": file_name, "update_time": str(update_time) if update_time else None,
+                 "table_rows": table_rows, "checksum": None, "watermark_column": watermark_column, "watermark": None,
+                 "watermark_checksum": None}
+
+        try:
+            previous_entry = previous_entry if previous_entry and previous_entry["file_name"] == file_name and \
+                file_path.exists() else None
+            appendable = bool(watermark_column and previous_entry and suffix in CSV_SUFFIXES and
+                              previous_entry["watermark_column"] == watermark_column and
+                              previous_entry["watermark"] is not None and previous_entry.get("watermark_checksum"))
+
+            # Read before taking a connection, as a cold schema cache takes one of its own from the pool
+            column_names = None
+            if watermark_column:
+                table = self.schema_cache.get_table(db_name, table_name)
+                if table is None:
+                    raise Exception("Table " + str(db_name) + "." + str(table_name) + " does not exist")
+
+                column_names = table.column_names
+
+            with self.connection() as (connection, cursor):
+                if checksum:
+                    entry["checksum"] = get_table_checksum(cursor, db_name, table_name)
+
+                unchanged = bool(previous_entry and is_table_unchanged(previous_entry, entry, checksum))
+                if watermark_column and not unchanged:
+                    watermark = get_max_value(cursor, db_name, table_name, watermark_column)
+                    entry["watermark"] = None if watermark is None else str(watermark)
+                    if watermark is not None:
+                        entry["watermark_checksum"] = get_range_checksum(cursor, db_name, table_name, column_names,
+                                                                         watermark_column, entry["watermark"])
+
+                if appendable and not unchanged:
+                    previous_checksum = get_range_checksum(cursor, db_name, table_name, column_names,
+                                                           watermark_column, previous_entry["watermark"])
+                    if previous_checksum != previous_entry["watermark_checksum"]:
+                        logger.info("Rows of " + str(table_name) + " at or below the previous watermark changed, " +
+                                    "exporting the whole table")
+                        appendable = False
+
+            if unchanged:
+                logger.info("Skipping " + str(table_name) + " as it did not change since the previous export")
+                entry = None
+            elif appendable:
+                if entry["watermark"] != previous_entry["watermark"]:
+                    query, params = get_key_range_query(table_name, watermark_column,
+                                                        (previous_entry["watermark"], entry["watermark"]))
+                    result.rows = self.append_into_csv(db_name, query, params, file_path, batch_size, literal_types)
+            else:
+                if watermark_column:
+                    query, params = get_key_range_query(table_name, watermark_column, (None, entry["watermark"]))
+                else:
+                    query, params = get_select_all_query(table_name), None
+
+                temp_file_name = table_name + ".exql-tmp" + file_name[len(table_name):]
+                if (destination_dir_path / temp_file_name).exists():
+                    (destination_dir_path / temp_file_name).unlink()
+                result.rows = self.select_into_csv(db_name, query, destination_dir_path.absolute(), temp_file_name,
+                                                   batch_size, params=params, literal_types=literal_types)
+                (destination_dir_path / temp_file_name).replace(file_path)
+        except Exception as e:
+            result.error = e
+            entry = None
+
+        result.seconds = time.perf_counter() - start
+        return result, entry
+
+    def append_into_csv(self, db_name, select_query, params, file_path, batch_size=None, literal_types=None):
+        """
+        Append the rows selected by a query to an existing csv, without a header row
+        :param db_name: Name of database
+        :param select_query: Query to export
+        :param params: Values bound to the %s placeholders of :param select_query, or None
+        :param file_path: Path object of an existing .csv, .csv.gz or .csv.zst file with the columns of the query
+        :param batch_size: If provided, rows are streamed :param batch_size rows at a time
+        :param literal_types: Optional data types of the selected columns. If provided, values are written as SQL
+        literals
+        :return: Number of rows written
+        """
+        with self.connection() as (connection, cursor):
+            select_rows(cursor, db_name, select_query, params)
+
+            if batch_size:
+                row_batches = fetch_row_batches(cursor, batch_size)
+            else:
+                row_batches = [cursor.fetchall()]
+
+            if literal_types:
+                row_batches = format_literal_batches(row_batches, literal_types)
+
+            return append_rows_to_csv_file(file_path, row_batches)
+
 
 if __name__ == '__main__':
     # e = Exql("root", "mysql@123", "localhost", 3306, False)
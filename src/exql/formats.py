@@ -0,0 +1,421 @@
+import csv
+import datetime
+import gzip
+import io
+import re
+
+from mysql.connector import FieldFlag, FieldType
+
+from exql.logger import logger
+from exql.schema import format_literal
+
+CSV_SUFFIXES = (".csv", ".csv.gz", ".csv.zst")
+COLUMNAR_SUFFIXES = (".parquet", ".arrow")
+FILE_FORMATS = ("csv", "csv.gz", "csv.zst", "parquet", "arrow")
+INTEGER_FIELD_TYPES = frozenset(["TINY", "SHORT", "INT24", "LONG", "LONGLONG", "YEAR", "BIT"])
+FLOAT_FIELD_TYPES = frozenset(["FLOAT", "DOUBLE"])
+SHARD_STEM_PATTERN = re.compile(r"\.part-[0-9]+$")
+
+
+def get_file_suffix(file_path):
+    """
+    Returns the suffix identifying the format of a file, including the compression suffix of compressed csv files
+    e.g. ".csv", ".csv.gz", ".csv.zst" or ".parquet"
+    :param file_path: Path object of the file
+    :return: Suffix of the file
+    """
+    if file_path.suffix in (".gz", ".zst") and len(file_path.suffixes) > 1:
+        return "".join(file_path.suffixes[-2:])
+
+    return file_path.suffix
+
+
+def get_file_stem(file_path):
+    """
+    Returns the name of a file without its format suffix, used as table name e.g. orders.csv.gz -> orders. The shards
+    written by Exql.write_db_to_dir e.g. orders.part-0001.csv give the name of their table
+    :param file_path: Path object of the file
+    :return: Name of the file without suffix
+    """
+    suffix = get_file_suffix(file_path)
+    stem = file_path.name[:-len(suffix)] if suffix else file_path.name
+    return SHARD_STEM_PATTERN.sub("", stem)
+
+
+def get_format_suffix(file_format, compress=False):
+    """
+    :param file_format: One of FILE_FORMATS e.g. "csv.zst" or "parquet"
+    :param compress: If True, a plain "csv" format becomes gzip compressed "csv.gz"
+    :return: Suffix of the files written in :param file_format e.g. ".csv.gz"
+    """
+    if file_format not in FILE_FORMATS:
+        raise Exception("Unknown file format " + str(file_format) + ", expected one of " + ", ".join(FILE_FORMATS))
+
+    if compress and file_format == "csv":
+        return ".csv.gz"
+
+    return "." + file_format
+
+
+def import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise Exception("Reading and writing .csv.zst files requires the zstandard package")
+
+    return zstandard
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise Exception("Reading and writing .parquet and .arrow files requires the pyarrow package")
+
+    return pyarrow
+
+
+def open_text_file(file_path, mode):
+    """
+    Open a plain, gzip or zstd compressed text file e.g. a csv
+    :param file_path: Path object of the file. Files ending with .gz are gzip compressed, files ending with .zst are
+    zstd compressed
+    :param mode: "r", "w" or "a". Appending to a compressed file adds a new gzip member or zstd frame, which readers
+    decompress as a continuation of the previous ones
+    :return: File object
+    """
+    if file_path.suffix == ".gz":
+        return gzip.open(file_path, mode + "t", newline="")
+
+    if file_path.suffix == ".zst":
+        zstandard = import_zstandard()
+        raw_file = open(file_path, mode + "b")
+        try:
+            if mode == "r":
+                stream = zstandard.ZstdDecompressor().stream_reader(raw_file, read_across_frames=True, closefd=True)
+            else:
+                stream = zstandard.ZstdCompressor().stream_writer(raw_file, closefd=True)
+        except BaseException:
+            raw_file.close()
+            raise
+
+        return io.TextIOWrapper(stream, newline="")
+
+    return open(file_path, mode, newline="")
+
+
+def format_time_value(value):
+    """
+    :param value: datetime.timedelta, as returned by mysql-connector for TIME columns
+    :return: Time in the format MySQL parses e.g. "-01:30:00.000000" or "838:59:59.000000"
+    """
+    microseconds = abs(value) // datetime.timedelta(microseconds=1)
+    seconds, microseconds = divmod(microseconds, 1000000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return ("-" if value < datetime.timedelta(0) else "") + "%02d:%02d:%02d.%06d" % (hours, minutes, seconds,
+                                                                                      microseconds)
+
+
+def get_arrow_type(pyarrow, values, field=None):
+    """
+    Choose the arrow type of a column from its first non-null value or, if all values are null, from its MySQL field
+    type. Exact values which arrow types would alter, such as DECIMAL and TIME values, are kept as strings
+    :param pyarrow: pyarrow module
+    :param values: Values of the column in a batch of rows fetched from the database
+    :param field: Optional cursor.description entry of the column
+    :return: pyarrow.DataType
+    """
+    sample = next((value for value in values if value is not None), None)
+    unsigned = bool(field and len(field) > 7 and field[7] & FieldFlag.UNSIGNED)
+
+    if sample is None:
+        type_name = FieldType.get_info(field[1]) if field else None
+        if type_name in INTEGER_FIELD_TYPES:
+            return pyarrow.uint64() if unsigned else pyarrow.int64()
+        if type_name in FLOAT_FIELD_TYPES:
+            return pyarrow.float64()
+        if type_name in ("DATE", "NEWDATE"):
+            return pyarrow.date32()
+        if type_name in ("DATETIME", "TIMESTAMP"):
+            return pyarrow.timestamp("us")
+        return pyarrow.string()
+
+    if isinstance(sample, bool):
+        return pyarrow.bool_()
+    if isinstance(sample, int):
+        return pyarrow.uint64() if unsigned else pyarrow.int64()
+    if isinstance(sample, float):
+        return pyarrow.float64()
+    if isinstance(sample, datetime.datetime):
+        return pyarrow.timestamp("us")
+    if isinstance(sample, datetime.date):
+        return pyarrow.date32()
+    if isinstance(sample, (bytes, bytearray)):
+        return pyarrow.binary()
+
+    return pyarrow.string()
+
+
+def get_arrow_value(value, arrow_type):
+    """
+    :param value: Value fetched from the database
+    :param arrow_type: Arrow type of its column, as returned by get_arrow_type
+    :return: Value converted to a Python object of :param arrow_type
+    """
+    if value is None:
+        return None
+
+    type_name = str(arrow_type)
+    if type_name == "binary":
+        return bytes(value) if isinstance(value, (bytes, bytearray)) else str(value).encode("utf-8")
+
+    if type_name == "string":
+        if isinstance(value, (bytes, bytearray)):
+            return bytes(value).decode("utf-8", "replace")
+        if isinstance(value, datetime.timedelta):
+            return format_time_value(value)
+        if isinstance(value, (set, frozenset)):
+            return ",".join(sorted(value))
+        return str(value)
+
+    return value
+
+
+class CsvBatchWriter:
+    """
+    Writes rows to a plain, gzip (.csv.gz) or zstd (.csv.zst) compressed csv file, starting with a header row
+    """
+
+    def __init__(self, file_path, column_names, description=None):
+        """
+        :param file_path: Path object of the file to create
+        :param column_names: List of column names
+        :param description: Unused, csv cells are written as text
+        """
+        self.file = open_text_file(file_path, "w")
+        self.csv_writer = csv.writer(self.file)
+        self.csv_writer.writerow(column_names)
+
+    def write_batch(self, row_batch):
+        self.csv_writer.writerows(row_batch)
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowBatchWriter:
+    """
+    Writes rows to a Parquet (.parquet) or Arrow IPC (.arrow) file, one record batch (or Parquet row group) per batch
+    of rows, so that memory use only depends on the batch size. Column types are chosen from the first batch, see
+    get_arrow_type. Requires pyarrow
+    """
+
+    def __init__(self, file_path, column_names, description=None):
+        """
+        :param file_path: Path object of the file to create
+        :param column_names: List of column names
+        :param description: Optional cursor.description of the rows, used to type columns holding only NULL values in
+        the first batch and unsigned integer columns
+        """
+        self.pyarrow = import_pyarrow()
+        self.file_path = file_path
+        self.column_names = list(column_names)
+        self.description = description
+        self.schema = self.sink = self.writer = None
+
+    def open(self, row_batch):
+        columns = list(zip(*row_batch)) if row_batch else [[] for _ in self.column_names]
+        fields = [self.description[index] if self.description else None for index in range(len(self.column_names))]
+        self.schema = self.pyarrow.schema([(column_name, get_arrow_type(self.pyarrow, values, field))
+                                           for column_name, values, field in zip(self.column_names, columns, fields)])
+
+        if self.file_path.suffix == ".parquet":
+            import pyarrow.parquet
+            self.writer = pyarrow.parquet.ParquetWriter(str(self.file_path), self.schema)
+        else:
+            self.sink = self.pyarrow.OSFile(str(self.file_path), "wb")
+            self.writer = self.pyarrow.ipc.new_file(self.sink, self.schema)
+
+    def write_batch(self, row_batch):
+        if self.writer is None:
+            self.open(row_batch)
+
+        if not row_batch:
+            return
+
+        arrays = [self.pyarrow.array([get_arrow_value(value, field.type) for value in values], type=field.type)
+                  for values, field in zip(zip(*row_batch), self.schema)]
+        record_batch = self.pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+        if self.sink is None:
+            self.writer.write_table(self.pyarrow.Table.from_batches([record_batch]))
+        else:
+            self.writer.write_batch(record_batch)
+
+    def close(self):
+        try:
+            if self.writer is None:
+                self.open([])
+
+            self.writer.close()
+        finally:
+            if self.sink is not None:
+                self.sink.close()
+
+
+# Writer class of each output format, taking (file path, column names, cursor description). Other formats can be
+# added with register_batch_writer
+BATCH_WRITERS = {".csv": CsvBatchWriter, ".csv.gz": CsvBatchWriter, ".csv.zst": CsvBatchWriter,
+                 ".parquet": ArrowBatchWriter, ".arrow": ArrowBatchWriter}
+
+
+def register_batch_writer(suffix, writer_class):
+    """
+    Add or replace the writer of an output format
+    :param suffix: Suffix of the files written e.g. ".csv.zst"
+    :param writer_class: Class taking (file path, column names, cursor description) with write_batch and close methods
+    :return: None
+    """
+    BATCH_WRITERS[suffix] = writer_class
+
+
+def write_batches_to_file(file_path, column_names, row_batches, description=None):
+    """
+    Write batches of rows to a new file, in the format given by its suffix. The file is removed if writing fails
+    :param file_path: Path object of the file to create. Must not exist
+    :param column_names: List of column names
+    :param row_batches: Iterable (e.g. generator) of lists of rows fetched from the database
+    :param description: Optional cursor.description of the rows
+    :return: Number of rows written
+    """
+    suffix = get_file_suffix(file_path)
+    if file_path.exists() or suffix not in BATCH_WRITERS:
+        raise Exception(str(file_path) + " must refer to a valid, non-existing " + "/".join(BATCH_WRITERS) + " file")
+
+    writer = BATCH_WRITERS[suffix](file_path, column_names, description)
+
+    row_count = 0
+    try:
+        for row_batch in row_batches:
+            writer.write_batch(row_batch)
+            row_count += len(row_batch)
+    except BaseException:
+        writer.close()
+        file_path.unlink()
+        raise
+
+    writer.close()
+
+    logger.info("Wrote " + str(row_count) + " rows to " + str(file_path))
+    return row_count
+
+
+def get_mysql_type(pyarrow, arrow_type):
+    """
+    :param pyarrow: pyarrow module
+    :param arrow_type: Arrow type of a column read from a .parquet or .arrow file
+    :return: MySQL column type with which the column is created e.g. "BIGINT" or "DATETIME(6)"
+    """
+    types = pyarrow.types
+    if types.is_boolean(arrow_type):
+        return "BOOLEAN"
+    if types.is_int8(arrow_type):
+        return "TINYINT"
+    if types.is_int16(arrow_type):
+        return "SMALLINT"
+    if types.is_int32(arrow_type):
+        return "INT"
+    if types.is_integer(arrow_type):
+        return "BIGINT UNSIGNED" if types.is_unsigned_integer(arrow_type) else "BIGINT"
+    if types.is_float32(arrow_type):
+        return "FLOAT"
+    if types.is_floating(arrow_type):
+        return "DOUBLE"
+    if types.is_decimal(arrow_type):
+        return "DECIMAL(" + str(arrow_type.precision) + "," + str(arrow_type.scale) + ")"
+    if types.is_date(arrow_type):
+        return "DATE"
+    if types.is_timestamp(arrow_type):
+        return "DATETIME(6)"
+    if types.is_time(arrow_type) or types.is_duration(arrow_type):
+        return "TIME(6)"
+    if types.is_binary(arrow_type) or types.is_large_binary(arrow_type) or types.is_fixed_size_binary(arrow_type):
+        return "LONGBLOB"
+
+    return "TEXT"
+
+
+def get_row_literal(value):
+    """
+    :param value: Value read from a .parquet or .arrow file
+    :return: Value as the SQL literal exql inserts e.g. NULL, 12, 1 for True or 'It''s'
+    """
+    if isinstance(value, bool):
+        return "1" if value else "0"
+
+    if isinstance(value, datetime.timedelta):
+        value = format_time_value(value)
+
+    return format_literal(value, "decimal" if isinstance(value, (int, float)) else None)
+
+
+def iter_csv_rows(file_path, header_rows=1):
+    """
+    Lazily read the rows of a plain, gzip or zstd compressed csv file
+    :param file_path: Path object of the file
+    :param header_rows: Unused, csv files hold their own header rows
+    :return: Generator of rows
+    """
+    with open_text_file(file_path, "r") as csv_file:
+        yield from csv.reader(csv_file)
+
+
+def iter_columnar_rows(file_path, header_rows=1):
+    """
+    Lazily read the rows of a .parquet or .arrow file one record batch at a time, as rows of a csv would be read. The
+    column names make up the first row. With 3 or more header rows, they are followed by a row of MySQL column types
+    derived from the arrow types and an empty row of modifiers, then by empty rows up to :param header_rows. Values are
+    returned as SQL literals. Requires pyarrow
+    :param file_path: Path object of the file
+    :param header_rows: Number of header rows the caller expects e.g. 4 when creating tables, 1 when inserting rows
+    :return: Generator of rows
+    """
+    pyarrow = import_pyarrow()
+
+    if file_path.suffix == ".parquet":
+        import pyarrow.parquet
+        parquet_file = pyarrow.parquet.ParquetFile(str(file_path))
+        schema = parquet_file.schema_arrow
+        record_batches = parquet_file.iter_batches()
+    else:
+        reader = pyarrow.ipc.open_file(pyarrow.memory_map(str(file_path), "r"))
+        schema = reader.schema
+        record_batches = (reader.get_batch(index) for index in range(reader.num_record_batches))
+
+    yield list(schema.names)
+    if header_rows >= 3:
+        yield [get_mysql_type(pyarrow, field.type) for field in schema]
+        for _ in range(2, header_rows):
+            yield [""] * len(schema)
+
+    for record_batch in record_batches:
+        columns = [column.to_pylist() for column in record_batch.columns]
+        for row in zip(*columns):
+            yield [get_row_literal(value) for value in row]
+
+
+# Reader of each input format, taking (file path, number of header rows) and returning a generator of rows
+ROW_READERS = {".csv": iter_csv_rows, ".csv.gz": iter_csv_rows, ".csv.zst": iter_csv_rows,
+               ".parquet": iter_columnar_rows, ".arrow": iter_columnar_rows}
+
+
+def register_row_reader(suffix, reader):
+    """
+    Add or replace the reader of an input format
+    :param suffix: Suffix of the files read e.g. ".csv.zst"
+    :param reader: Function taking (file path, number of header rows) and returning a generator of rows
+    :return: None
+    """
+    ROW_READERS[suffix] = reader
+
@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from exql.exql import Exql
+from exql.logger import logger
+from exql.report import JobReport, JobResult
+
+JOB_ACTIONS = ("create_db_from_directory", "sync_directory", "create_table_from_csv", "insert_in_table",
+               "select_into_csv", "delete_from_db", "write_db_to_dir")
+
+
+class Server:
+    """
+    MySQL server targeted by the jobs of a job manifest
+    """
+
+    def __init__(self, name, host, username, password=None, port=3306, concurrency=1, options=None):
+        """
+        :param name: Name of the server, referenced by jobs
+        :param host: MySQL host
+        :param username: MySQL username
+        :param password: MySQL password
+        :param port: MySQL port number
+        :param concurrency: Maximum number of jobs run against the server at the same time
+        :param options: Other arguments of Exql e.g. batch_rows or bulk_load. The connection pool holds
+        :param concurrency connections unless pool_size is provided
+        """
+        if concurrency < 1:
+            raise Exception("The concurrency of server " + str(name) + " must be at least 1")
+
+        self.name = name
+        self.host = host
+        self.username = username
+        self.password = password
+        self.port = port
+        self.concurrency = concurrency
+        self.options = dict(options or dict())
+
+    def open(self):
+        """
+        :return: Exql instance connecting to the server
+        """
+        options = dict(self.options)
+        options.setdefault("pool_size", self.concurrency)
+        return Exql(self.username, self.password, self.host, self.port, **options)
+
+
+class Job:
+    """
+    Call of an Exql method against one server
+    """
+
+    def __init__(self, name, server_name, action, args=None):
+        """
+        :param name: Name of the job, used in the report
+        :param server_name: Name of the server to run the job against
+        :param action: Name of the Exql method to call, one of JOB_ACTIONS
+        :param args: Keyword arguments of the method e.g. {"directory_path": "depts/physics", "workers": 2}
+        """
+        if action not in JOB_ACTIONS:
+            raise Exception("Unknown action " + str(action) + " of job " + str(name) + ", expected one of " +
+                            ", ".join(JOB_ACTIONS))
+
+        self.name = name
+        self.server_name = server_name
+        self.action = action
+        self.args = dict(args or dict())
+
+
+def load_job_manifest(manifest_path):
+    """
+    Read a JSON job manifest of the form
+    {"servers": {"shard-1": {"host": "10.0.0.1", "username": "etl", "password_env": "SHARD_1_PASSWORD",
+                             "concurrency": 2, "options": {"batch_rows": 5000}}},
+     "jobs": [{"name": "physics", "server": "shard-1", "action": "create_db_from_directory",
+               "args": {"directory_path": "depts/physics"}}]}
+    A server's password is given either as "password" or as the name of the environment variable holding it, with
+    "password_env". Job names default to "<action> <position in the manifest>"
+    :param manifest_path: Path of the JSON file
+    :return: Tuple (map from server name to Server, list of Job)
+    """
+    with open(manifest_path, "r") as manifest_file:
+        manifest = json.load(manifest_file)
+
+    servers = dict()
+    for server_name, server in manifest.get("servers", dict()).items():
+        password = server.get("password")
+        if server.get("password_env"):
+            password = os.environ.get(server["password_env"])
+
+        servers[server_name] = Server(server_name, server["host"], server["username"], password,
+                                      server.get("port", 3306), server.get("concurrency", 1), server.get("options"))
+
+    jobs = []
+    for position, job in enumerate(manifest.get("jobs", []), 1):
+        name = job.get("name") or str(job.get("action")) + " " + str(position)
+        if job.get("server") not in servers:
+            raise Exception("Job " + str(name) + " refers to unknown server " + str(job.get("server")))
+
+        jobs.append(Job(name, job["server"], job.get("action"), job.get("args")))
+
+    return servers, jobs
+
+
+def get_job_rows(value):
+    """
+    :param value: Value returned by an Exql method
+    :return: Number of rows processed according to the value
+    """
+    if isinstance(value, JobReport):
+        return value.rows
+
+    if isinstance(value, dict):
+        return value.get("changed", 0) + value.get("unchanged", 0)
+
+    if isinstance(value, int):
+        return value
+
+    return 0
+
+
+class JobRunner:
+    """
+    Runs the jobs of a manifest against several servers. Each server has its own connection pool and its own threads,
+    as many as its concurrency, so jobs queued for a slow server never delay the jobs of the other servers
+    """
+
+    def __init__(self, servers, jobs):
+        """
+        :param servers: Map from server name to Server
+        :param jobs: List of Job, each referring to one of :param servers
+        """
+        self.servers = servers
+        self.jobs = jobs
+
+    @staticmethod
+    def from_manifest(manifest_path):
+        """
+        :param manifest_path: Path of a JSON job manifest, see load_job_manifest
+        :return: JobRunner running the jobs of the manifest
+        """
+        return JobRunner(*load_job_manifest(manifest_path))
+
+    @staticmethod
+    def run_job(exql, server_name, job):
+        """
+        Run a job, recording its outcome instead of raising errors. A job returning a JobReport with failed tables is
+        considered failed
+        :param exql: Exql instance connected to the server of the job
+        :param server_name: Name of the server
+        :param job: Job to run
+        :return: JobResult
+        """
+        result = JobResult(job.name, server_name, job.action)
+        start = time.perf_counter()
+
+        try:
+            value = getattr(exql, job.action)(**job.args)
+            result.rows = get_job_rows(value)
+
+            if isinstance(value, JobReport):
+                result.report = value
+                if value.failed:
+                    result.error = Exception(str(len(value.failed)) + " tables failed: " +
+                                             ", ".join(str(failed.table_name) for failed in value.failed))
+        except Exception as e:
+            result.error = e
+
+        result.seconds = time.perf_counter() - start
+        if result.success:
+            logger.info("Job " + repr(result))
+        else:
+            logger.error("Job " + repr(result))
+
+        return result
+
+    def run(self):
+        """
+        Run all the jobs, up to the concurrency of each server at the same time
+        :return: JobReport with a JobResult per job, in manifest order
+        """
+        used_servers = [name for name in self.servers if any(job.server_name == name for job in self.jobs)]
+        instances = dict()
+        executors = dict()
+
+        start = time.perf_counter()
+        try:
+            for name in used_servers:
+                instances[name] = self.servers[name].open()
+                executors[name] = ThreadPoolExecutor(max_workers=self.servers[name].concurrency,
+                                                     thread_name_prefix="exql-" + str(name))
+
+            futures = [executors[job.server_name].submit(self.run_job, instances[job.server_name], job.server_name,
+                                                         job)
+                       for job in self.jobs]
+            results = [future.result() for future in futures]
+        finally:
+            for executor in executors.values():
+                executor.shutdown()
+
+            for instance in instances.values():
+                instance.close()
+
+        report = JobReport(results, time.perf_counter() - start)
+        report.log_summary("Ran " + str(len(self.jobs)) + " jobs on " + str(len(used_servers)) + " servers")
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the jobs of an exql job manifest")
+    parser.add_argument("manifest", help="Path of the JSON job manifest")
+    args = parser.parse_args()
+
+    report = JobRunner.from_manifest(Path(args.manifest)).run()
+    for result in report.results:
+        print(repr(result))
+
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
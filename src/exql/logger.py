@@ -2,10 +2,34 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-logger.setLevel(logging.DEBUG)
+# exql does not configure logging itself. Level and handlers are left to the application e.g.
+# logging.basicConfig(level=logging.INFO) to see progress messages, or level=logging.DEBUG to also see queries
+logger.addHandler(logging.NullHandler())
 
-file_handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s : %(levelname)s : %(name)s : %(message)s')
-file_handler.setFormatter(formatter)
+query_log_length = 1000
 
-logger.addHandler(file_handler)
+
+def set_query_log_length(length):
+    """
+    Set the number of characters of a query that are logged. Longer queries, e.g. large multi-row INSERTs, are
+    truncated
+    :param length: Maximum number of characters logged per query. None or 0 logs queries in full
+    :return: None
+    """
+    global query_log_length
+    query_log_length = length
+
+
+def log_query(query):
+    """
+    Log a query at DEBUG level, truncated to the configured length. Nothing is formatted unless DEBUG is enabled
+    :param query: SQL query text
+    :return: None
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+
+    if query_log_length and len(query) > query_log_length:
+        query = query[:query_log_length] + "... (" + str(len(query)) + " characters)"
+
+    logger.debug(query)
@@ -0,0 +1,143 @@
+import hashlib
+import json
+from pathlib import Path
+
+from exql.dao import create_database
+from exql.formats import get_file_stem
+from exql.logger import logger
+from exql.sql import MySql
+
+MANIFEST_TABLE = "exql_manifest"
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def get_file_fingerprint(file_path, previous_entry=None):
+    """
+    Returns the size, modification time and SHA-256 content hash of a file. If size and modification time match
+    :param previous_entry, the file is assumed unchanged and its previous hash is reused instead of reading it
+    :param file_path: Path object of the file
+    :param previous_entry: Manifest entry recorded for the file by a previous run, if any
+    :return: Manifest entry, a dict with keys "table_name", "size", "mtime" and "content_hash"
+    """
+    stat = file_path.stat()
+    entry = {"table_name": get_file_stem(file_path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+    if previous_entry and previous_entry["size"] == entry["size"] and previous_entry["mtime"] == entry["mtime"]:
+        entry["content_hash"] = previous_entry["content_hash"]
+        return entry
+
+    content_hash = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_BYTES), b""):
+            content_hash.update(chunk)
+
+    entry["content_hash"] = content_hash.hexdigest()
+    return entry
+
+
+def get_manifest_changes(previous_entries, current_entries):
+    """
+    Compare two manifests
+    :param previous_entries: Map from file name to manifest entry recorded by the previous run
+    :param current_entries: Map from file name to manifest entry of the files currently present
+    :return: Tuple (list of new or changed file names, list of removed file names)
+    """
+    changed_files = [file_name for file_name, entry in current_entries.items()
+                     if file_name not in previous_entries or
+                     previous_entries[file_name]["content_hash"] != entry["content_hash"] or
+                     previous_entries[file_name]["table_name"] != entry["table_name"]]
+    removed_files = [file_name for file_name in previous_entries if file_name not in current_entries]
+
+    return changed_files, removed_files
+
+
+class JsonManifest:
+    """
+    Manifest of a synced directory stored as a JSON file on the local file system
+    """
+
+    def __init__(self, manifest_path):
+        """
+        :param manifest_path: Path of the JSON file. Created on first save
+        """
+        self.manifest_path = Path(manifest_path)
+
+    def load(self):
+        """
+        :return: Map from file name to manifest entry. Empty if the manifest does not exist yet
+        """
+        if not self.manifest_path.exists():
+            return dict()
+
+        with open(self.manifest_path, "r") as manifest_file:
+            return json.load(manifest_file)
+
+    def save(self, entries):
+        """
+        Replace the stored manifest. The file is written next to the manifest and then renamed, so an interrupted save
+        leaves the previous manifest intact
+        :param entries: Map from file name to manifest entry
+        :return: None
+        """
+        temp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with open(temp_path, "w") as manifest_file:
+            json.dump(entries, manifest_file, indent=2, sort_keys=True)
+
+        temp_path.replace(self.manifest_path)
+        logger.info("Saved manifest " + str(self.manifest_path))
+
+
+class TableManifest:
+    """
+    Manifest of a synced directory stored in a metadata table inside the target schema
+    """
+
+    def __init__(self, exql, db_name, table_name=MANIFEST_TABLE):
+        """
+        :param exql: Exql instance whose connection pool is used
+        :param db_name: Name of the target schema
+        :param table_name: Name of the metadata table. Created if it does not exist
+        """
+        self.exql = exql
+        self.db_name = db_name
+        self.table_name = table_name
+
+    def create_manifest_table(self, cursor):
+        """
+        Create the schema and the manifest table if they do not exist
+        :param cursor: SQL connection cursor
+        :return: None
+        """
+        create_database(cursor, self.db_name)
+        cursor.execute(MySql.USE_DB.format(db_name=self.db_name))
+        cursor.execute(MySql.CREATE_MANIFEST_TABLE.format(table_name=self.table_name))
+
+    def load(self):
+        """
+        :return: Map from file name to manifest entry. Empty if the manifest table does not exist yet
+        """
+        with self.exql.connection() as (connection, cursor):
+            self.create_manifest_table(cursor)
+            cursor.execute(MySql.SELECT_MANIFEST.format(table_name=self.table_name))
+
+            return {file_name: {"table_name": table_name, "size": size, "mtime": mtime, "content_hash": content_hash}
+                    for file_name, table_name, size, mtime, content_hash in cursor.fetchall()}
+
+    def save(self, entries):
+        """
+        Replace the stored manifest in a single transaction
+        :param entries: Map from file name to manifest entry
+        :return: None
+        """
+        with self.exql.connection() as (connection, cursor):
+            self.create_manifest_table(cursor)
+            cursor.execute(MySql.DELETE_MANIFEST.format(table_name=self.table_name))
+
+            rows = [(file_name, entry["table_name"], entry["size"], entry["mtime"], entry["content_hash"])
+                    for file_name, entry in entries.items()]
+            if rows:
+                cursor.executemany(MySql.INSERT_MANIFEST.format(table_name=self.table_name), rows)
+
+            connection.commit()
+
+        logger.info("Saved manifest table " + str(self.db_name) + "." + str(self.table_name))
@@ -0,0 +1,165 @@
+import hashlib
+from datetime import datetime
+from itertools import islice
+
+from exql.cells import is_literal, literal_value
+from exql.dao import BATCH_BYTES, BATCH_ROWS, create_staging_table, delete_unstaged_rows, get_insert_batches, \
+    insert_rows_batched, select_rows_by_keys, upsert_rows
+from exql.logger import logger
+from exql.sql import MySql
+
+
+def normalize_db_value(value):
+    """
+    Convert a value fetched from the database to the string form used for literal cells, so that both can be compared
+    :param value: Value returned by the connector
+    :return: None for NULL, otherwise a string e.g. 45 -> "45", datetime(2021, 1, 1) -> "2021-01-01 00:00:00"
+    """
+    if value is None:
+        return None
+
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode("utf-8", errors="replace")
+
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+
+    if isinstance(value, datetime) and not value.microsecond:
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+
+    return str(value)
+
+
+def get_row_hash(values):
+    """
+    Returns a hash of a row of normalized values
+    :param values: Ordered collection of normalized values (strings or None)
+    :return: Hex digest of the row
+    """
+    row_hash = hashlib.md5()
+    for value in values:
+        row_hash.update(b"\x00" if value is None else b"\x01" + value.encode("utf-8"))
+        row_hash.update(b"\x1f")
+
+    return row_hash.hexdigest()
+
+
+def get_changed_rows(cursor, db_name, table_name, column_names, key_indexes, row_batch, batch_bytes):
+    """
+    Compare a batch of incoming rows with the current contents of the table. Rows containing SQL expressions can't be
+    compared on the client and are always considered changed
+    :param cursor: SQL connection cursor
+    :param db_name: Name of database
+    :param table_name: Name of table
+    :param column_names: Ordered collection of columns of the rows
+    :param key_indexes: Positions of the key columns within :param column_names
+    :param row_batch: List of incoming rows
+    :param batch_bytes: Maximum size, in bytes, of the keys sent in a SELECT statement
+    :return: Tuple (list of rows which are new or differ from the stored ones, number of unchanged rows). Literal rows
+    sharing a key within the batch are compared and counted once, as only the last of them is kept
+    """
+    key_columns = [column_names[index] for index in key_indexes]
+    literal_rows = dict()
+    changed_rows = []
+
+    for row in row_batch:
+        if all(is_literal(cell) for cell in row):
+            values = [literal_value(cell) for cell in row]
+            literal_rows[tuple(values[index] for index in key_indexes)] = (row, get_row_hash(values))
+        else:
+            changed_rows.append(row)
+
+    stored_hashes = dict()
+    key_rows = ([row[index] for index in key_indexes] for row, _ in literal_rows.values())
+    for key_values, _ in get_insert_batches(key_rows, None, batch_bytes):
+        for stored_row in select_rows_by_keys(cursor, db_name, table_name, column_names, key_columns, key_values):
+            values = [normalize_db_value(value) for value in stored_row]
+            stored_hashes[tuple(values[index] for index in key_indexes)] = get_row_hash(values)
+
+    unchanged_rows = 0
+    for key, (row, row_hash) in literal_rows.items():
+        if stored_hashes.get(key) != row_hash:
+            changed_rows.append(row)
+        else:
+            unchanged_rows += 1
+
+    return changed_rows, unchanged_rows
+
+
+def get_key_indexes(column_names, key_columns):
+    """
+    Find the key columns in the header of the incoming rows. Names are compared without case, surrounding spaces or
+    backquotes, as MySQL column names are case insensitive
+    :param column_names: Ordered collection of columns of the incoming rows
+    :param key_columns: Columns of the primary or unique key identifying rows
+    :return: Positions of :param key_columns within :param column_names, None for each missing column
+    """
+    header_indexes = dict()
+    for index, column_name in enumerate(column_names):
+        header_indexes.setdefault(str(column_name).strip().strip("`").lower(), index)
+
+    return [header_indexes.get(str(column).strip().strip("`").lower()) for column in key_columns]
+
+
+def merge_rows(cursor, connection, db_name, table_name, column_names, key_columns, row_data, batch_rows=BATCH_ROWS,
+               batch_bytes=BATCH_BYTES, delete_missing=False):
+    """
+    Merge incoming rows into a table, writing only the differences. Rows are read in batches of :param batch_rows,
+    compared by hash with the stored rows having the same keys, and new or changed rows are written with
+    INSERT ... ON DUPLICATE KEY UPDATE. Each batch is committed separately
+    :param cursor: SQL connection cursor
+    :param connection: SQL connection object
+    :param db_name: Name of database
+    :param table_name: Name of table to merge into
+    :param column_names: Ordered collection of columns of the incoming rows. Must include :param key_columns, compared
+    without case
+    :param key_columns: Columns of the primary or unique key identifying rows
+    :param row_data: Iterable (e.g. generator) of rows matching the order of :param column_names
+    :param batch_rows: Number of rows compared and written at a time
+    :param batch_bytes: Maximum size, in bytes, of the values of a statement
+    :param delete_missing: If True, rows of the table whose key is not present in the incoming rows are deleted. The
+    incoming keys are collected in a temporary staging table for this
+    :return: Map with the number of "changed", "unchanged" and "deleted" rows
+    """
+    key_indexes = get_key_indexes(column_names, key_columns)
+    if not key_columns or None in key_indexes:
+        raise Exception("Merging into " + str(table_name) + " requires the key columns " + str(list(key_columns)) +
+                        " to be present in the file")
+
+    key_columns = [column_names[index] for index in key_indexes]
+    staging_table_name = "exql_merge_keys"
+    counts = {"changed": 0, "unchanged": 0, "deleted": 0}
+
+    if delete_missing:
+        create_staging_table(cursor, db_name, staging_table_name, table_name, key_columns, index_columns=True)
+
+    try:
+        row_iterator = iter(row_data)
+        row_batch = list(islice(row_iterator, batch_rows))
+        while row_batch:
+            changed_rows, unchanged_rows = get_changed_rows(cursor, db_name, table_name, column_names, key_indexes,
+                                                            row_batch, batch_bytes)
+
+            for row_values, _ in get_insert_batches(changed_rows, None, batch_bytes):
+                upsert_rows(cursor, db_name, table_name, column_names, key_columns, row_values)
+
+            if delete_missing:
+                insert_rows_batched(cursor, connection, db_name, staging_table_name, key_columns,
+                                    ([row[index] for index in key_indexes] for row in row_batch), None, batch_bytes,
+                                    commit_interval=None)
+
+            connection.commit()
+            counts["changed"] += len(changed_rows)
+            counts["unchanged"] += unchanged_rows
+            row_batch = list(islice(row_iterator, batch_rows))
+
+        if delete_missing:
+            counts["deleted"] = delete_unstaged_rows(cursor, db_name, table_name, staging_table_name, key_columns)
+            connection.commit()
+    finally:
+        if delete_missing:
+            cursor.execute(MySql.DROP_TEMPORARY_TABLE.format(table_name=staging_table_name))
+
+    logger.info("Merged into " + str(table_name) + ": " + str(counts["changed"]) + " rows inserted or updated, " +
+                str(counts["unchanged"]) + " unchanged, " + str(counts["deleted"]) + " deleted")
+    return counts
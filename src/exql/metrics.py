@@ -0,0 +1,165 @@
+import threading
+import time
+from itertools import islice
+
+
+class Metrics:
+    """
+    Thread-safe collector of the time spent in each phase of a load (parsing files, building SQL, executing statements,
+    committing) and of the rows and bytes written to each table. Callbacks can be registered to forward every
+    measure, e.g. to a monitoring system
+    """
+
+    PARSE = "parse"
+    BUILD = "build"
+    EXECUTE = "execute"
+    COMMIT = "commit"
+
+    def __init__(self, callbacks=None):
+        """
+        :param callbacks: Optional list of functions called as callback(measure name, table name, value) for every
+        measure. Measure names are the phase names, with a value in seconds, and "rows" and "bytes"
+        """
+        self.callbacks = list(callbacks or [])
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.phase_seconds = dict()
+        self.tables = dict()
+
+    def get_table(self, table_name):
+        """
+        Returns the measures of a table, creating them if needed. Must be called with the lock held
+        :param table_name: Name of the table
+        :return: Map with keys "rows", "bytes" and "phase_seconds"
+        """
+        if table_name not in self.tables:
+            self.tables[table_name] = {"rows": 0, "bytes": 0, "phase_seconds": dict()}
+
+        return self.tables[table_name]
+
+    def record(self, name, table_name, value):
+        """
+        Add a measure to the totals and forward it to the callbacks
+        :param name: Phase name, or "rows" or "bytes"
+        :param table_name: Name of the table the measure relates to, or None
+        :param value: Seconds for phases, otherwise a count
+        :return: None
+        """
+        with self._lock:
+            if name in ("rows", "bytes"):
+                self.get_table(table_name)[name] += value
+            else:
+                self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + value
+                if table_name is not None:
+                    table_phases = self.get_table(table_name)["phase_seconds"]
+                    table_phases[name] = table_phases.get(name, 0.0) + value
+
+        for callback in self.callbacks:
+            callback(name, table_name, value)
+
+    def start_phase(self):
+        """
+        Mark the start of a phase on the current thread. Phases can be nested, the time of a nested phase is not
+        counted in the enclosing one
+        :return: Start time, to be passed to end_phase
+        """
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        return time.perf_counter()
+
+    def end_phase(self, name, table_name, start):
+        """
+        Mark the end of a phase started with start_phase and record its exclusive time
+        :param name: Name of the phase
+        :param table_name: Name of the table the phase relates to, or None
+        :param start: Value returned by start_phase
+        :return: None
+        """
+        elapsed = time.perf_counter() - start
+        stack = self._local.stack
+        nested_seconds = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+
+        self.record(name, table_name, elapsed - nested_seconds)
+
+    def phase(self, name, table_name=None):
+        """
+        Context manager measuring a phase e.g. "with metrics.phase(Metrics.EXECUTE, table_name): cursor.execute(...)"
+        :param name: Name of the phase
+        :param table_name: Name of the table the phase relates to, or None
+        :return: Context manager
+        """
+        return MetricsPhase(self, name, table_name)
+
+    def timed_rows(self, row_data, table_name=None, chunk_rows=256):
+        """
+        Wrap an iterable of rows read from a file so that the time spent producing them is recorded as parse time. Rows
+        are read :param chunk_rows at a time to keep the cost of measuring low
+        :param row_data: Iterable (e.g. generator) of rows
+        :param table_name: Name of the table the rows belong to
+        :param chunk_rows: Number of rows read per measure
+        :return: Generator of the same rows
+        """
+        row_iterator = iter(row_data)
+        while True:
+            start = self.start_phase()
+            row_chunk = list(islice(row_iterator, chunk_rows))
+            self.end_phase(Metrics.PARSE, table_name, start)
+
+            if not row_chunk:
+                return
+
+            yield from row_chunk
+
+    def get_summary(self):
+        """
+        :return: Map with the total seconds per phase under "phase_seconds" and the rows, bytes and seconds per phase
+        of each table under "tables"
+        """
+        with self._lock:
+            return {"phase_seconds": dict(self.phase_seconds),
+                    "tables": {table_name: {"rows": table["rows"], "bytes": table["bytes"],
+                                            "phase_seconds": dict(table["phase_seconds"])}
+                               for table_name, table in self.tables.items()}}
+
+    def reset(self):
+        """
+        Clear all recorded measures
+        :return: None
+        """
+        with self._lock:
+            self.phase_seconds = dict()
+            self.tables = dict()
+
+
+class MetricsPhase:
+    """
+    Context manager returned by Metrics.phase. Does nothing if created without a Metrics instance, so that callers
+    can measure phases unconditionally
+    """
+
+    def __init__(self, metrics, name, table_name):
+        self.metrics = metrics
+        self.name = name
+        self.table_name = table_name
+        self.start = None
+
+    def __enter__(self):
+        if self.metrics:
+            self.start = self.metrics.start_phase()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.metrics:
+            self.metrics.end_phase(self.name, self.table_name, self.start)
+
+
+def measure(metrics, name, table_name=None):
+    """
+    Returns a context manager measuring a phase on :param metrics, or doing nothing if :param metrics is None
+    :param metrics: Metrics instance or None
+    :param name: Name of the phase
+    :param table_name: Name of the table the phase relates to, or None
+    :return: Context manager
+    """
+    return MetricsPhase(metrics, name, table_name)
@@ -0,0 +1,201 @@
+import csv
+import io
+import locale
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from exql.dao import BATCH_BYTES, BATCH_ROWS, get_compiled_insert_batches, get_insert_batches
+
+CHUNK_BYTES = 32 * 1024 * 1024
+SCAN_BLOCK_BYTES = 1024 * 1024
+QUOTE = ord('"')
+
+
+def get_header_end(file_path, header_rows):
+    """
+    Returns the offset of the first byte after the header records of a csv file. A line break only ends a record when
+    an even number of double quotes precedes it, otherwise it lies within a quoted field
+    :param file_path: Path of the csv file
+    :param header_rows: Number of header records
+    :return: Offset, in bytes, of the first body record
+    """
+    quote_count = 0
+    records = 0
+    with open(file_path, "rb") as csv_file:
+        while records < header_rows:
+            line = csv_file.readline()
+            if not line:
+                break
+
+            quote_count += line.count(QUOTE)
+            if quote_count % 2 == 0:
+                records += 1
+
+        return csv_file.tell()
+
+
+def get_record_ranges(file_path, start, chunk_bytes=CHUNK_BYTES):
+    """
+    Split the records of a csv file, from :param start onwards, into byte ranges of about :param chunk_bytes bytes.
+    Every range ends right after a line break preceded by an even number of double quotes, so that no record (including
+    records holding line breaks in quoted fields) is split between two ranges. The file is scanned once, counting
+    quotes block by block, which is much faster than parsing it
+    :param file_path: Path of the csv file. Quotes within quoted fields must be doubled, as written by the csv module
+    :param start: Offset of the first record to include e.g. as returned by get_header_end
+    :param chunk_bytes: Approximate size of a range
+    :return: List of (start offset, end offset) tuples, end offsets being exclusive
+    """
+    boundaries = [start]
+    target = start + chunk_bytes
+    quote_count = 0
+    position = start
+    searching = False
+
+    with open(file_path, "rb") as csv_file:
+        csv_file.seek(start)
+        for block in iter(lambda: csv_file.read(SCAN_BLOCK_BYTES), b""):
+            index = 0
+            while True:
+                if not searching:
+                    if position + len(block) <= target:
+                        quote_count += block.count(QUOTE, index)
+                        break
+
+                    quote_count += block.count(QUOTE, index, target - position)
+                    index = target - position
+                    searching = True
+
+                line_end = block.find(b"\n", index)
+                if line_end < 0:
+                    quote_count += block.count(QUOTE, index)
+                    break
+
+                quote_count += block.count(QUOTE, index, line_end)
+                index = line_end + 1
+                if quote_count % 2 == 0:
+                    boundaries.append(position + index)
+                    target = position + index + chunk_bytes
+                    searching = False
+
+            position += len(block)
+
+    if position > boundaries[-1]:
+        boundaries.append(position)
+
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def parse_record_range(file_path, record_range, batch_rows=BATCH_ROWS, batch_bytes=BATCH_BYTES, prepared=False,
+                       encoding=None):
+    """
+    Parse a range of records of a csv file and group its rows into INSERT batches. Runs in a worker process
+    :param file_path: Path of the csv file
+    :param record_range: (start offset, end offset) tuple as returned by get_record_ranges
+    :param batch_rows: Maximum number of rows per batch
+    :param batch_bytes: Maximum size, in bytes, of the values of a batch
+    :param prepared: If True, batches are built by get_compiled_insert_batches, otherwise by get_insert_batches
+    :param encoding: Encoding of the file. Defaults to the encoding open() uses
+    :return: List of (row query segments, number of rows, parameters, None) tuples, as taken by dao.insert_batches
+    """
+    start, end = record_range
+    with open(file_path, "rb") as csv_file:
+        csv_file.seek(start)
+        text = csv_file.read(end - start).decode(encoding or locale.getpreferredencoding(False))
+
+    rows = (row for row in csv.reader(io.StringIO(text, newline="")) if any(cell != "" for cell in row))
+
+    if prepared:
+        return [(row_values, row_count, params, None)
+                for row_values, row_count, params in get_compiled_insert_batches(rows, batch_rows, batch_bytes)]
+
+    return [(row_values, row_count, None, None)
+            for row_values, row_count in get_insert_batches(rows, batch_rows, batch_bytes)]
+
+
+def iter_parsed_batches(file_path, record_ranges, workers, batch_rows=BATCH_ROWS, batch_bytes=BATCH_BYTES,
+                        prepared=False):
+    """
+    Parse ranges of records in a pool of :param workers processes and yield their batches in file order. At most twice
+    as many ranges as workers are parsed ahead of the batches being consumed, bounding memory use
+    :param file_path: Path of the csv file
+    :param record_ranges: List of (start offset, end offset) tuples as returned by get_record_ranges
+    :param workers: Number of worker processes
+    :param batch_rows: Maximum number of rows per batch
+    :param batch_bytes: Maximum size, in bytes, of the values of a batch
+    :param prepared: If True, batches of literal rows carry their values as statement parameters
+    :return: Generator of (row query segments, number of rows, parameters, None) tuples
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        range_iterator = iter(record_ranges)
+        try:
+            for record_range in range_iterator:
+                pending.append(executor.submit(parse_record_range, str(file_path), record_range, batch_rows,
+                                               batch_bytes, prepared))
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def load_batches_concurrently(batches, loaders, load):
+    """
+    Hand batches over to :param loaders loader threads, each running :param load on an iterator of the batches it
+    receives. Batches are taken in order, but rows of different loaders are committed independently of each other. A
+    loader failing stops the others after their current batch
+    :param batches: Iterable (e.g. generator) of batches
+    :param loaders: Number of loader threads
+    :param load: Function taking an iterator of batches, e.g. inserting them on a connection of its own, and returning
+    the number of rows it loaded
+    :return: Total number of rows loaded
+    """
+    batch_queue = queue.Queue(2 * loaders)
+    stopped = threading.Event()
+
+    def iter_queue():
+        while True:
+            try:
+                batch = batch_queue.get(timeout=0.1)
+            except queue.Empty:
+                if stopped.is_set():
+                    return
+                continue
+
+            if batch is None or stopped.is_set():
+                return
+
+            yield batch
+
+    def run_loader():
+        try:
+            return load(iter_queue())
+        except BaseException:
+            stopped.set()
+            raise
+
+    def put(batch):
+        while not stopped.is_set():
+            try:
+                batch_queue.put(batch, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    with ThreadPoolExecutor(max_workers=loaders) as executor:
+        futures = [executor.submit(run_loader) for _ in range(loaders)]
+        try:
+            for batch in batches:
+                put(batch)
+                if stopped.is_set():
+                    break
+        finally:
+            for _ in futures:
+                put(None)
+
+        return sum(future.result() for future in futures)
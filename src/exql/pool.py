@@ -0,0 +1,176 @@
+import threading
+import time
+from contextlib import contextmanager
+from queue import LifoQueue, Empty
+
+from exql.dao import open_connection
+from exql.logger import logger
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of MySQL connections. Connections are opened lazily, up to :param size, and handed back to the
+    pool after use so that later operations can reuse them instead of connecting again
+    """
+
+    def __init__(self, host, username, password, port=3306, size=5, health_check_interval=30, connect=open_connection,
+                 **connect_args):
+        """
+        Initialize the pool. No connection is opened until one is requested
+        :param host: MySQL host
+        :param username: MySQL username
+        :param password: MySQL password
+        :param port: MySQL port number
+        :param size: Maximum number of connections open at the same time
+        :param health_check_interval: Idle time, in seconds, after which a connection is pinged before being reused
+        :param connect: Function opening a connection, called with the host, username, password, port and
+        :param connect_args. Defaults to dao.open_connection
+        :param connect_args: Additional keyword arguments passed on to mysql.connector.connect
+        """
+        if size < 1:
+            raise Exception("Connection pool size must be at least 1")
+
+        self.host = host
+        self.username = username
+        self.password = password
+        self.port = port
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.connect = connect
+        self.connect_args = connect_args
+
+        self._idle = LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def is_healthy(self, connection, idle_since):
+        """
+        Check if a pooled connection can be reused. Connections idle for less than the health check interval are
+        assumed to be alive, others are pinged
+        :param connection: Idle connection taken from the pool
+        :param idle_since: Time (as returned by time.monotonic) at which the connection was returned to the pool
+        :return: True if the connection can be reused
+        """
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+
+        try:
+            return connection.is_connected()
+        except Exception:
+            return False
+
+    def acquire(self, timeout=None):
+        """
+        Get a connection and a new cursor from the pool, opening a connection if no healthy idle one exists. Blocks
+        while :param size connections are in use
+        :param timeout: Maximum time, in seconds, to wait for a connection. Waits indefinitely if None
+        :return: Tuple (connection object, cursor object). Must be handed back using release()
+        """
+        if self._closed:
+            raise Exception("Connection pool is closed")
+
+        if not self._slots.acquire(timeout=timeout):
+            raise Exception("Timed out waiting for a connection to " + str(self.host))
+
+        try:
+            connection = None
+            while connection is None:
+                try:
+                    connection, idle_since = self._idle.get_nowait()
+                except Empty:
+                    connection = self.connect(self.host, self.username, self.password, self.port,
+                                              **self.connect_args)
+                    break
+
+                if not self.is_healthy(connection, idle_since):
+                    logger.info("Discarding stale connection to " + str(self.host))
+                    self.discard(connection)
+                    connection = None
+
+            return connection, connection.cursor()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection, cursor, discard=False):
+        """
+        Close the cursor and hand the connection back to the pool. Uncommitted work is rolled back
+        :param connection: Connection obtained from acquire()
+        :param cursor: Cursor obtained from acquire()
+        :param discard: If True, the connection is closed instead of being reused
+        :return: None
+        """
+        try:
+            try:
+                cursor.close()
+                if not discard:
+                    connection.rollback()
+            except Exception:
+                discard = True
+
+            if discard or self._closed:
+                self.discard(connection)
+            else:
+                self._idle.put((connection, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def discard(connection):
+        """
+        Close a connection, ignoring errors raised by connections that are already broken
+        :param connection: Connection to close
+        :return: None
+        """
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """
+        Context manager yielding a pooled (connection, cursor) tuple. The connection is handed back to the pool on
+        exit, and closed instead if the block raised a database error
+        :param timeout: Maximum time, in seconds, to wait for a connection
+        :return: Tuple (connection object, cursor object)
+        """
+        connection, cursor = self.acquire(timeout)
+        try:
+            yield connection, cursor
+        except Exception:
+            self.release(connection, cursor, discard=not connection_is_usable(connection))
+            raise
+        else:
+            self.release(connection, cursor)
+
+    def close(self):
+        """
+        Close all idle connections. Connections currently in use are closed when they are released
+        :return: None
+        """
+        self._closed = True
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except Empty:
+                break
+            self.discard(connection)
+
+
+def connection_is_usable(connection):
+    """
+    Check if a connection that was in use when an error was raised is still usable
+    :param connection: Connection object
+    :return: True if the connection is still open
+    """
+    try:
+        return connection.is_connected()
+    except Exception:
+        return False
@@ -0,0 +1,61 @@
+import csv
+from pathlib import Path
+
+from exql.logger import logger
+
+ERROR_COLUMN = "exql_error"
+
+
+class RejectWriter:
+    """
+    Csv file collecting the rows rejected by the server, in the insertion format i.e. a row of column names followed by
+    the rows, with the error raised by each row in an extra exql_error column. The file is only created once a row is
+    rejected, and appended to if it already exists, so that the rejects of a resumed load are kept
+    """
+
+    def __init__(self, file_path, column_names):
+        """
+        :param file_path: Path of the csv file
+        :param column_names: Ordered collection of the columns of the rejected rows
+        """
+        self.file_path = Path(file_path)
+        self.column_names = list(column_names)
+        self.rows = 0
+        self.reject_file = None
+        self.writer = None
+
+    def write(self, row, error):
+        """
+        Append a rejected row to the file
+        :param row: Row as read from the source file
+        :param error: Exception raised by the server for the row
+        :return: None
+        """
+        if self.writer is None:
+            write_header = not self.file_path.exists() or self.file_path.stat().st_size == 0
+            self.reject_file = open(self.file_path, "a", newline="")
+            self.writer = csv.writer(self.reject_file)
+            if write_header:
+                self.writer.writerow(self.column_names + [ERROR_COLUMN])
+
+        self.writer.writerow(list(row) + [str(error)])
+        self.rows += 1
+
+    def close(self):
+        """
+        Close the file, logging the number of rejected rows if any
+        :return: None
+        """
+        if self.reject_file is None:
+            return
+
+        self.reject_file.close()
+        self.reject_file = None
+        self.writer = None
+        logger.warning("Rejected " + str(self.rows) + " rows, written to " + str(self.file_path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
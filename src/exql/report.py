@@ -0,0 +1,109 @@
+from exql.logger import logger
+
+
+class TableResult:
+    """
+    Outcome of loading or exporting a single table
+    """
+
+    def __init__(self, table_name, rows=0, seconds=0.0, error=None):
+        """
+        :param table_name: Name of the table
+        :param rows: Number of rows processed
+        :param seconds: Wall-clock time spent on the table
+        :param error: Exception raised while processing the table, None if it succeeded
+        """
+        self.table_name = table_name
+        self.rows = rows
+        self.seconds = seconds
+        self.error = error
+
+    @property
+    def success(self):
+        return self.error is None
+
+    def __repr__(self):
+        status = "ok" if self.success else "failed: " + str(self.error)
+        return "TableResult(" + str(self.table_name) + ", " + str(self.rows) + " rows, " + \
+               "{:.3f}".format(self.seconds) + "s, " + status + ")"
+
+
+class JobResult(TableResult):
+    """
+    Outcome of a job of a job manifest, e.g. loading a directory into a database of one server
+    """
+
+    def __init__(self, table_name, server_name, action, rows=0, seconds=0.0, error=None, report=None):
+        """
+        :param table_name: Name of the job
+        :param server_name: Name of the server the job ran against
+        :param action: Name of the Exql method run by the job
+        :param rows: Number of rows processed
+        :param seconds: Wall-clock time spent on the job
+        :param error: Exception raised by the job, None if it succeeded
+        :param report: JobReport returned by the job, if any
+        """
+        super().__init__(table_name, rows, seconds, error)
+        self.server_name = server_name
+        self.action = action
+        self.report = report
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        status = "ok" if self.success else "failed: " + str(self.error)
+        return "JobResult(" + str(self.table_name) + ", " + str(self.action) + " on " + str(self.server_name) + \
+               ", " + str(self.rows) + " rows, " + "{:.3f}".format(self.seconds) + "s, " + \
+               "{:.0f}".format(self.rows_per_second) + " rows/s, " + status + ")"
+
+
+class JobReport:
+    """
+    Collection of per-table results of a multi-table job, e.g. loading a directory into a database
+    """
+
+    def __init__(self, results=None, seconds=0.0):
+        """
+        :param results: List of TableResult
+        :param seconds: Wall-clock time of the whole job
+        """
+        self.results = list(results or [])
+        self.seconds = seconds
+
+    @property
+    def succeeded(self):
+        return [result for result in self.results if result.success]
+
+    @property
+    def failed(self):
+        return [result for result in self.results if not result.success]
+
+    @property
+    def rows(self):
+        return sum(result.rows for result in self.results)
+
+    def slowest(self, n=5):
+        """
+        Returns the :param n tables which took the longest to process
+        :param n: Number of tables to return
+        :return: List of TableResult sorted from slowest to fastest
+        """
+        return sorted(self.results, key=lambda result: result.seconds, reverse=True)[:n]
+
+    def log_summary(self, description, n=5):
+        """
+        Log the number of succeeded and failed tables, the failures and the :param n slowest tables
+        :param description: Description of the job used as prefix of the log lines
+        :param n: Number of slowest tables to log
+        :return: None
+        """
+        logger.info(description + ": " + str(len(self.succeeded)) + " tables succeeded, " + str(len(self.failed)) +
+                    " failed, " + str(self.rows) + " rows in " + "{:.3f}".format(self.seconds) + "s")
+
+        for result in self.failed:
+            logger.error(description + ": " + str(result.table_name) + " failed: " + str(result.error))
+
+        for result in self.slowest(n):
+            logger.info(description + ": slowest tables: " + repr(result))
@@ -0,0 +1,186 @@
+import threading
+import time
+
+from exql.dao import get_lower_case_table_names, get_schema_columns, get_schema_unique_indexes
+from exql.logger import logger
+
+SCHEMA_TTL = 300
+NUMERIC_TYPES = frozenset(["tinyint", "smallint", "mediumint", "int", "integer", "bigint", "decimal", "numeric",
+                           "float", "double", "real", "bit"])
+BINARY_TYPES = frozenset(["binary", "varbinary", "tinyblob", "blob", "mediumblob", "longblob"])
+STRING_ESCAPES = str.maketrans({"\\": "\\\\", "'": "''"})
+
+
+class TableSchema:
+    """
+    Columns and keys of a table, as read from information_schema
+    """
+
+    def __init__(self, table_name, columns, unique_indexes=None):
+        """
+        :param table_name: Name of the table
+        :param columns: List of (column name, data type) tuples in column order
+        :param unique_indexes: List of (index name, list of column names) tuples, the primary key coming first
+        """
+        self.table_name = table_name
+        self.column_names = [column_name for column_name, _ in columns]
+        self.column_types = dict(columns)
+        self.unique_indexes = list(unique_indexes or [])
+
+    @property
+    def primary_key(self):
+        """
+        :return: Columns of the primary key in key order, empty if the table has none
+        """
+        if self.unique_indexes and self.unique_indexes[0][0] == "PRIMARY":
+            return list(self.unique_indexes[0][1])
+
+        return []
+
+    @property
+    def key_columns(self):
+        """
+        :return: Columns of the primary key or, if the table has none, of its first unique index. This is
+        the key merge_rows matches rows on
+        """
+        return list(self.unique_indexes[0][1]) if self.unique_indexes else []
+
+    def get_unknown_columns(self, column_names):
+        """
+        :param column_names: Column names e.g. read from the header of a csv. Compared without case, surrounding
+        spaces or backquotes, as MySQL column names are case insensitive
+        :return: List of the names of :param column_names which are not columns of the table
+        """
+        known_names = set(column_name.lower() for column_name in self.column_names)
+        return [column_name for column_name in column_names
+                if str(column_name).strip().strip("`").lower() not in known_names]
+
+
+class SchemaCache:
+    """
+    Per-instance cache of the tables of each database, with their columns, column types and unique keys. A database
+    is read from information_schema with two queries when first needed, and again once its entry is older than the
+    TTL or was invalidated, e.g. by exql creating or dropping one of its tables. Table names are looked up without
+    case on servers with a non-zero lower_case_table_names, as MySQL does. Thread safe
+    """
+
+    def __init__(self, exql, ttl=SCHEMA_TTL):
+        """
+        :param exql: Exql instance whose connection pool is used
+        :param ttl: Time, in seconds, after which a database is read again. None means entries are only refreshed
+        when invalidated
+        """
+        self.exql = exql
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = dict()
+        self.lower_case_table_names = None
+
+    def get_tables(self, db_name, refresh=False):
+        """
+        :param db_name: Name of database
+        :param refresh: If True, the database is read again even if its entry is fresh
+        :return: Map from table name to TableSchema, empty if the database does not exist
+        """
+        with self.lock:
+            entry = self.entries.get(db_name)
+            if entry and not refresh and (self.ttl is None or time.monotonic() - entry[0] < self.ttl):
+                return entry[1]
+
+        with self.exql.connection() as (connection, cursor):
+            columns = get_schema_columns(cursor, db_name)
+            unique_indexes = get_schema_unique_indexes(cursor, db_name)
+            if self.lower_case_table_names is None:
+                self.lower_case_table_names = get_lower_case_table_names(cursor)
+
+        tables = {table_name: TableSchema(table_name, table_columns, unique_indexes.get(table_name))
+                  for table_name, table_columns in columns.items()}
+        logger.debug("Cached the schema of " + str(len(tables)) + " tables of " + str(db_name))
+
+        with self.lock:
+            self.entries[db_name] = (time.monotonic(), tables)
+
+        return tables
+
+    def get_table(self, db_name, table_name, refresh=False):
+        """
+        :param db_name: Name of database
+        :param table_name: Name of table
+        :param refresh: If True, the database is read again even if its entry is fresh
+        :return: TableSchema, None if the table does not exist
+        """
+        tables = self.get_tables(db_name, refresh)
+        table = tables.get(table_name)
+        if table is None and self.lower_case_table_names:
+            table = next((table for name, table in tables.items() if name.lower() == str(table_name).lower()), None)
+
+        return table
+
+    def invalidate(self, db_name=None):
+        """
+        Drop cached entries, so that they are read again when next needed
+        :param db_name: Database whose entry to drop. If None, all entries are dropped
+        :return: None
+        """
+        with self.lock:
+            if db_name is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(db_name, None)
+
+    def validate_columns(self, db_name, table_name, column_names, source=None):
+        """
+        Check that a table has all the provided columns before any statement is built. A mismatch found with a cached
+        entry is checked again against a fresh read of the database, in case the table changed. A table missing from
+        information_schema is not rejected here, so that the statements fail with the error of the server
+        :param db_name: Name of database
+        :param table_name: Name of table
+        :param column_names: Column names e.g. read from the header of a csv
+        :param source: Optional description of where the names come from e.g. the path of the csv, used in errors
+        :return: TableSchema of the table, None if it is not in information_schema
+        """
+        table = self.get_table(db_name, table_name)
+        if table is None or table.get_unknown_columns(column_names):
+            table = self.get_table(db_name, table_name, refresh=True)
+
+        if table is None:
+            logger.debug("Table " + str(db_name) + "." + str(table_name) + " is not in information_schema, leaving " +
+                         "its columns to be checked by the server")
+            return None
+
+        unknown_columns = table.get_unknown_columns(column_names)
+        if unknown_columns:
+            raise Exception("Columns " + ", ".join(map(str, unknown_columns)) + " of " + str(source or "the header") +
+                            " do not exist in table " + str(db_name) + "." + str(table_name))
+
+        return table
+
+
+def format_literal(value, data_type):
+    """
+    Format a value read from the database as a SQL literal, so that files exported with it can be loaded back as is
+    :param value: Value as returned by mysql-connector
+    :param data_type: Lower case MySQL data type of the column e.g. "varchar"
+    :return: Literal e.g. NULL, 12, 'It''s' or X'00ff'
+    """
+    if value is None:
+        return "NULL"
+
+    if data_type in NUMERIC_TYPES and not isinstance(value, (bytes, bytearray)):
+        return str(value)
+
+    if data_type in BINARY_TYPES or isinstance(value, (bytes, bytearray)):
+        return "X'" + bytes(value).hex() + "'"
+
+    return "'" + str(value).translate(STRING_ESCAPES) + "'"
+
+
+def format_literal_batches(row_batches, data_types):
+    """
+    Format the rows of :param row_batches as SQL literals
+    :param row_batches: Iterable (e.g. generator) of lists of rows fetched from the database
+    :param data_types: Data types of the columns of the rows, in column order
+    :return: Generator of lists of formatted rows
+    """
+    for row_batch in row_batches:
+        yield [[format_literal(value, data_type) for value, data_type in zip(row, data_types)] for row in row_batch]
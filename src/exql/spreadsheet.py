@@ -0,0 +1,110 @@
+import datetime
+import re
+
+import xlrd
+
+from exql.formats import format_time_value
+from exql.schema import format_literal
+
+SHEET_NAME_PATTERN = re.compile(r"\W+")
+TEMPORAL_TYPES = (datetime.date, datetime.time, datetime.timedelta)
+
+
+def get_cell_value(value):
+    """
+    :param value: Cell value e.g. as returned by openpyxl, which reads date cells as datetime objects
+    :return: Empty string for empty cells, quoted literal for dates and times e.g. '2020-01-01 00:00:00', otherwise
+    the value itself
+    """
+    if value is None:
+        return ""
+
+    if isinstance(value, datetime.timedelta):
+        return format_literal(format_time_value(value), None)
+
+    return format_literal(value, None) if isinstance(value, TEMPORAL_TYPES) else value
+
+
+def get_row_values(values):
+    """
+    Convert the cell values of a spreadsheet row to the row format used for .csv files i.e. empty cells become empty
+    strings and dates and times become quoted literals
+    :param values: Cell values of the row
+    :return: List of cell values
+    """
+    return [get_cell_value(value) for value in values]
+
+
+def iter_xlsx_rows(file_path, sheet_name=None):
+    """
+    Lazily read the rows of a sheet of a .xlsx workbook. The workbook is opened in read-only mode, which parses the
+    sheet while rows are consumed instead of loading the whole workbook in memory. Requires openpyxl
+    :param file_path: Path of the .xlsx file
+    :param sheet_name: Name of the sheet to read. If None, the first sheet is read
+    :return: Generator of rows
+    """
+    try:
+        import openpyxl
+    except ImportError:
+        raise Exception("Reading .xlsx files requires the openpyxl package")
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        for values in sheet.iter_rows(values_only=True):
+            yield get_row_values(values)
+    finally:
+        workbook.close()
+
+
+def iter_xls_rows(file_path, sheet_name=None):
+    """
+    Lazily read the rows of a sheet of a .xls workbook. Only the requested sheet is loaded and it is released once
+    read. The .xls format does not allow parsing a sheet row by row, so a single sheet is held in memory at a time
+    :param file_path: Path of the .xls file
+    :param sheet_name: Name of the sheet to read. If None, the first sheet is read
+    :return: Generator of rows
+    """
+    workbook = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        sheet = workbook.sheet_by_name(sheet_name) if sheet_name else workbook.sheet_by_index(0)
+        for i in range(sheet.nrows):
+            yield get_row_values(sheet.row_values(i))
+    finally:
+        workbook.release_resources()
+
+
+def get_sheet_names(file_path):
+    """
+    Returns the names of the sheets of a .xls or .xlsx workbook, without loading the sheets
+    :param file_path: Path object of the workbook
+    :return: List of sheet names
+    """
+    if file_path.suffix == ".xlsx":
+        try:
+            import openpyxl
+        except ImportError:
+            raise Exception("Reading .xlsx files requires the openpyxl package")
+
+        workbook = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+
+    workbook = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        return workbook.sheet_names()
+    finally:
+        workbook.release_resources()
+
+
+def get_sheet_table_name(file_path, sheet_name):
+    """
+    Returns the name of the table created from a sheet of a workbook e.g. sheet "Full time" of staff.xlsx ->
+    staff_Full_time
+    :param file_path: Path object of the workbook
+    :param sheet_name: Name of the sheet
+    :return: Table name
+    """
+    return file_path.stem + "_" + SHEET_NAME_PATTERN.sub("_", sheet_name).strip("_")
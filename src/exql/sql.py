@@ -5,3 +5,59 @@ class MySql:
     USE_DB = "USE {db_name};"
     CREATE_TABLE = "CREATE TABLE {table_name} ({row_data_list});"
     CREATE_DATABASE = "CREATE DATABASE IF NOT EXISTS {db_name};"
+    LOAD_DATA_LOCAL_INFILE = "LOAD DATA LOCAL INFILE '{file_path}' INTO TABLE {table_name} CHARACTER SET utf8mb4 " \
+                             "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({column_names});"
+    SHOW_WARNINGS = "SHOW WARNINGS LIMIT {limit};"
+    GET_TABLE_ROW_ESTIMATES = "SELECT table_name, table_rows FROM information_schema.tables " \
+                              "WHERE table_schema = '{db_name}';"
+    GET_FIRST_KEYSET_BOUNDARY = "SELECT {key_column} FROM {table_name} ORDER BY {key_column} LIMIT 1 OFFSET {offset};"
+    GET_NEXT_KEYSET_BOUNDARY = "SELECT {key_column} FROM {table_name} WHERE {key_column} > %s " \
+                               "ORDER BY {key_column} LIMIT 1 OFFSET {offset};"
+    SELECT_KEY_RANGE = "SELECT * FROM {table_name}{where_clause} ORDER BY {key_column}"
+    DELETE_ROWS_IN = "DELETE FROM {table_name} WHERE ({column_names}) IN ({row_values});"
+    DROP_TEMPORARY_TABLE = "DROP TEMPORARY TABLE IF EXISTS {table_name};"
+    CREATE_STAGING_TABLE = "CREATE TEMPORARY TABLE {staging_table_name} " \
+                           "({row_id_column} BIGINT AUTO_INCREMENT PRIMARY KEY{key_index}) " \
+                           "SELECT {column_names} FROM {table_name} LIMIT 0;"
+    GET_MAX_VALUE = "SELECT MAX({column_name}) FROM {table_name};"
+    DELETE_STAGED_ROWS = "DELETE {table_name} FROM {table_name} JOIN {staging_table_name} ON {join_condition} " \
+                         "WHERE {staging_table_name}.{row_id_column} > {lower} " \
+                         "AND {staging_table_name}.{row_id_column} <= {upper};"
+    DROP_TABLE = "DROP TABLE IF EXISTS {table_name};"
+    CREATE_MANIFEST_TABLE = "CREATE TABLE IF NOT EXISTS {table_name} (file_name VARCHAR(255) PRIMARY KEY, " \
+                            "table_name VARCHAR(64) NOT NULL, size BIGINT NOT NULL, mtime DOUBLE NOT NULL, " \
+                            "content_hash CHAR(64) NOT NULL);"
+    SELECT_MANIFEST = "SELECT file_name, table_name, size, mtime, content_hash FROM {table_name};"
+    DELETE_MANIFEST = "DELETE FROM {table_name};"
+    INSERT_MANIFEST = "INSERT INTO {table_name} (file_name, table_name, size, mtime, content_hash) " \
+                      "VALUES (%s, %s, %s, %s, %s);"
+    UPSERT_ROWS = "INSERT INTO {table_name}({column_names}) VALUES {row_values} ON DUPLICATE KEY UPDATE {update_list};"
+    SELECT_ROWS_BY_KEYS = "SELECT {column_names} FROM {table_name} WHERE ({key_columns}) IN ({key_values});"
+    DELETE_UNSTAGED_ROWS = "DELETE {table_name} FROM {table_name} LEFT JOIN {staging_table_name} ON {join_condition} " \
+                           "WHERE {staging_table_name}.{row_id_column} IS NULL;"
+    ADD_UNIQUE_INDEXES = "ALTER TABLE {table_name} {index_list};"
+    SET_SESSION_CHECKS = "SET SESSION unique_checks = {value}, foreign_key_checks = {value};"
+    START_TRANSACTION = "START TRANSACTION;"
+    SAVEPOINT = "SAVEPOINT {name};"
+    ROLLBACK_TO_SAVEPOINT = "ROLLBACK TO SAVEPOINT {name};"
+    RELEASE_SAVEPOINT = "RELEASE SAVEPOINT {name};"
+    CREATE_CHECKPOINT_TABLE = "CREATE TABLE IF NOT EXISTS {table_name} (checkpoint_key VARCHAR(255) PRIMARY KEY, " \
+                              "size BIGINT NOT NULL, mtime DOUBLE NOT NULL, content_hash CHAR(64) NOT NULL, " \
+                              "row_count BIGINT NOT NULL, complete BOOLEAN NOT NULL);"
+    SELECT_CHECKPOINTS = "SELECT checkpoint_key, size, mtime, content_hash, row_count, complete FROM {table_name};"
+    UPSERT_CHECKPOINT = "INSERT INTO {table_name} (checkpoint_key, size, mtime, content_hash, row_count, complete) " \
+                        "VALUES (%s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE size = VALUES(size), " \
+                        "mtime = VALUES(mtime), content_hash = VALUES(content_hash), row_count = VALUES(row_count), " \
+                        "complete = VALUES(complete);"
+    GET_TABLE_STATES = "SELECT table_name, update_time, table_rows FROM information_schema.tables " \
+                       "WHERE table_schema = '{db_name}';"
+    CHECKSUM_TABLE = "CHECKSUM TABLE {table_name};"
+    SET_STATS_EXPIRY = "SET SESSION information_schema_stats_expiry = {value};"
+    GET_RANGE_CHECKSUM = "SELECT COUNT(*), SUM(CRC32(CONCAT_WS('#', {column_list}))) FROM {table_name} " \
+                         "WHERE {key_column} <= %s;"
+    GET_SCHEMA_COLUMNS = "SELECT table_name, column_name, data_type FROM information_schema.columns " \
+                         "WHERE table_schema = '{db_name}' ORDER BY table_name, ordinal_position;"
+    GET_SCHEMA_UNIQUE_INDEX_COLUMNS = "SELECT table_name, index_name, column_name FROM information_schema.statistics " \
+                                      "WHERE table_schema = '{db_name}' AND non_unique = 0 " \
+                                      "ORDER BY table_name, index_name = 'PRIMARY' DESC, index_name, seq_in_index;"
+    GET_LOWER_CASE_TABLE_NAMES = "SELECT @@lower_case_table_names;"
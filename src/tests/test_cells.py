@@ -0,0 +1,26 @@
+import io
+
+from exql.bulk import write_literal_rows
+from exql.cells import CellCompiler, get_literal, NOT_LITERAL
+from exql.dao import get_compiled_insert_batches
+
+
+def test_number_bound_as_stored_by_literal_path():
+    # Sent as SQL text, 007 is the integer literal 7 and a VARCHAR column stores '7'
+    rows = [["007", "'007'"]]
+
+    assert list(get_compiled_insert_batches(rows)) == [(None, 1, ["7", "007"])]
+
+    tsv_file = io.StringIO()
+    assert write_literal_rows(tsv_file, iter(rows)) == (1, None)
+    assert tsv_file.getvalue() == "7\t007\n"
+
+
+def test_numbers_canonical_text():
+    assert [get_literal(cell) for cell in ["12", "0", "+5", "-0", "-.50", "1.", "-0.0", "0.00000001"]] == \
+        ["12", "0", "5", "0", "-0.50", "1", "0.0", "0.00000001"]
+
+
+def test_exponent_numbers_sent_as_text():
+    assert get_literal("2e3") is NOT_LITERAL
+    assert CellCompiler().compile_row(["1", "2e3"]) is None